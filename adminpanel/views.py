@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.core.paginator import Paginator
 from users.decorators import admin_required
 from users.models import User
+from properties.cache import result_cache_stats
 from properties.models import Property
 
 
@@ -30,6 +31,7 @@ def admin_dashboard(request):
         'rented_properties': rented_properties,
         'recent_users': recent_users,
         'recent_properties': recent_properties,
+        'search_cache': result_cache_stats(),
     }
     return render(request, 'adminpanel/dashboard.html', context)
 
@@ -0,0 +1,95 @@
+"""
+Conditional GET for the read-only API endpoints.
+
+Validators are built from data that is cheap to read: the property row
+(plus its owner's name) and the cache generations of properties.cache.
+Both live in the database, so every worker computes the same validators
+and a write from any process (bumped once it commits) changes them.
+Matching ``If-None-Match`` / ``If-Modified-Since`` requests get a 304
+before any serialization happens. The ETag also covers the negotiated
+representation, since one URL serves JSON and the browsable API.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from properties.cache import amenity_state, detail_state, listing_state
+from properties.models import Property
+
+
+def _etag(request, *parts):
+    """Strong ETag over ``parts`` and the representation asked for."""
+    parts += (
+        request.get_host(),
+        request.META.get('HTTP_ACCEPT', ''),
+        request.GET.get('format', ''),
+    )
+    return '"%s"' % hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def _memoized(func):
+    """Compute ``(etag, last_modified)`` once per request."""
+    @wraps(func)
+    def inner(request, *args, **kwargs):
+        if not hasattr(request, '_api_validators'):
+            request._api_validators = func(request, *args, **kwargs)
+        return request._api_validators
+    return inner
+
+
+@_memoized
+def property_validators(request, pk):
+    row = Property.objects.filter(pk=pk, is_approved=True).values_list(
+        'updated_at', 'views_count',
+        'owner__first_name', 'owner__last_name', 'owner__username',
+    ).first()
+    if row is None:
+        return None, None
+    detail, amenities = detail_state(pk), amenity_state()
+    etag = _etag(request, 'property', pk, row, detail, amenities)
+    # Flushed views change the ETag but not Last-Modified
+    return etag, max(row[0], detail[1], amenities[1])
+
+
+@_memoized
+def listing_validators(request, *args, **kwargs):
+    state = listing_state()
+    etag = _etag(request, 'listings', request.GET.urlencode(), state)
+    return etag, state[1]
+
+
+@_memoized
+def amenity_validators(request, *args, **kwargs):
+    state = amenity_state()
+    etag = _etag(request, 'amenities', state)
+    return etag, state[1]
+
+
+def conditional(validators, max_age=0):
+    """
+    Answer conditional GETs from ``validators`` and set Cache-Control.
+
+    ``validators(request, *args, **kwargs)`` returns ``(etag,
+    last_modified)``. Clients may reuse a response for ``max_age``
+    seconds and must revalidate after that; responses to signed-in users
+    (the browsable API shows who is logged in) are private.
+    """
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=lambda *a, **kw: validators(*a, **kw)[0],
+            last_modified_func=lambda *a, **kw: validators(*a, **kw)[1],
+        )(view)
+
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                visibility = 'private' if request.user.is_authenticated else 'public'
+                patch_cache_control(
+                    response, max_age=max_age, must_revalidate=True, **{visibility: True}
+                )
+            return response
+        return inner
+    return decorator
@@ -0,0 +1,132 @@
+import gzip
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import MAP_COMPACT_FIELDS, MapPropertySerializer, compact_map_rows
+from api.views import _map_listings
+from properties.geohash import encode
+from properties.models import Amenity, Property, PropertyImage
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare payload size and build time of the full and compact '
+        'map_properties formats on synthetic listings. Nothing is kept: '
+        'the synthetic listings are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--markers', nargs='+', type=int, default=[500, 5000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        try:
+            with transaction.atomic():
+                ids = self._populate(max(options['markers']))
+                request = RequestFactory().get('/api/v1/properties/map/')
+                self.stdout.write(
+                    f'{"markers":>8}{"format":>9}{"bytes":>11}{"gzip":>9}{"build ms":>10}{"render ms":>11}'
+                )
+                for count in options['markers']:
+                    self._compare(ids[:count], request, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _compare(self, ids, request, repeat):
+        formats = {
+            'full': lambda: {'properties': MapPropertySerializer(
+                _map_listings(ids), many=True, context={'request': request},
+            ).data},
+            'compact': lambda: {
+                'fields': MAP_COMPACT_FIELDS, 'properties': compact_map_rows(ids),
+            },
+        }
+        renderer = JSONRenderer()
+        for label, build in formats.items():
+            payload, build_ms = self._time(build, repeat)
+            body, render_ms = self._time(lambda: renderer.render(payload), repeat)
+            self.stdout.write(
+                f'{len(ids):>8}{label:>9}{len(body):>11}{len(gzip.compress(body)):>9}'
+                f'{build_ms:>10.1f}{render_ms:>11.1f}'
+            )
+
+    @staticmethod
+    def _time(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
+
+    def _populate(self, size):
+        owner = get_user_model().objects.create(
+            username='map-benchmark', first_name='Map', last_name='Benchmark',
+        )
+        types = Property.PropertyType.values
+        listings = []
+        for i in range(size):
+            latitude = Decimal(f'{random.uniform(27.6, 27.8):.7f}')
+            longitude = Decimal(f'{random.uniform(85.2, 85.5):.7f}')
+            listings.append(Property(
+                owner=owner,
+                title=f'Benchmark listing {i}',
+                property_type=random.choice(types),
+                description='Bright room close to the ring road with water and parking. ' * 4,
+                district='Kathmandu',
+                municipality='Kathmandu Metropolitan City',
+                ward_number=str(random.randint(1, 32)),
+                address=f'Street {i}',
+                price=Decimal(random.randrange(2000, 150000, 500)),
+                num_rooms=random.randint(1, 6),
+                latitude=latitude,
+                longitude=longitude,
+                geohash=encode(latitude, longitude),
+                contact_phone='9800000000',
+                contact_email='owner@example.com',
+            ))
+        listings = Property.objects.bulk_create(listings, batch_size=5000)
+
+        # Image rows only; no files are needed to build their URLs
+        images = PropertyImage.objects.bulk_create([
+            PropertyImage(
+                property=listing,
+                image=f'properties/2026/01/listing-{listing.pk}.jpg',
+                is_primary=True,
+                renditions={
+                    name: {
+                        'width': width,
+                        'jpeg': f'renditions/{listing.pk}/{name}.jpg',
+                        'webp': f'renditions/{listing.pk}/{name}.webp',
+                    }
+                    for name, width in (('map', 320), ('card', 480), ('detail', 1280), ('full', 2048))
+                },
+            )
+            for listing in listings
+        ], batch_size=5000)
+        for listing, image in zip(listings, images):
+            listing.primary_image = image
+        Property.objects.bulk_update(listings, ['primary_image'], batch_size=5000)
+
+        amenities = list(Amenity.objects.all()[:6])
+        Property.amenities.through.objects.bulk_create([
+            Property.amenities.through(property_id=listing.pk, amenity_id=amenity.pk)
+            for listing in listings
+            for amenity in random.sample(amenities, min(len(amenities), 4))
+        ], batch_size=5000)
+        return [listing.pk for listing in listings]
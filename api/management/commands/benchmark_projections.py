@@ -0,0 +1,68 @@
+import json
+import random
+
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import MapPropertySerializer, PropertyListSerializer
+from api.views import _map_listings
+from properties.cache import load_listings
+from properties.models import Property
+from properties.projections import listing_rows, map_rows
+
+from .benchmark_map_payload import Command as MapPayloadCommand, _Rollback
+
+
+class Command(MapPayloadCommand):
+    help = (
+        'Compare building list and map payloads through the DRF serializers '
+        'and through the values() projections on synthetic listings, and '
+        'check both give the same JSON. The synthetic listings are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', nargs='+', type=int, default=[20, 500, 5000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        try:
+            with transaction.atomic():
+                ids = self._populate(max(options['rows']))
+                request = RequestFactory().get('/api/v1/properties/')
+                self.stdout.write(
+                    f'{"rows":>6}{"payload":>9}{"drf ms":>10}{"values ms":>11}{"speedup":>9}'
+                )
+                for count in options['rows']:
+                    self._compare(ids[:count], request, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _compare(self, ids, request, repeat):
+        context = {'request': request}
+        payloads = {
+            'list': (
+                lambda: PropertyListSerializer(load_listings(
+                    ids, Property.objects.select_related('owner', 'primary_image'),
+                ), many=True, context=context).data,
+                lambda: listing_rows(ids, request),
+            ),
+            'map': (
+                lambda: MapPropertySerializer(_map_listings(ids), many=True, context=context).data,
+                lambda: map_rows(ids, request),
+            ),
+        }
+        renderer = JSONRenderer()
+        for label, (serializer, projection) in payloads.items():
+            expected, drf_ms = self._time(serializer, repeat)
+            actual, values_ms = self._time(projection, repeat)
+            if json.loads(renderer.render(actual)) != json.loads(renderer.render(expected)):
+                raise CommandError(f'The {label} projection differs from its serializer.')
+            self.stdout.write(
+                f'{len(ids):>6}{label:>9}{drf_ms:>10.1f}{values_ms:>11.1f}'
+                f'{drf_ms / values_ms:>8.1f}x'
+            )
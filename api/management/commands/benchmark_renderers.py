@@ -0,0 +1,75 @@
+import json
+import random
+
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import MessagePackRenderer, ORJSONRenderer, msgpack, orjson
+from properties.models import Property
+from properties.projections import listing_rows, map_rows
+
+from .benchmark_map_payload import Command as MapPayloadCommand, _Rollback
+
+
+class Command(MapPayloadCommand):
+    help = (
+        'Compare rendering list and map payloads with DRF\'s JSONRenderer, '
+        'the orjson renderer and the MessagePack renderer on synthetic '
+        'listings, and check they encode the same values. The synthetic '
+        'listings are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', nargs='+', type=int, default=[12, 500, 5000])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson is required for the orjson renderer.')
+        random.seed(options['seed'])
+        renderers = {'json': JSONRenderer(), 'orjson': ORJSONRenderer()}
+        if msgpack is not None:
+            renderers['msgpack'] = MessagePackRenderer()
+        else:
+            self.stdout.write('msgpack is not installed; skipping MessagePack.')
+        try:
+            with transaction.atomic():
+                ids = self._populate(max(options['rows']))
+                request = RequestFactory().get('/api/v1/properties/')
+                self.stdout.write(
+                    f'{"rows":>6}{"payload":>10}{"renderer":>10}{"bytes":>11}{"ms":>9}{"speedup":>9}'
+                )
+                for count in options['rows']:
+                    payloads = self._payloads(ids[:count], request)
+                    for label, payload in payloads.items():
+                        self._compare(count, label, payload, renderers, options['repeat'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    @staticmethod
+    def _payloads(ids, request):
+        return {
+            'list': {'results': listing_rows(ids, request)},
+            'map': {'properties': map_rows(ids, request)},
+            # Raw column values: Decimal prices and coordinates, datetimes
+            'values': {'rows': list(Property.objects.filter(pk__in=ids).values(
+                'id', 'price', 'latitude', 'longitude', 'created_at', 'updated_at',
+            ))},
+        }
+
+    def _compare(self, count, label, payload, renderers, repeat):
+        baseline = None
+        for name, renderer in renderers.items():
+            body, ms = self._time(lambda: renderer.render(payload), repeat)
+            decoded = msgpack.unpackb(body) if name == 'msgpack' else json.loads(body)
+            if baseline is None:
+                baseline, baseline_ms = decoded, ms
+            elif decoded != baseline:
+                raise CommandError(f'{name} encodes the {label} payload differently.')
+            self.stdout.write(
+                f'{count:>6}{label:>10}{name:>10}{len(body):>11}{ms:>9.2f}{baseline_ms / ms:>8.1f}x'
+            )
@@ -0,0 +1,57 @@
+"""
+Response renderers faster than DRF's stdlib-json JSONRenderer.
+
+ORJSONRenderer is the default JSON renderer; MessagePackRenderer answers
+``Accept: application/msgpack`` (or ``?format=msgpack``) for the mobile
+app. Values orjson and msgpack cannot encode themselves (Decimal, lazy
+translations, querysets, and datetimes, which are passed through so they
+keep DRF's format) go through DRF's JSONEncoder, so both give the same
+values JSONRenderer would.
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer on orjson. Indented output, which the browsable API
+    asks for and orjson only offers at two spaces, and the case of
+    orjson not being installed are left to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        return orjson.dumps(
+            data,
+            default=_encode_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders MessagePack; needs the msgpack package."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_encode_default, use_bin_type=True)
@@ -3,6 +3,57 @@ from properties.models import Property, PropertyImage, Amenity
 from reviews.models import Review
 
 
+def _absolute_url(context, url):
+    request = context.get('request')
+    return request.build_absolute_uri(url) if request else url
+
+
+def rendition_urls(image, context):
+    """Rendition sizes and URLs of a PropertyImage, keyed by rendition name."""
+    storage = image.image.storage
+    return {
+        name: {
+            key: _absolute_url(context, storage.url(value)) if key in ('jpeg', 'webp') else value
+            for key, value in rendition.items()
+        }
+        for name, rendition in image.renditions.items()
+    }
+
+
+# Column order of the compact map marker rows
+MAP_COMPACT_FIELDS = ('id', 'latitude', 'longitude', 'price', 'property_type', 'thumbnail')
+
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def compact_map_rows(ids):
+    """
+    Marker rows for the listings ``ids``, in that order, with the columns
+    of MAP_COMPACT_FIELDS. Read with values_list, so no model instances
+    or related objects are built; the thumbnail is a relative URL.
+    """
+    rows = Property.objects.filter(pk__in=ids).values_list(
+        'id', 'latitude', 'longitude', 'price', 'property_type',
+        'primary_image__image', 'primary_image__renditions',
+    )
+    by_id = {row[0]: row for row in rows}
+    storage = PropertyImage._meta.get_field('image').storage
+    compact = []
+    for pk in ids:
+        if pk not in by_id:
+            continue
+        _, latitude, longitude, price, property_type, image, renditions = by_id[pk]
+        path = (renditions or {}).get('map', {}).get('jpeg') or image
+        compact.append([
+            pk, float(latitude), float(longitude), _number(price), property_type,
+            storage.url(path) if path else None,
+        ])
+    return compact
+
+
 class AmenitySerializer(serializers.ModelSerializer):
     class Meta:
         model = Amenity
@@ -10,16 +61,22 @@ class AmenitySerializer(serializers.ModelSerializer):
 
 
 class PropertyImageSerializer(serializers.ModelSerializer):
+    renditions = serializers.SerializerMethodField()
+
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'caption', 'is_primary']
+        fields = ['id', 'image', 'caption', 'is_primary', 'renditions']
+
+    def get_renditions(self, obj):
+        return rendition_urls(obj, self.context)
 
 
 class PropertyListSerializer(serializers.ModelSerializer):
     """Lightweight serializer for list views and map markers."""
     primary_image = serializers.SerializerMethodField()
+    primary_image_renditions = serializers.SerializerMethodField()
     average_rating = serializers.FloatField(read_only=True)
-    review_count = serializers.IntegerField(read_only=True)
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
     property_type_display = serializers.CharField(
         source='get_property_type_display', read_only=True
     )
@@ -32,18 +89,19 @@ class PropertyListSerializer(serializers.ModelSerializer):
             'district', 'municipality', 'ward_number', 'address',
             'price', 'num_rooms', 'rental_purpose', 'latitude', 'longitude',
             'status', 'average_rating', 'review_count', 'primary_image',
-            'owner_name', 'created_at',
+            'primary_image_renditions', 'owner_name', 'created_at',
         ]
 
     def get_primary_image(self, obj):
         img = obj.primary_image
         if img:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(img.image.url)
-            return img.image.url
+            return _absolute_url(self.context, img.rendition_url('card'))
         return None
 
+    def get_primary_image_renditions(self, obj):
+        img = obj.primary_image
+        return rendition_urls(img, self.context) if img else {}
+
     def get_owner_name(self, obj):
         return obj.owner.get_full_name() or obj.owner.username
 
@@ -53,7 +111,7 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
     images = PropertyImageSerializer(many=True, read_only=True)
     amenities = AmenitySerializer(many=True, read_only=True)
     average_rating = serializers.FloatField(read_only=True)
-    review_count = serializers.IntegerField(read_only=True)
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
     property_type_display = serializers.CharField(
         source='get_property_type_display', read_only=True
     )
@@ -78,8 +136,9 @@ class PropertyDetailSerializer(serializers.ModelSerializer):
 class MapPropertySerializer(serializers.ModelSerializer):
     """Enhanced serializer for map markers with full property details."""
     primary_image = serializers.SerializerMethodField()
-    average_rating = serializers.SerializerMethodField()
-    review_count = serializers.SerializerMethodField()
+    primary_image_renditions = serializers.SerializerMethodField()
+    average_rating = serializers.FloatField(read_only=True)
+    review_count = serializers.IntegerField(source='rating_count', read_only=True)
     property_type_display = serializers.CharField(
         source='get_property_type_display', read_only=True
     )
@@ -98,7 +157,7 @@ class MapPropertySerializer(serializers.ModelSerializer):
             'district', 'municipality', 'ward_number', 'address',
             'price', 'latitude', 'longitude', 'num_rooms',
             'average_rating', 'review_count', 'primary_image',
-            'rental_purpose', 'rental_purpose_display', 'owner_name',
+            'primary_image_renditions', 'rental_purpose', 'rental_purpose_display', 'owner_name',
             'amenities', 'short_description', 'url', 'status',
             'contact_phone', 'contact_email', 'description',
         ]
@@ -106,17 +165,12 @@ class MapPropertySerializer(serializers.ModelSerializer):
     def get_primary_image(self, obj):
         img = obj.primary_image
         if img:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(img.image.url)
-            return img.image.url
+            return _absolute_url(self.context, img.rendition_url('map'))
         return None
 
-    def get_average_rating(self, obj):
-        return obj.average_rating or 0
-
-    def get_review_count(self, obj):
-        return obj.review_count or 0
+    def get_primary_image_renditions(self, obj):
+        img = obj.primary_image
+        return rendition_urls(img, self.context) if img else {}
 
     def get_owner_name(self, obj):
         return obj.owner.get_full_name() or obj.owner.username
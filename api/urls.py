@@ -6,7 +6,13 @@ app_name = 'api'
 urlpatterns = [
     path('properties/', views.PropertyListAPIView.as_view(), name='property_list'),
     path('properties/map/', views.map_properties, name='map_properties'),
+    path('properties/map/clusters/', views.map_clusters_view, name='map_clusters'),
+    path('properties/nearby/', views.nearby_properties, name='nearby_properties'),
+    path('properties/cards/', views.property_cards, name='property_cards'),
+    path('properties/facets/', views.property_facets, name='property_facets'),
     path('properties/<int:pk>/', views.PropertyDetailAPIView.as_view(), name='property_detail'),
+    path('tiles.json', views.tilejson, name='tilejson'),
+    path('tiles/<int:z>/<int:x>/<int:y>.mvt', views.vector_tile, name='vector_tile'),
     path('amenities/', views.amenities_list, name='amenities'),
     path('search/suggestions/', views.search_suggestions, name='search_suggestions'),
 ]
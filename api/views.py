@@ -1,185 +1,418 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from django.utils.decorators import method_decorator
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
-from django.db.models import Q, Avg, Count
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.utils.urls import replace_query_param
 from properties.models import Property, Amenity
+from properties.cache import cached_listing_results, load_listings
+from properties.clusters import MAX_ZOOM, InvalidViewport, map_clusters, parse_viewport
+from properties.facets import listing_facets
+from properties.nearby import InvalidLocation, nearest_listings, parse_nearby
+from properties.pagination import InvalidCursor, keyset_paginate
+from properties.projections import listing_rows, map_rows
+from properties.search import SearchSpec, autocomplete_suggestions
+from properties.sync import InvalidSyncToken, listing_changes, sync_token
+from properties.tiles import LAYERS as TILE_LAYERS, InvalidTile, listing_tile, tile_version
+from properties.viewport import viewport_ids
+from .conditional import (
+    amenity_validators,
+    conditional,
+    listing_validators,
+    property_validators,
+)
 from .serializers import (
+    MAP_COMPACT_FIELDS,
+    compact_map_rows,
     PropertyListSerializer,
     PropertyDetailSerializer,
     MapPropertySerializer,
     AmenitySerializer,
 )
 
+# Most listings one property_cards request may ask for
+MAX_CARDS = 50
+
 
 class StandardPagination(PageNumberPagination):
+    """
+    Page-number pagination. When the view exposes a SearchSpec as ``spec``
+    pages are served from the listing result cache and the total from the
+    count service, and the response says whether the total is approximate.
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count_is_approximate = False
+        spec = getattr(view, 'spec', None)
+        if spec is not None:
+            queryset = cached_listing_results(spec, queryset)
+            self.count_is_approximate = queryset.count_is_approximate
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_approximate'] = self.count_is_approximate
+        return response
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the queryset's own ordering (see
+    properties.pagination). Every page costs the same regardless of depth,
+    and no COUNT(*) is issued.
+    """
+    cursor_query_param = 'cursor'
     page_size = 12
     page_size_query_param = 'page_size'
     max_page_size = 50
 
+    def paginate_queryset(self, queryset, request, view=None, scope=''):
+        self.request = request
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            size = self.page_size
+        size = max(1, min(size, self.max_page_size))
+        cursor = request.query_params.get(self.cursor_query_param)
+        try:
+            self.page = keyset_paginate(queryset, cursor, size, scope=scope)
+        except InvalidCursor as exc:
+            raise NotFound(str(exc))
+        return list(self.page)
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self._link(self.page.next_cursor),
+            'previous': self._link(self.page.previous_cursor),
+            'results': data,
+        })
+
 
 class PropertyListAPIView(generics.ListAPIView):
-    """API endpoint for listing properties with filtering."""
+    """
+    API endpoint for listing properties with filtering.
+
+    Uses page-number pagination by default; pass ``?pagination=cursor`` (or
+    follow a ``cursor`` link) for keyset pagination suited to infinite scroll.
+
+    Every page carries a ``sync_token``. With ``?since=<token>`` the
+    response instead holds the matching listings changed since then
+    (``results``) and the IDs of changed listings that no longer match
+    (``removed``), unpaginated; follow ``has_more`` until it is false.
+    An expired token gets a normal first page with ``reset`` set.
+    """
     serializer_class = PropertyListSerializer
-    pagination_class = StandardPagination
 
-    def get_queryset(self):
-        qs = Property.objects.filter(
-            status=Property.Status.AVAILABLE,
-            is_approved=True,
-        ).select_related('owner').prefetch_related('images', 'reviews')
-
-        # Apply filters from query params
-        params = self.request.query_params
-
-        keyword = params.get('keyword')
-        if keyword:
-            qs = qs.filter(
-                Q(title__icontains=keyword) | Q(description__icontains=keyword)
+    @property
+    def spec(self):
+        if not hasattr(self, '_spec'):
+            self._spec = SearchSpec.from_params(self.request.query_params)
+        return self._spec
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params
+            if 'cursor' in params or params.get('pagination') == 'cursor':
+                self._paginator = KeysetPagination()
+            else:
+                self._paginator = StandardPagination()
+        return self._paginator
+
+    def paginate_queryset(self, queryset):
+        if isinstance(self.paginator, KeysetPagination):
+            return self.paginator.paginate_queryset(
+                queryset, self.request, view=self, scope=self.spec.cache_key,
             )
+        return super().paginate_queryset(queryset)
 
-        district = params.get('district')
-        if district:
-            qs = qs.filter(district__icontains=district)
-
-        municipality = params.get('municipality')
-        if municipality:
-            qs = qs.filter(municipality__icontains=municipality)
-
-        ward = params.get('ward_number')
-        if ward:
-            qs = qs.filter(ward_number=ward)
-
-        prop_type = params.get('property_type')
-        if prop_type:
-            qs = qs.filter(property_type=prop_type)
-
-        min_price = params.get('min_price')
-        if min_price:
-            qs = qs.filter(price__gte=min_price)
-
-        max_price = params.get('max_price')
-        if max_price:
-            qs = qs.filter(price__lte=max_price)
-
-        num_rooms = params.get('num_rooms')
-        if num_rooms:
-            qs = qs.filter(num_rooms__gte=num_rooms)
-
-        rental_purpose = params.get('rental_purpose')
-        if rental_purpose:
-            qs = qs.filter(rental_purpose=rental_purpose)
-
-        amenities = params.getlist('amenities')
-        if amenities:
-            for a in amenities:
-                qs = qs.filter(amenities__name__icontains=a)
-
-        # Sorting
-        sort = params.get('sort', '-created_at')
-        if sort == 'price_asc':
-            qs = qs.order_by('price')
-        elif sort == 'price_desc':
-            qs = qs.order_by('-price')
-        elif sort == 'newest':
-            qs = qs.order_by('-created_at')
-        elif sort == 'rating':
-            qs = qs.annotate(avg_rating=Avg('reviews__rating')).order_by('-avg_rating')
+    def get_queryset(self):
+        if _browsable(self.request):
+            return self.spec.to_queryset(related=('owner', 'primary_image'))
+        # Pages need only IDs (and sort keys, for cursors); the rows are
+        # projected from values() once the page is known
+        sort_fields = {order.lstrip('-') for order in self.spec.ordering()} - {'search_rank'}
+        return self.spec.to_queryset().only(*sort_fields)
+
+    def list(self, request, *args, **kwargs):
+        browsable = _browsable(request)
+        changes = _listing_changes(self.spec, request)
+        if changes is not None:
+            if browsable:
+                listings = load_listings(changes['ids'], self.get_queryset())
+                results = self.get_serializer(listings, many=True).data
+            else:
+                results = listing_rows(changes['ids'], request)
+            return Response({
+                'sync_token': changes['sync_token'],
+                'has_more': changes['has_more'],
+                'results': results,
+                'removed': changes['removed'],
+            })
+
+        token = sync_token()
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        if browsable:
+            results = self.get_serializer(page, many=True).data
         else:
-            qs = qs.order_by('-created_at')
-
-        return qs
+            results = listing_rows([listing.pk for listing in page], request)
+        response = self.get_paginated_response(results)
+        response.data['sync_token'] = token
+        if request.query_params.get('since'):
+            response.data['reset'] = True
+        return response
 
 
+@method_decorator(conditional(property_validators), name='dispatch')
 class PropertyDetailAPIView(generics.RetrieveAPIView):
     """API endpoint for property details."""
     serializer_class = PropertyDetailSerializer
     queryset = Property.objects.filter(
         is_approved=True
-    ).select_related('owner').prefetch_related('images', 'amenities', 'reviews')
+    ).select_related('owner').prefetch_related('images', 'amenities')
+
 
+def _listing_changes(spec, request):
+    """
+    The delta for a ``?since=`` request, or None when the request has no
+    token or its token has expired and a full response is due.
+    """
+    since = request.query_params.get('since')
+    if not since:
+        return None
+    try:
+        return listing_changes(spec, since)
+    except InvalidSyncToken as exc:
+        raise ValidationError({'since': str(exc)})
 
+
+def _browsable(request):
+    """Whether the response goes to the browsable API rather than a client."""
+    return isinstance(request.accepted_renderer, BrowsableAPIRenderer)
+
+
+def _map_listings(ids, queryset=Property.objects.all()):
+    return load_listings(
+        ids,
+        queryset.select_related('owner', 'primary_image').prefetch_related('amenities'),
+    )
+
+
+def _map_cards(ids, request, queryset=None):
+    """
+    Map cards for those of ``ids`` in ``queryset``, in order: projected
+    from values() for clients, through MapPropertySerializer for the
+    browsable API.
+    """
+    if not _browsable(request):
+        return map_rows(ids, request, queryset)
+    listings = _map_listings(ids) if queryset is None else _map_listings(ids, queryset)
+    return MapPropertySerializer(listings, many=True, context={'request': request}).data
+
+
+@conditional(listing_validators)
 @api_view(['GET'])
 def map_properties(request):
-    """Return all available properties for map display with enhanced filtering."""
-    qs = Property.objects.filter(
-        status=Property.Status.AVAILABLE,
-        is_approved=True,
-    ).select_related('owner').prefetch_related('images', 'reviews', 'amenities')
-
-    # Location filters
-    district = request.query_params.get('district')
-    if district:
-        qs = qs.filter(district__icontains=district)
-
-    municipality = request.query_params.get('municipality')
-    if municipality:
-        qs = qs.filter(municipality__icontains=municipality)
-
-    # Property type filter
-    prop_type = request.query_params.get('property_type')
-    if prop_type:
-        qs = qs.filter(property_type=prop_type)
-
-    # Price range filters
-    min_price = request.query_params.get('min_price')
-    if min_price:
-        qs = qs.filter(price__gte=min_price)
-
-    max_price = request.query_params.get('max_price')
-    if max_price:
-        qs = qs.filter(price__lte=max_price)
-
-    # Room filter
-    num_rooms = request.query_params.get('num_rooms')
-    if num_rooms:
-        qs = qs.filter(num_rooms__gte=num_rooms)
-
-    # Rental purpose filter
-    rental_purpose = request.query_params.get('rental_purpose')
-    if rental_purpose:
-        qs = qs.filter(rental_purpose=rental_purpose)
-
-    # Rating filter
-    min_rating = request.query_params.get('min_rating')
-    if min_rating:
-        qs = qs.filter(average_rating__gte=float(min_rating))
-
-    # Bounding box filter for map viewport
-    ne_lat = request.query_params.get('ne_lat')
-    ne_lng = request.query_params.get('ne_lng')
-    sw_lat = request.query_params.get('sw_lat')
-    sw_lng = request.query_params.get('sw_lng')
-
-    if all([ne_lat, ne_lng, sw_lat, sw_lng]):
-        qs = qs.filter(
-            latitude__gte=float(sw_lat),
-            latitude__lte=float(ne_lat),
-            longitude__gte=float(sw_lng),
-            longitude__lte=float(ne_lng),
-        )
-
-    # Only return properties with coordinates for mapping
-    has_coords = request.query_params.get('has_coords', 'true')
-    if has_coords == 'true':
-        qs = qs.exclude(latitude__isnull=True).exclude(longitude__isnull=True)
-
-    # Sorting
-    sort_by = request.query_params.get('sort', '-created_at')
-    allowed_sorts = ['price', '-price', 'average_rating', '-average_rating', '-created_at', 'created_at']
-    if sort_by in allowed_sorts:
-        qs = qs.order_by(sort_by)
+    """
+    Return available properties for map display with enhanced filtering.
+
+    A viewport (``sw_lat``/``sw_lng``/``ne_lat``/``ne_lng``) is snapped
+    outwards to the geohash tiles covering it and answered from per-tile
+    caches, cut back to the viewport itself; ``bbox`` in the response is
+    the snapped box the tiles span.
+
+    With ``compact=true`` each marker is a row of the columns listed in
+    ``fields`` (id, position, price, type and thumbnail); clients fetch
+    the full cards on demand from ``properties/cards/``.
+
+    ``?since=<sync_token>`` returns only the markers changed since the
+    response that carried the token, plus ``removed`` IDs to drop (see
+    PropertyListAPIView).
+    """
+    spec = SearchSpec.from_params(request.query_params, has_coords='true')
+    compact = request.query_params.get('compact') == 'true'
+
+    def serialize(ids):
+        if compact:
+            return compact_map_rows(ids)
+        return _map_cards(ids, request)
+
+    changes = _listing_changes(spec, request)
+    if changes is not None:
+        return Response({
+            'sync_token': changes['sync_token'],
+            'has_more': changes['has_more'],
+            **({'fields': MAP_COMPACT_FIELDS} if compact else {}),
+            'properties': serialize(changes['ids']),
+            'removed': changes['removed'],
+        })
 
     # Limit results
-    limit = min(int(request.query_params.get('limit', 200)), 500)
+    limit = min(int(request.query_params.get('limit', 200)), settings.MAP_VIEWPORT_MAX_RESULTS)
+
+    extra = {'sync_token': sync_token()}
+    if request.query_params.get('since'):
+        extra['reset'] = True
+    if spec.bbox:
+        ids, count, extra['bbox'] = viewport_ids(spec, limit)
+        approximate = False
+    else:
+        results = cached_listing_results(spec, spec.to_queryset())
+        ids = results.head_ids(limit)
+        count, approximate = results.count, results.count_is_approximate
+
+    if compact:
+        extra['fields'] = MAP_COMPACT_FIELDS
+    properties = serialize(ids)
+    return Response({
+        'count': count,
+        'count_is_approximate': approximate,
+        **extra,
+        'properties': properties,
+    })
+
 
-    serializer = MapPropertySerializer(qs[:limit], many=True, context={'request': request})
+@conditional(listing_validators)
+@api_view(['GET'])
+def property_cards(request):
+    """
+    Return full map cards for up to MAX_CARDS listings in one request,
+    for markers received in compact form: ``?ids=3,17,42``.
+    """
+    try:
+        ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk]
+    except ValueError:
+        raise ValidationError({'ids': 'Expected a comma-separated list of IDs.'})
+    if len(ids) > MAX_CARDS:
+        raise ValidationError({'ids': f'At most {MAX_CARDS} IDs per request.'})
+    properties = _map_cards(
+        list(dict.fromkeys(ids)), request, Property.objects.filter(is_approved=True),
+    )
+    return Response({'properties': properties})
+
+
+@conditional(listing_validators)
+@api_view(['GET'])
+def nearby_properties(request):
+    """
+    Return the ``k`` listings nearest to ``lat``/``lng`` within ``radius``
+    km, nearest first, each with its ``distance_km``. The usual list
+    filters apply.
+    """
+    spec = SearchSpec.from_params(request.query_params)
+    try:
+        latitude, longitude, radius, k = parse_nearby(request.query_params)
+    except InvalidLocation as exc:
+        raise ValidationError({'detail': str(exc)})
+
+    hits = nearest_listings(spec, latitude, longitude, radius, k)
+    distances = dict(hits)
+    # Loading through the listed queryset drops anything unlisted since
+    # this process's index was last refreshed
+    properties = _map_cards([pk for pk, _ in hits], request, spec.to_queryset())
+    for item in properties:
+        item['distance_km'] = round(distances[item['id']], 3)
     return Response({
-        'count': qs.count(),
-        'properties': serializer.data
+        'count': len(properties),
+        'radius_km': radius,
+        'properties': properties,
     })
 
 
+@conditional(listing_validators)
+@api_view(['GET'])
+def map_clusters_view(request):
+    """
+    Return pre-aggregated marker clusters for a map viewport.
+
+    Takes ``zoom`` and ``bbox=west,south,east,north`` plus the usual list
+    filters; sparse cells come back as individual markers.
+    """
+    spec = SearchSpec.from_params(request.query_params)
+    try:
+        zoom, bbox = parse_viewport(request.query_params)
+        return Response(map_clusters(spec, zoom, bbox))
+    except InvalidViewport as exc:
+        raise ValidationError({'detail': str(exc)})
+
+
+@api_view(['GET'])
+def tilejson(request):
+    """
+    Describe the listing vector tiles (TileJSON 3.0).
+
+    The tile URL template carries the current catalogue version and the
+    request's list filters; tiles fetched through it never change, so
+    clients and proxies may keep them indefinitely.
+    """
+    params = request.query_params.copy()
+    params['v'] = tile_version()
+    template = request.build_absolute_uri(
+        reverse('api:vector_tile', kwargs={'z': 0, 'x': 0, 'y': 0})
+    ).replace('/0/0/0.mvt', '/{z}/{x}/{y}.mvt')
+    return Response({
+        'tilejson': '3.0.0',
+        'tiles': [f'{template}?{params.urlencode(safe="")}'],
+        'minzoom': 0,
+        'maxzoom': MAX_ZOOM,
+        'vector_layers': [
+            {'id': layer, 'fields': fields}
+            for layer, fields in TILE_LAYERS.items()
+        ],
+    })
+
+
+def vector_tile(request, z, x, y):
+    """
+    Serve one Mapbox Vector Tile of listing clusters and markers.
+
+    Requests naming the current version (``?v=`` from ``tiles.json``) are
+    cacheable for a year: the version is global (see properties.tiles)
+    and changes with any write, so a versioned URL never changes content.
+    Others must revalidate against the ETag.
+    """
+    spec = SearchSpec.from_params(request.GET)
+    try:
+        version, tile = listing_tile(spec, z, x, y)
+    except (InvalidTile, InvalidViewport) as exc:
+        raise Http404(str(exc))
+
+    etag = quote_etag(f'{version}:{spec.cache_key}:{z}/{x}/{y}')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(tile, content_type='application/vnd.mapbox-vector-tile')
+    response['ETag'] = etag
+    if request.GET.get('v') == version:
+        patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    return response
+
+
+@api_view(['GET'])
+def property_facets(request):
+    """Return sidebar facet counts for the listings matching the list filters."""
+    spec = SearchSpec.from_params(request.query_params)
+    return Response(listing_facets(spec))
+
+
+@conditional(amenity_validators, max_age=300)
 @api_view(['GET'])
 def amenities_list(request):
     """Return all available amenities."""
@@ -195,28 +428,5 @@ def search_suggestions(request):
     if len(q) < 2:
         return Response([])
 
-    districts = Property.objects.filter(
-        district__icontains=q,
-        status=Property.Status.AVAILABLE,
-        is_approved=True,
-    ).values_list('district', flat=True).distinct()[:5]
-
-    municipalities = Property.objects.filter(
-        municipality__icontains=q,
-        status=Property.Status.AVAILABLE,
-        is_approved=True,
-    ).values_list('municipality', flat=True).distinct()[:5]
-
-    titles = Property.objects.filter(
-        title__icontains=q,
-        status=Property.Status.AVAILABLE,
-        is_approved=True,
-    ).values_list('title', flat=True)[:5]
-
-    suggestions = (
-        [{'type': 'district', 'value': d} for d in districts] +
-        [{'type': 'municipality', 'value': m} for m in municipalities if m] +
-        [{'type': 'property', 'value': t} for t in titles]
-    )
-
+    suggestions = autocomplete_suggestions(q)
     return Response(suggestions[:10])
@@ -7,7 +7,8 @@ try:
 except ImportError:
     OpenAI = None
 
-from properties.models import Property, Amenity
+from properties.models import Amenity
+from properties.search import SearchSpec
 
 
 SYSTEM_PROMPT = """You are SPRS Assistant, an intelligent chatbot for the Smart Property Rental System in Nepal.
@@ -110,31 +111,8 @@ def search_properties_with_filters(filters):
     if not filters:
         return []
 
-    qs = Property.objects.filter(
-        status=Property.Status.AVAILABLE,
-        is_approved=True,
-    ).select_related('owner').prefetch_related('images')
-
-    if filters.get('district'):
-        qs = qs.filter(district__icontains=filters['district'])
-    if filters.get('municipality'):
-        qs = qs.filter(municipality__icontains=filters['municipality'])
-    if filters.get('ward_number'):
-        qs = qs.filter(ward_number=filters['ward_number'])
-    if filters.get('property_type'):
-        qs = qs.filter(property_type=filters['property_type'])
-    if filters.get('max_price'):
-        qs = qs.filter(price__lte=filters['max_price'])
-    if filters.get('min_price'):
-        qs = qs.filter(price__gte=filters['min_price'])
-    if filters.get('num_rooms'):
-        qs = qs.filter(num_rooms__gte=filters['num_rooms'])
-    if filters.get('rental_purpose'):
-        qs = qs.filter(rental_purpose=filters['rental_purpose'])
-    if filters.get('amenities'):
-        for amenity_name in filters['amenities']:
-            qs = qs.filter(amenities__name__icontains=amenity_name)
-
+    spec = SearchSpec.from_filters(filters)
+    qs = spec.to_queryset(related=('primary_image',))
     return qs[:10]
 
 
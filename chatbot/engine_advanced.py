@@ -5,9 +5,9 @@ Powered by OpenAI GPT for intelligent property search and recommendations
 
 import json
 import re
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
 from django.conf import settings
-from django.db.models import Q, Avg, Count
+from django.db.models import Q, Avg
 from django.urls import reverse
 
 try:
@@ -16,6 +16,12 @@ except ImportError:
     OpenAI = None
 
 from properties.models import Property, Amenity
+from properties.nearby import nearest_listings
+from properties.projections import MediaUrls, PROPERTY_TYPE_LABELS
+from properties.search import SearchSpec
+
+# Search radius (km) around the user's position when the widget shares one
+NEARBY_RADIUS_KM = 5.0
 
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -243,7 +249,7 @@ def _validate_filters(filters: Optional[Dict]) -> Optional[Dict]:
         valid_filters['rental_purpose'] = filters['rental_purpose']
     
     # String fields
-    for field in ['district', 'municipality', 'ward_number']:
+    for field in ['keyword', 'district', 'municipality', 'ward_number']:
         if filters.get(field):
             valid_filters[field] = str(filters[field]).strip()
     
@@ -262,84 +268,93 @@ def _validate_filters(filters: Optional[Dict]) -> Optional[Dict]:
     return valid_filters if valid_filters else None
 
 
+def _user_point(user_location: Optional[Dict]) -> Optional[Tuple[float, float]]:
+    """(lat, lng) from the chat widget's location, if it sent valid coordinates."""
+    if not isinstance(user_location, dict):
+        return None
+    try:
+        lat = float(user_location.get('lat'))
+        lng = float(user_location.get('lng'))
+    except (TypeError, ValueError):
+        return None
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return lat, lng
+    return None
+
+
 def search_properties_advanced(
     filters: Optional[Dict],
     limit: int = 10,
-    include_recommendations: bool = True
+    include_recommendations: bool = True,
+    user_location: Optional[Dict] = None,
 ) -> List[Dict]:
     """
     Advanced property search with recommendations.
     Returns formatted property data ready for display.
+
+    When ``user_location`` carries lat/lng, matches within NEARBY_RADIUS_KM
+    come back nearest first with their ``distance_km``; if there are none
+    the usual relevance order is used.
     """
     if not filters:
         return []
     
-    qs = Property.objects.filter(
-        status=Property.Status.AVAILABLE,
-        is_approved=True,
-    ).select_related('owner').prefetch_related('images', 'reviews', 'amenities')
-    
-    # Apply filters
-    if filters.get('district'):
-        qs = qs.filter(district__icontains=filters['district'])
-    
-    if filters.get('municipality'):
-        qs = qs.filter(municipality__icontains=filters['municipality'])
-    
-    if filters.get('ward_number'):
-        qs = qs.filter(ward_number=filters['ward_number'])
-    
-    if filters.get('property_type'):
-        qs = qs.filter(property_type=filters['property_type'])
-    
-    if filters.get('max_price'):
-        qs = qs.filter(price__lte=filters['max_price'])
-    
-    if filters.get('min_price'):
-        qs = qs.filter(price__gte=filters['min_price'])
-    
-    if filters.get('num_rooms'):
-        qs = qs.filter(num_rooms__gte=filters['num_rooms'])
-    
-    if filters.get('rental_purpose'):
-        qs = qs.filter(rental_purpose=filters['rental_purpose'])
-    
-    if filters.get('amenities'):
-        for amenity in filters['amenities']:
-            qs = qs.filter(amenities__name__icontains=amenity)
-    
-    # Order by relevance (rating, views, recency)
-    qs = qs.annotate(
-        avg_rating=Avg('reviews__rating')
-    ).order_by('-avg_rating', '-views_count', '-created_at')
+    spec = SearchSpec.from_filters(filters)
+
+    point = _user_point(user_location)
+    if point:
+        hits = nearest_listings(spec, point[0], point[1], NEARBY_RADIUS_KM, limit)
+        if hits:
+            distances = dict(hits)
+            results = _format_properties_for_chat(spec.to_queryset(), [pk for pk, _ in hits])
+            for item in results:
+                item['distance_km'] = round(distances[item['id']], 2)
+            return results
+
+    # Order by relevance (text match, rating, views, recency)
+    qs = spec.to_queryset(default_sort='popular')
     
     properties = qs[:limit]
     
     return _format_properties_for_chat(properties)
 
 
-def _format_properties_for_chat(properties) -> List[Dict]:
-    """Format property objects for chat display."""
+def _format_properties_for_chat(properties, ids: Optional[List[int]] = None) -> List[Dict]:
+    """
+    Format listings for chat display, from one values_list() query over
+    the ``properties`` queryset: in its order, or in the order of ``ids``
+    (skipping those it does not contain) when given.
+    """
+    rows = properties.values_list(
+        'id', 'title', 'price', 'district', 'municipality', 'property_type',
+        'num_rooms', 'rating_avg', 'rating_count', 'latitude', 'longitude',
+        'primary_image__image', 'primary_image__renditions',
+    )
+    if ids is not None:
+        by_id = {row[0]: row for row in rows.order_by().filter(pk__in=ids)}
+        rows = [by_id[pk] for pk in ids if pk in by_id]
+    urls = MediaUrls()
     result = []
     
-    for prop in properties:
-        primary_img = prop.images.first()
-        
+    for (
+        pk, title, price, district, municipality, property_type, num_rooms,
+        rating_avg, rating_count, latitude, longitude, image, renditions,
+    ) in rows:
         result.append({
-            'id': prop.id,
-            'title': prop.title,
-            'price': float(prop.price),
-            'district': prop.district,
-            'municipality': prop.municipality,
-            'property_type': prop.get_property_type_display(),
-            'num_rooms': prop.num_rooms,
-            'rating': prop.average_rating,
-            'review_count': prop.review_count,
-            'image': primary_img.image.url if primary_img else None,
-            'url': reverse('properties:detail', kwargs={'pk': prop.pk}),
-            'has_location': prop.has_location,
-            'latitude': float(prop.latitude) if prop.latitude else None,
-            'longitude': float(prop.longitude) if prop.longitude else None,
+            'id': pk,
+            'title': title,
+            'price': float(price),
+            'district': district,
+            'municipality': municipality,
+            'property_type': PROPERTY_TYPE_LABELS.get(property_type, property_type),
+            'num_rooms': num_rooms,
+            'rating': round(rating_avg, 1) if rating_count else 0,
+            'review_count': rating_count,
+            'image': urls.rendition(image, renditions, 'card') if image is not None else None,
+            'url': reverse('properties:detail', kwargs={'pk': pk}),
+            'has_location': latitude is not None and longitude is not None,
+            'latitude': float(latitude) if latitude else None,
+            'longitude': float(longitude) if longitude else None,
         })
     
     return result
@@ -359,7 +374,7 @@ def get_property_recommendations(
     qs = Property.objects.filter(
         status=Property.Status.AVAILABLE,
         is_approved=True,
-    ).select_related('owner').prefetch_related('images', 'reviews')
+    )
     
     # Exclude already viewed
     if viewed_properties:
@@ -375,10 +390,7 @@ def get_property_recommendations(
             qs = qs.filter(property_type=user_preferences['property_type'])
     
     # Order by popularity and rating
-    qs = qs.annotate(
-        avg_rating=Avg('reviews__rating'),
-        num_reviews=Count('reviews')
-    ).order_by('-avg_rating', '-views_count', '-num_reviews')
+    qs = qs.order_by('-rating_avg', '-views_count', '-rating_count')
     
     return _format_properties_for_chat(qs[:limit])
 
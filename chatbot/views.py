@@ -58,7 +58,9 @@ def chat(request):
     if result.get('filters'):
         try:
             if USE_ADVANCED:
-                properties = search_properties_advanced(result['filters'], limit=8)
+                properties = search_properties_advanced(
+                    result['filters'], limit=8, user_location=user_location,
+                )
             else:
                 # Legacy format
                 qs = search_properties_with_filters(result['filters'])
@@ -74,7 +76,7 @@ def chat(request):
                         'price': str(prop.price),
                         'num_rooms': prop.num_rooms,
                         'rating': prop.average_rating,
-                        'image': img.image.url if img else None,
+                        'image': img.rendition_url('card') if img else None,
                         'url': prop.get_absolute_url(),
                         'has_location': prop.has_location,
                         'latitude': float(prop.latitude) if prop.latitude else None,
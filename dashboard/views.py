@@ -1,11 +1,24 @@
+from datetime import timedelta
+
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
-from properties.models import Property, PropertyRequest
+from properties.models import Property, PropertyDailyStats, PropertyRequest
+from properties.viewcounts import pending_view_counts
 from messaging.models import Conversation, Message
 from favorites.models import Favorite
 from reviews.models import Review
 from notifications.models import Notification
-from django.db.models import Q
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+ENGAGEMENT_DAYS = 30
+FUNNEL_STEPS = [
+    ('views', 'Views'),
+    ('favorites', 'Favorites'),
+    ('conversations', 'Conversations'),
+    ('requests', 'Requests'),
+    ('approvals', 'Approvals'),
+]
 
 
 @login_required
@@ -63,7 +76,7 @@ def tenant_dashboard(request):
     recent_properties = Property.objects.filter(
         status=Property.Status.AVAILABLE,
         is_approved=True,
-    ).select_related('owner')[:6]
+    ).select_related('owner', 'primary_image')[:6]
 
     context = {
         'conversations': conversations,
@@ -76,18 +89,66 @@ def tenant_dashboard(request):
     return render(request, 'dashboard/tenant.html', context)
 
 
+def engagement_summary(owner, days=ENGAGEMENT_DAYS, width=300, height=60):
+    """
+    Daily view sparkline and engagement funnel for an owner's listings.
+
+    Reads at most ``days`` pre-aggregated rows from PropertyDailyStats (one
+    per day, summed over the owner's listings), so the cost does not grow
+    with the number of listings or events.
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    fields = [field for field, label in FUNNEL_STEPS]
+    rows = (
+        PropertyDailyStats.objects.filter(property__owner=owner, date__gte=start)
+        .values('date')
+        .annotate(**{field: Sum(field) for field in fields})
+        .order_by()
+    )
+    by_date = {row['date']: row for row in rows}
+
+    views = [by_date.get(start + timedelta(days=i), {}).get('views', 0) for i in range(days)]
+    peak = max(views) or 1
+    step = width / (days - 1)
+    points = ' '.join(
+        f'{i * step:.1f},{height - count * height / peak:.1f}'
+        for i, count in enumerate(views)
+    )
+
+    totals = {field: sum(row[field] for row in by_date.values()) for field in fields}
+    top = totals['views']
+    funnel = []
+    for field, label in FUNNEL_STEPS:
+        funnel.append({
+            'label': label,
+            'count': totals[field],
+            'percent': round(100 * totals[field] / top, 1) if top else 0,
+        })
+    return {
+        'days': days,
+        'points': points,
+        'width': width,
+        'height': height,
+        'views': totals['views'],
+        'funnel': funnel,
+    }
+
+
 def owner_dashboard(request):
     """Dashboard for property owners."""
     user = request.user
 
     # Owner's properties
-    properties = Property.objects.filter(owner=user)
+    properties = Property.objects.filter(owner=user).select_related('primary_image')
     total_properties = properties.count()
     available_count = properties.filter(status=Property.Status.AVAILABLE).count()
     rented_count = properties.filter(status=Property.Status.RENTED).count()
 
-    # Total views across all properties
-    total_views = sum(p.views_count for p in properties)
+    # Total views across all properties, including views not yet flushed
+    total_views = (properties.aggregate(total=Sum('views_count'))['total'] or 0) + sum(
+        pending_view_counts(properties.values('pk')).values()
+    )
 
     # Recent conversations
     raw_conversations = Conversation.objects.filter(
@@ -135,5 +196,6 @@ def owner_dashboard(request):
         'pending_requests': pending_requests,
         'recent_requests': recent_requests,
         'recent_reviews': recent_reviews,
+        'engagement': engagement_summary(user),
     }
     return render(request, 'dashboard/owner.html', context)
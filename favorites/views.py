@@ -12,7 +12,7 @@ from properties.models import Property
 def favorites_list(request):
     """Display a paginated list of the current user's favorited properties."""
     favorites = Favorite.objects.filter(user=request.user).select_related(
-        "property"
+        "property", "property__primary_image"
     ).order_by("-created_at")
 
     paginator = Paginator(favorites, 12)
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Property, PropertyImage, Amenity, PropertyRequest
+from .models import (
+    Property, PropertyImage, Amenity, PropertyRequest, ImageUploadJob, PropertyDailyStats,
+    ListingChange,
+)
 
 
 class PropertyImageInline(admin.TabularInline):
@@ -9,7 +12,7 @@ class PropertyImageInline(admin.TabularInline):
 
 @admin.register(Amenity)
 class AmenityAdmin(admin.ModelAdmin):
-    list_display = ('name', 'icon')
+    list_display = ('name', 'icon', 'bit')
     search_fields = ('name',)
 
 
@@ -19,17 +22,53 @@ class PropertyAdmin(admin.ModelAdmin):
     list_filter = ('property_type', 'status', 'is_approved', 'rental_purpose', 'district', 'created_at')
     search_fields = ('title', 'description', 'address', 'district', 'municipality')
     list_editable = ('is_approved', 'status')
-    readonly_fields = ('created_at', 'updated_at', 'views_count')
+    readonly_fields = ('created_at', 'updated_at', 'views_count', 'rating_sum', 'rating_count', 'rating_avg')
     filter_horizontal = ('amenities',)
     inlines = [PropertyImageInline]
     ordering = ('-created_at',)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_primary_image()
+
 
 @admin.register(PropertyImage)
 class PropertyImageAdmin(admin.ModelAdmin):
     list_display = ('property', 'caption', 'is_primary', 'uploaded_at')
     list_filter = ('is_primary', 'uploaded_at')
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        obj.property.refresh_primary_image()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        obj.property.refresh_primary_image()
+
+
+@admin.register(ImageUploadJob)
+class ImageUploadJobAdmin(admin.ModelAdmin):
+    list_display = ('original_name', 'property', 'status', 'attempts', 'created_at', 'updated_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('original_name', 'property__title')
+    readonly_fields = ('staged_name', 'image', 'error', 'attempts', 'created_at', 'updated_at')
+
+
+@admin.register(PropertyDailyStats)
+class PropertyDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('property', 'date', 'views', 'favorites', 'conversations', 'requests', 'approvals')
+    list_filter = ('date',)
+    search_fields = ('property__title',)
+    date_hierarchy = 'date'
+
+
+@admin.register(ListingChange)
+class ListingChangeAdmin(admin.ModelAdmin):
+    list_display = ('property_id', 'kind', 'changed_at')
+    list_filter = ('kind',)
+    search_fields = ('=property_id',)
+    date_hierarchy = 'changed_at'
+
 
 @admin.register(PropertyRequest)
 class PropertyRequestAdmin(admin.ModelAdmin):
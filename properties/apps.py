@@ -5,3 +5,6 @@ class PropertiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'properties'
     verbose_name = 'Property Management'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,283 @@
+"""
+Versioned caching for listing searches.
+
+Anything cached from listing queries is keyed on the catalogue generation,
+so bumping it (from the model signals in properties.signals) invalidates
+every such entry at once without having to track individual keys.
+
+Generations are CacheGeneration rows rather than cache entries: every web
+worker and background process (media worker, clock, management commands)
+must see the same value, and a bump must never be lost to eviction or a
+racing increment. Cached entries go to the default cache, which is shared
+between processes too (see CACHES in settings). Signals bump generations
+once the writing transaction commits, so nothing read before the commit
+can be cached under the new generation.
+
+The result cache stores the ordered list of matching property IDs per
+SearchSpec, taken from the columnar snapshot (properties.snapshot) when it
+can answer the search and from Postgres otherwise. Pages are then served
+by slicing that list and fetching just those rows by primary key.
+
+Shared fragments of a property's detail page are keyed on its
+``updated_at`` plus a per-listing generation, bumped when its reviews or
+images change (neither touches the property row's timestamp), and the
+amenity table generation. Each generation also records when it last
+changed, for use as an HTTP Last-Modified (see api.conditional).
+"""
+from asgiref.local import Local
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+
+from .models import Amenity, CacheGeneration
+
+GENERATION_KEY = 'listings:generation'
+AMENITY_GENERATION_KEY = 'amenities:generation'
+AMENITY_BITS_KEY = 'amenities:bits'
+STATS_KEYS = {'hits': 'listings:stats:hits', 'misses': 'listings:stats:misses'}
+
+# Generation states read during the current request (see begin_request_memo)
+_memo = Local()
+
+
+def _incr(key, start):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, start, timeout=None)
+        return cache.get(key, start)
+
+
+def begin_request_memo(**kwargs):
+    """
+    Remember generations for the rest of the request (request_started):
+    one request reads each at most once, however many caches it consults.
+    Code outside requests (workers, commands) always reads them afresh.
+    """
+    _memo.states = {}
+
+
+def end_request_memo(**kwargs):
+    _memo.states = None
+
+
+def _state(key):
+    """``(value, modified)`` of generation ``key``, created at 1 on first use."""
+    states = getattr(_memo, 'states', None)
+    if states is not None and key in states:
+        return states[key]
+    row = CacheGeneration.objects.filter(key=key).values_list('value', 'modified').first()
+    if row is None:
+        generation, _ = CacheGeneration.objects.get_or_create(key=key)
+        row = generation.value, generation.modified
+    if states is not None:
+        states[key] = row
+    return row
+
+
+def _generation(key):
+    return _state(key)[0]
+
+
+def _bump(key):
+    table = connection.ops.quote_name(CacheGeneration._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (key, value, modified) VALUES (%s, 2, %s)
+            ON CONFLICT (key) DO UPDATE
+                SET value = {table}.value + 1, modified = EXCLUDED.modified
+            RETURNING value, modified
+            """,
+            [key, timezone.now()],
+        )
+        row = cursor.fetchone()
+    # A request that writes sees its own bump
+    states = getattr(_memo, 'states', None)
+    if states is not None:
+        states[key] = row
+    return row[0]
+
+
+def _modified(key):
+    """When ``key`` was last bumped (or first used)."""
+    return _state(key)[1]
+
+
+def listing_generation():
+    return _generation(GENERATION_KEY)
+
+
+def bump_listing_generation():
+    return _bump(GENERATION_KEY)
+
+
+def listing_modified():
+    return _modified(GENERATION_KEY)
+
+
+def listing_state():
+    """``(generation, modified)`` of the catalogue, in one read."""
+    return _state(GENERATION_KEY)
+
+
+def _detail_generation_key(pk):
+    return f'property:{pk}:generation'
+
+
+def detail_generation(pk):
+    return _generation(_detail_generation_key(pk))
+
+
+def bump_detail_generation(pk):
+    return _bump(_detail_generation_key(pk))
+
+
+def detail_modified(pk):
+    return _modified(_detail_generation_key(pk))
+
+
+def detail_state(pk):
+    return _state(_detail_generation_key(pk))
+
+
+def amenity_generation():
+    return _generation(AMENITY_GENERATION_KEY)
+
+
+def bump_amenity_generation():
+    return _bump(AMENITY_GENERATION_KEY)
+
+
+def amenity_modified():
+    return _modified(AMENITY_GENERATION_KEY)
+
+
+def amenity_state():
+    return _state(AMENITY_GENERATION_KEY)
+
+
+def detail_cache_version(property_obj):
+    """Version string for the cached detail-page fragments of ``property_obj``."""
+    return (
+        f'{property_obj.updated_at.timestamp()}:'
+        f'{detail_generation(property_obj.pk)}:{amenity_generation()}'
+    )
+
+
+def amenity_bits():
+    """
+    Map of lower-cased amenity name to its bit in Property.amenity_mask.
+
+    Keyed on the amenity generation, so every process switches to a new
+    map as soon as an amenity change commits; the short TTL bounds how
+    long a map read just before a commit can linger.
+    """
+    key = f'{AMENITY_BITS_KEY}:{amenity_generation()}'
+    bits = cache.get(key)
+    if bits is None:
+        bits = {
+            name.lower(): bit
+            for name, bit in Amenity.objects.values_list('name', 'bit')
+        }
+        cache.set(key, bits, settings.AMENITY_BITS_CACHE_TTL)
+    return bits
+
+
+def result_cache_stats():
+    """
+    Hit/miss counters for the result cache, for the admin dashboard. They
+    are only kept when LISTING_RESULT_CACHE_STATS is on.
+    """
+    hits = cache.get(STATS_KEYS['hits'], 0)
+    misses = cache.get(STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'enabled': settings.LISTING_RESULT_CACHE_STATS,
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(100 * hits / total, 1) if total else 0,
+        'generation': listing_generation(),
+    }
+
+
+def listing_ids(spec, queryset):
+    """
+    Return ``(ids, complete)``: the ordered IDs matched by ``queryset``.
+
+    At most ``LISTING_RESULT_CACHE_MAX_IDS`` IDs are kept; ``complete`` is
+    False when the result set is longer than that.
+    """
+    key = f'listings:ids:{listing_generation()}:{spec.cache_key}'
+    entry = cache.get(key)
+    if entry is not None:
+        if settings.LISTING_RESULT_CACHE_STATS:
+            _incr(STATS_KEYS['hits'], 1)
+        return entry
+
+    if settings.LISTING_RESULT_CACHE_STATS:
+        _incr(STATS_KEYS['misses'], 1)
+    from .snapshot import snapshot_ids
+
+    cap = settings.LISTING_RESULT_CACHE_MAX_IDS
+    ids = snapshot_ids(spec, queryset.query.order_by)
+    if ids is None:
+        ids = list(queryset.values_list('pk', flat=True)[:cap + 1])
+    entry = (ids[:cap], len(ids) <= cap)
+    cache.set(key, entry, settings.LISTING_RESULT_CACHE_TTL)
+    return entry
+
+
+def load_listings(ids, queryset):
+    """Fetch ``ids`` through ``queryset`` (for its related loading), in order."""
+    objects = queryset.order_by().in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+class CachedListingResults:
+    """
+    Sliceable stand-in for a listing queryset, for use with a Paginator.
+
+    Slices inside the cached ID list cost one primary-key fetch; slices
+    beyond it (deep pages of very large result sets) fall through to the
+    queryset itself.
+    """
+
+    def __init__(self, ids, queryset, count, count_is_approximate=False):
+        self.ids = ids
+        self.queryset = queryset
+        self.count = count
+        self.count_is_approximate = count_is_approximate
+
+    def __len__(self):
+        return self.count
+
+    def head_ids(self, stop):
+        """IDs of the first ``stop`` results, without loading the rows."""
+        if stop <= len(self.ids) or self.count <= len(self.ids):
+            return self.ids[:stop]
+        return list(self.queryset.values_list('pk', flat=True)[:stop])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if index.stop is not None and index.stop <= len(self.ids):
+            return load_listings(self.ids[index], self.queryset)
+        return list(self.queryset[index])
+
+
+def cached_listing_results(spec, queryset):
+    """
+    Wrap ``queryset`` (compiled from ``spec``) in a CachedListingResults.
+
+    A complete cached ID list gives the exact count for free; otherwise
+    the count service supplies it.
+    """
+    from .counts import listing_count
+
+    ids, complete = listing_ids(spec, queryset)
+    if complete:
+        return CachedListingResults(ids, queryset, len(ids))
+    count, approximate = listing_count(spec, queryset)
+    return CachedListingResults(ids, queryset, count, approximate)
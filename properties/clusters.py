@@ -0,0 +1,158 @@
+"""
+Server-side marker clustering for the map.
+
+Listings are grouped by a prefix of their stored geohash whose length
+follows the map zoom, so each cluster is one geohash cell and a GROUP BY
+over the indexed column. Results are computed and cached per tile, a
+coarser geohash cell two levels up, so panning reuses the tiles already
+computed. Cells holding fewer than MAP_CLUSTER_MIN_SIZE listings are sent
+as individual markers instead of a cluster.
+"""
+from dataclasses import replace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Aggregate, Avg, CharField, Count, FloatField, Min
+from django.db.models.functions import Substr
+
+from . import geohash
+from .cache import listing_generation
+
+# Geohash precision of a cluster cell for each zoom level (cells come out
+# at roughly 32-64 screen pixels); deeper zooms use the last entry
+ZOOM_PRECISION = (1, 1, 1, 2, 2, 2, 3, 3, 4, 4, 4, 5, 5, 6, 6, 6, 7, 7, 8)
+MAX_ZOOM = 22
+# Tiles are this many geohash levels coarser than the cells they hold
+TILE_LEVELS = 2
+# Most tiles a single viewport may span
+MAX_TILES = 64
+
+
+class InvalidViewport(Exception):
+    """Raised for a missing or out-of-range zoom or bounding box."""
+
+
+class Median(Aggregate):
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(0.5) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+
+class Mode(Aggregate):
+    function = 'MODE'
+    template = '%(function)s() WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = CharField()
+
+
+def parse_viewport(params):
+    """
+    Read ``zoom`` and ``bbox`` (``west,south,east,north``, as Leaflet's
+    ``toBBoxString()`` gives) from request params.
+    Returns ``(zoom, (sw_lat, sw_lng, ne_lat, ne_lng))``.
+    """
+    try:
+        zoom = int(params.get('zoom', ''))
+        west, south, east, north = (float(v) for v in params.get('bbox', '').split(','))
+    except ValueError:
+        raise InvalidViewport('zoom and bbox=west,south,east,north are required.')
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise InvalidViewport(f'zoom must be between 0 and {MAX_ZOOM}.')
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        raise InvalidViewport('bbox is out of range.')
+    return zoom, (south, west, north, east)
+
+
+def cluster_precision(zoom):
+    return ZOOM_PRECISION[min(zoom, len(ZOOM_PRECISION) - 1)]
+
+
+def _tile_clusters(spec, tile, precision):
+    """Clusters and lone markers of the listings matching ``spec`` in ``tile``."""
+    queryset = spec.to_queryset().order_by().filter(
+        geohash__startswith=tile,
+    ).annotate(cell=Substr('geohash', 1, precision))
+    cells = list(
+        queryset.values('cell').annotate(
+            count=Count('id'),
+            lat=Avg('latitude'),
+            lng=Avg('longitude'),
+            min_price=Min('price'),
+            median_price=Median('price'),
+            dominant_type=Mode('property_type'),
+        )
+    )
+
+    min_size = settings.MAP_CLUSTER_MIN_SIZE
+    sparse = [cell['cell'] for cell in cells if cell['count'] < min_size]
+    markers = [
+        {
+            'id': pk,
+            'latitude': float(latitude),
+            'longitude': float(longitude),
+            'price': float(price),
+            'property_type': property_type,
+        }
+        for pk, latitude, longitude, price, property_type in queryset.filter(
+            cell__in=sparse,
+        ).values_list('id', 'latitude', 'longitude', 'price', 'property_type')
+    ] if sparse else []
+    clusters = [
+        {
+            'cell': cell['cell'],
+            'count': cell['count'],
+            'latitude': float(cell['lat']),
+            'longitude': float(cell['lng']),
+            'min_price': float(cell['min_price']),
+            'median_price': cell['median_price'],
+            'property_type': cell['dominant_type'],
+        }
+        for cell in cells
+        if cell['count'] >= min_size
+    ]
+    return {'clusters': clusters, 'markers': markers}
+
+
+def _in_bbox(marker, bbox):
+    sw_lat, sw_lng, ne_lat, ne_lng = bbox
+    return sw_lat <= marker['latitude'] <= ne_lat and sw_lng <= marker['longitude'] <= ne_lng
+
+
+def _overlaps_bbox(cluster, bbox):
+    sw_lat, sw_lng, ne_lat, ne_lng = bbox
+    south, west, north, east = geohash.bounds(cluster['cell'])
+    return south <= ne_lat and north >= sw_lat and west <= ne_lng and east >= sw_lng
+
+
+def map_clusters(spec, zoom, bbox):
+    """
+    Clusters and markers for the listings matching ``spec`` (its own
+    bbox and sort are ignored) inside ``bbox`` at ``zoom``.
+    """
+    precision = cluster_precision(zoom)
+    tiles = geohash.cover(bbox, max(precision - TILE_LEVELS, 0), limit=MAX_TILES)
+    if tiles is None:
+        raise InvalidViewport('bbox is too large for this zoom level.')
+
+    spec = replace(spec, bbox=None, has_coords=True, sort='')
+    prefix = f'listings:clusters:{listing_generation()}:{spec.cache_key}:{precision}'
+    keys = {f'{prefix}:{tile}': tile for tile in tiles}
+    cached = cache.get_many(keys)
+    missing = {
+        key: _tile_clusters(spec, tile, precision)
+        for key, tile in keys.items()
+        if key not in cached
+    }
+    if missing:
+        cache.set_many(missing, settings.LISTING_RESULT_CACHE_TTL)
+    cached.update(missing)
+
+    clusters, markers = [], []
+    for key in keys:
+        clusters.extend(c for c in cached[key]['clusters'] if _overlaps_bbox(c, bbox))
+        markers.extend(m for m in cached[key]['markers'] if _in_bbox(m, bbox))
+    return {
+        'zoom': zoom,
+        'precision': precision,
+        'clusters': clusters,
+        'markers': markers,
+    }
@@ -0,0 +1,47 @@
+"""
+Cached and approximate result counts for listing searches.
+
+Exact ``COUNT(*)`` over the filtered, joined listing queryset is the most
+expensive part of rendering a results page. Counts are cached per
+SearchSpec and catalogue generation; broad queries whose planner estimate
+is large use that estimate instead and are reported as approximate.
+"""
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import listing_generation
+
+
+def _planner_estimate(queryset):
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def listing_count(spec, queryset):
+    """
+    Return ``(count, is_approximate)`` for ``queryset``, built from ``spec``.
+
+    Unfiltered searches whose planner estimate is at least
+    ``LISTING_COUNT_ESTIMATE_THRESHOLD`` rows are answered from the
+    estimate; everything else is counted exactly. Either way the result is
+    cached for ``LISTING_COUNT_CACHE_TTL`` seconds.
+    """
+    key = f'listings:count:{listing_generation()}:{spec.cache_key}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = None
+    filters = spec.as_dict()
+    filters.pop('sort', None)
+    if not filters:
+        estimate = _planner_estimate(queryset)
+        if estimate >= settings.LISTING_COUNT_ESTIMATE_THRESHOLD:
+            result = (estimate, True)
+    if result is None:
+        result = (queryset.count(), False)
+
+    cache.set(key, result, settings.LISTING_COUNT_CACHE_TTL)
+    return result
@@ -0,0 +1,125 @@
+"""
+Facet counts for the listing search sidebar.
+
+All facets are computed over the same filtered listing set in a single
+statement: one GROUP BY GROUPING SETS pass for the scalar facets plus a
+join against the amenity bits, UNION ALL'd together. Results are cached
+per SearchSpec and catalogue generation.
+"""
+from dataclasses import replace
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import Case, CharField, IntegerField, Value, When
+
+from .cache import listing_generation
+from .models import Amenity, Property
+
+# Lower bounds (NPR per month) of the price histogram buckets
+PRICE_BUCKETS = (0, 5000, 10000, 20000, 35000, 50000, 100000)
+# num_rooms buckets; the last one is open-ended
+ROOM_BUCKETS = ('1', '2', '3', '4+')
+
+SCALAR_FACETS = ('property_type', 'district', 'rental_purpose', 'rooms_bucket', 'price_bucket')
+
+FACETS_SQL = """
+WITH base AS ({base})
+SELECT
+    CASE
+        WHEN GROUPING(property_type) = 0 THEN 'property_type'
+        WHEN GROUPING(district) = 0 THEN 'district'
+        WHEN GROUPING(rental_purpose) = 0 THEN 'rental_purpose'
+        WHEN GROUPING(rooms_bucket) = 0 THEN 'rooms_bucket'
+        ELSE 'price_bucket'
+    END,
+    COALESCE(property_type, district, rental_purpose, rooms_bucket, price_bucket::text),
+    COUNT(*)
+FROM base
+GROUP BY GROUPING SETS ((property_type), (district), (rental_purpose), (rooms_bucket), (price_bucket))
+UNION ALL
+SELECT 'amenity', amenity.name, COUNT(*)
+FROM base
+JOIN {amenity_table} amenity
+    ON base.amenity_mask & (1::bigint << amenity.bit) <> 0
+GROUP BY amenity.name
+"""
+
+
+def _facet_base(spec):
+    price_bucket = Case(
+        *[When(price__gte=bound, then=Value(bound)) for bound in reversed(PRICE_BUCKETS[1:])],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    rooms_bucket = Case(
+        When(num_rooms__lte=1, then=Value('1')),
+        When(num_rooms=2, then=Value('2')),
+        When(num_rooms=3, then=Value('3')),
+        default=Value('4+'),
+        output_field=CharField(),
+    )
+    return spec.to_queryset().order_by().annotate(
+        rooms_bucket=rooms_bucket,
+        price_bucket=price_bucket,
+    ).values(
+        'property_type', 'district', 'rental_purpose', 'amenity_mask',
+        'rooms_bucket', 'price_bucket',
+    )
+
+
+def _compute_facets(spec):
+    counts = {facet: {} for facet in SCALAR_FACETS + ('amenity',)}
+    try:
+        base_sql, params = _facet_base(spec).query.sql_with_params()
+    except EmptyResultSet:
+        # e.g. an amenity filter that matches no amenity at all
+        base_sql = None
+    if base_sql is not None:
+        sql = FACETS_SQL.format(
+            base=base_sql,
+            amenity_table=connection.ops.quote_name(Amenity._meta.db_table),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            for facet, value, count in cursor.fetchall():
+                counts[facet][value] = count
+
+    type_labels = dict(Property.PropertyType.choices)
+    purpose_labels = dict(Property.RentalPurpose.choices)
+
+    def by_count(values, labels=None):
+        items = sorted(values.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            {'value': value, 'label': (labels or {}).get(value, value), 'count': count}
+            for value, count in items
+        ]
+
+    upper_bounds = PRICE_BUCKETS[1:] + (None,)
+    return {
+        'total': sum(counts['property_type'].values()),
+        'property_type': by_count(counts['property_type'], type_labels),
+        'district': by_count(counts['district']),
+        'rental_purpose': by_count(counts['rental_purpose'], purpose_labels),
+        'num_rooms': [
+            {'value': bucket, 'count': counts['rooms_bucket'].get(bucket, 0)}
+            for bucket in ROOM_BUCKETS
+        ],
+        'amenities': by_count(counts['amenity']),
+        'price': [
+            {'min': low, 'max': high, 'count': counts['price_bucket'].get(str(low), 0)}
+            for low, high in zip(PRICE_BUCKETS, upper_bounds)
+        ],
+    }
+
+
+def listing_facets(spec):
+    """Facet counts for the listings matched by ``spec`` (its sort is ignored)."""
+    spec = replace(spec, sort='')
+    key = f'listings:facets:{listing_generation()}:{spec.cache_key}'
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute_facets(spec)
+        cache.set(key, facets, settings.LISTING_RESULT_CACHE_TTL)
+    return facets
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Property, PropertyImage, Amenity, PropertyRequest
+from .models import Property, Amenity, PropertyRequest
 
 
 class PropertyForm(forms.ModelForm):
@@ -39,16 +39,24 @@ class PropertyForm(forms.ModelForm):
         }
 
 
-class PropertyImageForm(forms.ModelForm):
-    """Form for uploading property images."""
+class PropertyImageForm(forms.Form):
+    """
+    Form for uploading a property image.
 
-    class Meta:
-        model = PropertyImage
-        fields = ['image', 'caption']
-        widgets = {
-            'image': forms.ClearableFileInput(attrs={'class': 'form-control'}),
-            'caption': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Image caption (optional)'}),
-        }
+    The file is only staged here; the media worker validates and decodes
+    it (see properties.uploads), so this is a plain FileField rather than
+    an ImageField that would run Pillow in the request.
+    """
+
+    image = forms.FileField(
+        required=False,
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': 'image/*'}),
+    )
+    caption = forms.CharField(
+        required=False,
+        max_length=200,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Image caption (optional)'}),
+    )
 
 
 class PropertySearchForm(forms.Form):
@@ -119,6 +127,7 @@ class PropertySearchForm(forms.Form):
             ('', 'Newest First'),
             ('price_asc', 'Price: Low to High'),
             ('price_desc', 'Price: High to Low'),
+            ('rating', 'Top Rated'),
             ('newest', 'Newest First'),
         ],
         widget=forms.Select(attrs={'class': 'form-select'}),
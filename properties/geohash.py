@@ -0,0 +1,92 @@
+"""
+Geohash encoding and cell arithmetic.
+
+A geohash names a lat/lng cell; every extra character splits the cell
+into 32, so the listings inside a cell are exactly those whose stored
+Property.geohash starts with its hash, which an index can answer.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+DECODE = {char: i for i, char in enumerate(BASE32)}
+# Precision of the stored Property.geohash (cells of about 4 cm)
+MAX_PRECISION = 12
+
+
+def encode(latitude, longitude, precision=MAX_PRECISION):
+    """Geohash of the point at ``latitude``, ``longitude``."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coordinate = (lng_range, longitude) if even else (lat_range, latitude)
+        middle = (rng[0] + rng[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            rng[0] = middle
+        else:
+            value *= 2
+            rng[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """``(lat_height, lng_width)`` in degrees of a cell at ``precision``."""
+    lng_bits = math.ceil(precision * 5 / 2)
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def bounds(geohash):
+    """``(south, west, north, east)`` of the cell named by ``geohash``."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = DECODE[char]
+        for shift in range(4, -1, -1):
+            rng = lng_range if even else lat_range
+            middle = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = middle
+            else:
+                rng[1] = middle
+            even = not even
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def cover(bbox, precision, limit=None):
+    """
+    Geohashes at ``precision`` of the cells overlapping ``bbox``
+    (sw_lat, sw_lng, ne_lat, ne_lng), sorted. Returns None when more than
+    ``limit`` cells would be needed.
+    """
+    if precision == 0:
+        return ['']
+    sw_lat, sw_lng, ne_lat, ne_lng = bbox
+    height, width = cell_size(precision)
+    # Cells are aligned to multiples of their size from (-90, -180)
+    rows = range(
+        int((sw_lat + 90) // height),
+        min(int((ne_lat + 90) // height), round(180 / height) - 1) + 1,
+    )
+    cols = range(
+        int((sw_lng + 180) // width),
+        min(int((ne_lng + 180) // width), round(360 / width) - 1) + 1,
+    )
+    if limit is not None and len(rows) * len(cols) > limit:
+        return None
+    return sorted(
+        encode(-90 + (row + 0.5) * height, -180 + (col + 0.5) * width, precision)
+        for row in rows
+        for col in cols
+    )
@@ -0,0 +1,133 @@
+import random
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from properties.models import Property
+from properties.search import SearchSpec
+from properties.snapshot import ListingSnapshot, np
+
+DISTRICTS = (
+    'Kathmandu', 'Lalitpur', 'Bhaktapur', 'Kaski', 'Chitwan',
+    'Morang', 'Sunsari', 'Rupandehi', 'Jhapa', 'Banke',
+)
+
+# Searches answered by both paths, roughly in order of selectivity
+SEARCHES = (
+    ('all listings', {}),
+    ('type + price range', {'property_type': 'flat', 'min_price': 10000, 'max_price': 30000}),
+    ('district + rooms', {'district': 'kathmandu', 'num_rooms': 2, 'sort': 'price_asc'}),
+    ('purpose + rating', {'rental_purpose': 'family', 'min_rating': 3, 'sort': 'rating'}),
+    ('bounding box', {
+        'bbox': (27.65, 85.28, 27.75, 85.38), 'has_coords': True, 'sort': 'price_desc',
+    }),
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare ordered-ID filtering through the columnar snapshot against '
+        'the ORM filter chain on synthetic catalogues. Nothing is kept: the '
+        'synthetic listings are rolled back and the snapshot is written to '
+        'a temporary directory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', type=int, default=[10000, 100000, 1000000],
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('numpy is required for the listing snapshot.')
+        for size in options['sizes']:
+            random.seed(options['seed'])
+            try:
+                with transaction.atomic():
+                    self._run(size, options['repeat'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _run(self, size, repeat):
+        self.stdout.write(f'\n{size} listings')
+        started = time.perf_counter()
+        # Hide the real catalogue for the duration of the run
+        Property.objects.update(is_approved=False)
+        self._populate(size)
+        self.stdout.write(f'  generated in {time.perf_counter() - started:.1f}s')
+
+        with tempfile.TemporaryDirectory() as directory:
+            snapshot = ListingSnapshot(directory)
+            started = time.perf_counter()
+            snapshot.rebuild()
+            self.stdout.write(f'  snapshot built in {time.perf_counter() - started:.1f}s')
+            snapshot.load()
+
+            self.stdout.write(f'  {"search":<22}{"matches":>9}{"orm ms":>10}{"snapshot ms":>13}{"speedup":>9}')
+            for label, filters in SEARCHES:
+                spec = SearchSpec.from_filters(filters)
+                qs = spec.to_queryset()
+                ordering = qs.query.order_by
+
+                orm_ids, orm_ms = self._time(
+                    lambda: list(qs.values_list('pk', flat=True)), repeat,
+                )
+                snap_ids, snap_ms = self._time(lambda: snapshot.ids(spec, ordering), repeat)
+                if snap_ids != orm_ids:
+                    raise CommandError(f'Snapshot and ORM disagree for "{label}".')
+                self.stdout.write(
+                    f'  {label:<22}{len(orm_ids):>9}{orm_ms:>10.2f}{snap_ms:>13.2f}'
+                    f'{orm_ms / snap_ms:>8.1f}x'
+                )
+
+    @staticmethod
+    def _time(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
+
+    def _populate(self, size):
+        owner = get_user_model().objects.create(username='snapshot-benchmark')
+        types = Property.PropertyType.values
+        purposes = Property.RentalPurpose.values
+        batch = []
+        for i in range(size):
+            has_coords = random.random() < 0.8
+            rating_count = random.randint(0, 20)
+            rating_avg = round(random.uniform(1, 5), 2) if rating_count else 0
+            batch.append(Property(
+                owner=owner,
+                title=f'Benchmark {i}',
+                property_type=random.choice(types),
+                description='',
+                district=random.choice(DISTRICTS),
+                ward_number=str(random.randint(1, 32)),
+                address='',
+                price=Decimal(random.randrange(2000, 150000, 500)),
+                num_rooms=random.randint(1, 6),
+                rental_purpose=random.choice(purposes),
+                latitude=Decimal(f'{random.uniform(26.4, 30.4):.6f}') if has_coords else None,
+                longitude=Decimal(f'{random.uniform(80.1, 88.2):.6f}') if has_coords else None,
+                rating_count=rating_count,
+                rating_sum=round(rating_avg * rating_count),
+                rating_avg=rating_avg,
+            ))
+            if len(batch) == 5000:
+                Property.objects.bulk_create(batch)
+                batch = []
+        Property.objects.bulk_create(batch)
@@ -0,0 +1,126 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from properties.models import Property
+from properties.nearby import NearbyIndex, nearest_listings_orm, np
+from properties.search import SearchSpec
+
+# Most listings sit in and around the Kathmandu valley
+CENTRES = (
+    (27.7172, 85.3240, 0.06, 0.7),  # Kathmandu
+    (27.6710, 85.4298, 0.03, 0.1),  # Bhaktapur
+    (28.2096, 83.9856, 0.04, 0.1),  # Pokhara
+)
+BOUNDS = (26.4, 80.1, 30.4, 88.2)
+
+# (label, lat, lng, radius km, k)
+QUERIES = (
+    ('central 2 km, k=20', 27.7172, 85.3240, 2, 20),
+    ('central 10 km, k=50', 27.7172, 85.3240, 10, 50),
+    ('suburb 2 km, k=20', 27.6800, 85.2800, 2, 20),
+    ('rural 25 km, k=20', 29.0000, 82.0000, 25, 20),
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare k-nearest radius searches through the in-memory spatial '
+        'index against a bounding-box query in Postgres on synthetic '
+        'catalogues. The synthetic listings are rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('numpy is required for the spatial index.')
+        for size in options['sizes']:
+            random.seed(options['seed'])
+            try:
+                with transaction.atomic():
+                    self._run(size, options['repeat'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _run(self, size, repeat):
+        self.stdout.write(f'\n{size} listings')
+        # Hide the real catalogue for the duration of the run
+        Property.objects.update(is_approved=False)
+        self._populate(size)
+
+        rows = Property.objects.filter(is_approved=True).values_list('pk', 'latitude', 'longitude')
+        ids, latitudes, longitudes = zip(*rows)
+        index = NearbyIndex()
+        started = time.perf_counter()
+        index.load(ids, [float(v) for v in latitudes], [float(v) for v in longitudes])
+        self.stdout.write(f'  index built in {(time.perf_counter() - started) * 1000:.1f}ms')
+
+        spec = SearchSpec()
+        self.stdout.write(f'  {"query":<22}{"found":>7}{"orm ms":>10}{"index ms":>10}{"speedup":>9}')
+        for label, lat, lng, radius, k in QUERIES:
+            orm_hits, orm_ms = self._time(
+                lambda: nearest_listings_orm(spec, lat, lng, radius, k), repeat,
+            )
+            index_hits, index_ms = self._time(lambda: index.query(lat, lng, radius, k), repeat)
+            if [pk for pk, _ in index_hits] != [pk for pk, _ in orm_hits]:
+                raise CommandError(f'Index and ORM disagree for "{label}".')
+            self.stdout.write(
+                f'  {label:<22}{len(index_hits):>7}{orm_ms:>10.2f}{index_ms:>10.3f}'
+                f'{orm_ms / index_ms:>8.0f}x'
+            )
+
+    @staticmethod
+    def _time(func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        return result, statistics.median(timings)
+
+    def _point(self):
+        roll = random.random()
+        for lat, lng, spread, share in CENTRES:
+            if roll < share:
+                return random.gauss(lat, spread), random.gauss(lng, spread)
+            roll -= share
+        south, west, north, east = BOUNDS
+        return random.uniform(south, north), random.uniform(west, east)
+
+    def _populate(self, size):
+        owner = get_user_model().objects.create(username='nearby-benchmark')
+        types = Property.PropertyType.values
+        batch = []
+        for i in range(size):
+            lat, lng = self._point()
+            batch.append(Property(
+                owner=owner,
+                title=f'Benchmark {i}',
+                property_type=random.choice(types),
+                description='',
+                district='Kathmandu',
+                ward_number='1',
+                address='',
+                price=Decimal(random.randrange(2000, 150000, 500)),
+                num_rooms=random.randint(1, 6),
+                latitude=Decimal(f'{lat:.6f}'),
+                longitude=Decimal(f'{lng:.6f}'),
+            ))
+            if len(batch) == 5000:
+                Property.objects.bulk_create(batch)
+                batch = []
+        Property.objects.bulk_create(batch)
@@ -0,0 +1,82 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from properties.models import PropertyImage
+from properties.renditions import generate_renditions
+from properties.uploads import renditions_ready
+
+
+def _render(pk):
+    """
+    Build renditions for one image in a worker process; returns
+    ``(pk, property_id, error)``.
+    """
+    try:
+        image = PropertyImage.objects.get(pk=pk)
+        generate_renditions(image)
+    except PropertyImage.DoesNotExist:
+        return pk, None, 'deleted'
+    except Exception as exc:
+        # Any bad file (truncated, decompression bomb, ...) is reported,
+        # never allowed to abort the whole run
+        return pk, None, str(exc) or exc.__class__.__name__
+    return pk, image.property_id, None
+
+
+def _close_connections():
+    # Forked workers must not reuse the parent's database connections
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Build WebP/JPEG renditions for property images that lack them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes (default: one per CPU).',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild renditions for every image, not just missing ones.',
+        )
+
+    def handle(self, *args, **options):
+        images = PropertyImage.objects.order_by('pk')
+        if not options['force']:
+            images = images.filter(renditions={})
+        pks = list(images.values_list('pk', flat=True))
+        if not pks:
+            self.stdout.write('All images already have renditions.')
+            return
+
+        self.stdout.write(f'Rendering {len(pks)} images with {options["workers"]} workers...')
+        connections.close_all()
+        failed = 0
+        rendered = set()
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('fork'),
+            initializer=_close_connections,
+        ) as executor:
+            for pk, property_id, error in executor.map(_render, pks, chunksize=8):
+                if error:
+                    failed += 1
+                    self.stderr.write(f'  image {pk}: {error}')
+                else:
+                    rendered.add(property_id)
+
+        # Invalidated once here, for every process
+        if rendered:
+            renditions_ready(rendered)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {len(pks) - failed} images ({failed} failed).'
+        ))
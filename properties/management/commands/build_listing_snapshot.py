@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.snapshot import listing_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the columnar listing snapshot from the database.'
+
+    def handle(self, *args, **options):
+        snapshot = listing_snapshot()
+        if snapshot is None:
+            raise CommandError(
+                'The listing snapshot is disabled (numpy missing or LISTING_SNAPSHOT_ENABLED is off).'
+            )
+        count = snapshot.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {count} listings to {snapshot.directory}.'
+        ))
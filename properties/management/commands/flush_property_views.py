@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from properties.viewcounts import flush_view_counts
+
+
+class Command(BaseCommand):
+    help = 'Fold buffered detail-page views into Property.views_count and daily stats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Keep running and flush every INTERVAL seconds (default: flush once).',
+        )
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        try:
+            while True:
+                flushed = flush_view_counts()
+                if flushed or not interval:
+                    self.stdout.write(f'Flushed {flushed} views.')
+                if not interval:
+                    break
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
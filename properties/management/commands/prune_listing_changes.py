@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from properties.sync import prune_listing_changes
+
+
+class Command(BaseCommand):
+    help = 'Delete listing change log entries older than LISTING_CHANGE_RETENTION_DAYS.'
+
+    def handle(self, *args, **options):
+        deleted = prune_listing_changes()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} listing changes.'))
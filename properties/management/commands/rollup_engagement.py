@@ -0,0 +1,32 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from properties.rollups import rollup_engagement, rollup_recent
+
+
+class Command(BaseCommand):
+    help = 'Recompute daily per-listing engagement stats for owner analytics.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=2,
+            help='Number of most recent days to recompute (default: 2).',
+        )
+        parser.add_argument(
+            '--since',
+            help='Backfill every day from this date (YYYY-MM-DD) to today instead.',
+        )
+
+    def handle(self, *args, **options):
+        if options['since']:
+            try:
+                since = date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format.')
+            written = rollup_engagement(since)
+        else:
+            written = rollup_recent(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} daily stats rows.'))
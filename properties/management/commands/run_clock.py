@@ -0,0 +1,93 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from properties.rollups import rollup_recent
+from properties.snapshot import refresh_snapshot
+from properties.sync import prune_listing_changes
+from properties.viewcounts import flush_view_counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Run the periodic jobs: keep the listing snapshot current, fold '
+        'buffered views into the view counts, roll up the recent days of '
+        'engagement stats and prune the listing change log.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--snapshot-interval',
+            type=float,
+            default=5,
+            help='Seconds between refreshes of the listing snapshot.',
+        )
+        parser.add_argument(
+            '--flush-interval',
+            type=float,
+            default=60,
+            help='Seconds between flushes of buffered detail-page views.',
+        )
+        parser.add_argument(
+            '--rollup-interval',
+            type=float,
+            default=900,
+            help='Seconds between engagement rollups.',
+        )
+        parser.add_argument(
+            '--rollup-days',
+            type=int,
+            default=2,
+            help='Number of most recent days each rollup recomputes (default: 2).',
+        )
+        parser.add_argument(
+            '--prune-interval',
+            type=float,
+            default=3600,
+            help='Seconds between prunes of the listing change log.',
+        )
+
+    def handle(self, *args, **options):
+        self.rollup_days = options['rollup_days']
+        jobs = [
+            (self._refresh_snapshot, options['snapshot_interval']),
+            (self._flush, options['flush_interval']),
+            (self._rollup, options['rollup_interval']),
+            (self._prune, options['prune_interval']),
+        ]
+        due = [0.0] * len(jobs)
+        self.stdout.write('Clock started.')
+        try:
+            while True:
+                for index, (job, interval) in enumerate(jobs):
+                    if time.monotonic() < due[index]:
+                        continue
+                    try:
+                        job()
+                    except Exception as exc:
+                        # One failed run must not stop the others; it is retried next interval
+                        self.stderr.write(f'{job.__name__.lstrip("_")}: {exc}')
+                    due[index] = time.monotonic() + interval
+                time.sleep(max(min(due) - time.monotonic(), 0))
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Clock stopped.')
+
+    def _refresh_snapshot(self):
+        written = refresh_snapshot()
+        if written:
+            self.stdout.write(f'Wrote {written} listings to the snapshot.')
+
+    def _flush(self):
+        flushed = flush_view_counts()
+        if flushed:
+            self.stdout.write(f'Flushed {flushed} views.')
+
+    def _rollup(self):
+        written = rollup_recent(self.rollup_days)
+        self.stdout.write(f'Wrote {written} daily stats rows.')
+
+    def _prune(self):
+        deleted = prune_listing_changes()
+        if deleted:
+            self.stdout.write(f'Deleted {deleted} listing changes.')
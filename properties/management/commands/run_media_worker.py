@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from properties.models import ImageUploadJob
+from properties.uploads import (
+    claim_job,
+    process_job,
+    remove_staged_file,
+    render_next_image,
+    requeue_stale_jobs,
+)
+
+
+class Command(BaseCommand):
+    help = 'Process staged image uploads: validate, store, render and assign primary images.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no job or image is left instead of polling for new ones.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls of an empty queue.',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=600,
+            help='Requeue jobs left processing for this many seconds by a crashed worker.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Media worker started.')
+        # Images that failed to render are not retried until restart
+        unrenderable = set()
+        try:
+            while True:
+                requeued = requeue_stale_jobs(options['stale_after'])
+                if requeued:
+                    self.stdout.write(f'Requeued {requeued} stale jobs.')
+
+                job = claim_job()
+                if job is None:
+                    # Idle: render images left without renditions
+                    if self._render_next(unrenderable):
+                        continue
+                    if options['once']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+                self._process(job)
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Media worker stopped.')
+
+    def _render_next(self, unrenderable):
+        result = render_next_image(skip=unrenderable)
+        if result is None:
+            return False
+        image, error = result
+        if error:
+            unrenderable.add(image.pk)
+            self.stderr.write(f'image {image.pk}: {error}')
+        else:
+            self.stdout.write(f'image {image.pk}: rendered')
+        return True
+
+    def _process(self, job):
+        try:
+            process_job(job)
+        except Exception as exc:
+            # One bad job must not take the worker down
+            job.status = ImageUploadJob.Status.FAILED
+            job.error = str(exc)[:255] or exc.__class__.__name__
+            job.save(update_fields=['status', 'error', 'updated_at'])
+            remove_staged_file(job)
+
+        if job.status == ImageUploadJob.Status.DONE:
+            self.stdout.write(self.style.SUCCESS(f'{job.original_name}: stored as image {job.image_id}'))
+        else:
+            self.stderr.write(f'{job.original_name}: {job.error}')
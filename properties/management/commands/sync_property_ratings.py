@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from properties.models import Property
+from reviews.models import Review
+
+
+class Command(BaseCommand):
+    help = 'Backfill or repair the stored rating stats on every property.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted properties without writing anything.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        stats = {
+            row['property']: (row['total'], row['count'])
+            for row in Review.objects.values('property').annotate(
+                total=Sum('rating'), count=Count('id'),
+            )
+        }
+
+        drifted = []
+        properties = Property.objects.only(
+            'id', 'rating_sum', 'rating_count', 'rating_avg'
+        ).order_by('pk')
+        for prop in properties.iterator(chunk_size=options['batch_size']):
+            total, count = stats.get(prop.pk, (0, 0))
+            avg = total / count if count else 0.0
+            if (prop.rating_sum, prop.rating_count) == (total, count) and prop.rating_avg == avg:
+                continue
+            prop.rating_sum, prop.rating_count, prop.rating_avg = total, count, avg
+            drifted.append(prop)
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted)} properties have stale rating stats.')
+            return
+
+        Property.objects.bulk_update(
+            drifted,
+            ['rating_sum', 'rating_count', 'rating_avg'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated rating stats for {len(drifted)} properties.'
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:51
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_stats(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    Review = apps.get_model('reviews', 'Review')
+    rows = Review.objects.values('property').annotate(total=Sum('rating'), count=Count('id'))
+    for row in rows:
+        Property.objects.filter(pk=row['property']).update(
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            rating_avg=row['total'] / row['count'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0004_propertyrequest_add_booking_type_and_dates'),
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='rating_avg',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['-rating_avg', '-rating_count'], name='properties__rating__e8814e_idx'),
+        ),
+        migrations.RunPython(backfill_rating_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:53
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def backfill_search_vector(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    Property.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('district', 'municipality', weight='B', config='english')
+        + SearchVector('address', weight='C', config='english')
+        + SearchVector('description', weight='D', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_property_rating_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='properties__search__940c9d_gin'),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
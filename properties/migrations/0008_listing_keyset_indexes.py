@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_property_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='property',
+            name='properties__rating__e8814e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_approved', True), ('status', 'available')), fields=['created_at', 'id'], name='listing_created_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_approved', True), ('status', 'available')), fields=['price', 'id'], name='listing_price_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_approved', True), ('status', 'available')), fields=['rating_avg', 'rating_count', 'id'], name='listing_rating_keyset'),
+        ),
+    ]
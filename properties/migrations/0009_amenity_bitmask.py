@@ -0,0 +1,55 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:00
+
+from django.db import migrations, models
+
+
+# properties.models.MAX_AMENITIES when this migration was written
+MAX_AMENITIES = 63
+
+
+def check_amenity_count(apps, schema_editor):
+    """Refuse to start if the amenities cannot all get a bit of amenity_mask."""
+    Amenity = apps.get_model('properties', 'Amenity')
+    count = Amenity.objects.count()
+    if count > MAX_AMENITIES:
+        raise RuntimeError(
+            f'There are {count} amenities, but amenity_mask holds at most '
+            f'{MAX_AMENITIES}. Merge or delete amenities, then migrate again.'
+        )
+
+
+def backfill_amenity_bits(apps, schema_editor):
+    Amenity = apps.get_model('properties', 'Amenity')
+    Property = apps.get_model('properties', 'Property')
+    for bit, amenity in enumerate(Amenity.objects.order_by('pk')):
+        amenity.bit = bit
+        amenity.save(update_fields=['bit'])
+
+    masks = {}
+    rows = Property.amenities.through.objects.values_list('property_id', 'amenity__bit')
+    for pk, bit in rows:
+        masks[pk] = masks.get(pk, 0) | (1 << bit)
+    for pk, mask in masks.items():
+        Property.objects.filter(pk=pk).update(amenity_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_listing_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_amenity_count, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='amenity',
+            name='bit',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='amenity_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_amenity_bits, migrations.RunPython.noop),
+    ]
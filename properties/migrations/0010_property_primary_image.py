@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:06
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_primary_image(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    PropertyImage = apps.get_model('properties', 'PropertyImage')
+    first_image = PropertyImage.objects.filter(
+        property=OuterRef('pk'),
+    ).order_by('-is_primary', 'uploaded_at', 'pk').values('pk')[:1]
+    Property.objects.update(primary_image=Subquery(first_image))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_amenity_bitmask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='properties.propertyimage'),
+        ),
+        migrations.RunPython(backfill_primary_image, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_image_upload_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyView',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('visitor', models.CharField(blank=True, max_length=40, null=True)),
+                ('bucket', models.PositiveIntegerField()),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='properties.property')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='propertyview',
+            constraint=models.UniqueConstraint(fields=('property', 'visitor', 'bucket'), name='unique_property_view_per_window'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0013_property_view_buffer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='propertyview',
+            name='viewed_on',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+        migrations.CreateModel(
+            name='PropertyDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('favorites', models.PositiveIntegerField(default=0)),
+                ('conversations', models.PositiveIntegerField(default=0)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('approvals', models.PositiveIntegerField(default=0)),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='properties.property')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='propertydailystats',
+            constraint=models.UniqueConstraint(fields=('property', 'date'), name='unique_property_daily_stats'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:18
+
+from django.db import migrations, models
+
+from properties.geohash import encode
+
+
+def backfill_geohash(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    located = Property.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for prop in located.only('pk', 'latitude', 'longitude').iterator(chunk_size=2000):
+        prop.geohash = encode(prop.latitude, prop.longitude)
+        batch.append(prop)
+        if len(batch) == 2000:
+            Property.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    Property.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0014_property_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['geohash'], name='property_geohash', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
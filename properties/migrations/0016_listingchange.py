@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0015_property_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('property_id', models.BigIntegerField()),
+                ('kind', models.CharField(choices=[('updated', 'Updated'), ('unlisted', 'Unlisted (rented, pending or disapproved)'), ('deleted', 'Deleted')], default='updated', max_length=10)),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
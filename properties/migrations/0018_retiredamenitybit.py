@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 06:46
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0017_cachegeneration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetiredAmenityBit',
+            fields=[
+                ('bit', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('retired_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
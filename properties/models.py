@@ -1,15 +1,44 @@
+import datetime
+
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.urls import reverse
-from django.db.models import Avg
+from django.utils import timezone
+from django.db.models import Case, F, FloatField, When
+from django.db.models.functions import Cast, Upper
+
+from .geohash import encode as encode_geohash
 
 _property = property  # save built-in
 
+# Text search configuration used for both the stored vector and queries
+SEARCH_CONFIG = 'english'
+SEARCH_FIELDS = ('title', 'description', 'address', 'district', 'municipality')
+
+
+def property_search_vector():
+    """Weighted search vector expression over the listing's text fields."""
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('district', 'municipality', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('address', weight='C', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='D', config=SEARCH_CONFIG)
+    )
+
+
+# Amenity bits must fit in the signed 64-bit Property.amenity_mask
+MAX_AMENITIES = 63
+
 
 class Amenity(models.Model):
     """Amenity that a property can offer."""
     name = models.CharField(max_length=100, unique=True)
     icon = models.CharField(max_length=50, default='bi-check-circle')
+    # Position of this amenity in Property.amenity_mask, assigned on creation
+    bit = models.PositiveSmallIntegerField(unique=True, null=True, editable=False)
 
     class Meta:
         verbose_name_plural = 'Amenities'
@@ -18,6 +47,51 @@ class Amenity(models.Model):
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def _free_bit():
+        """Lowest assignable bit, or None when all are taken."""
+        used = set(Amenity.objects.exclude(bit=None).values_list('bit', flat=True))
+        # A recently freed bit may still mean the deleted amenity to a
+        # reader's cached name-to-bit map or a snapshot not yet refreshed
+        cutoff = timezone.now() - datetime.timedelta(seconds=settings.AMENITY_BIT_REUSE_DELAY)
+        used.update(RetiredAmenityBit.objects.filter(
+            retired_at__gt=cutoff,
+        ).values_list('bit', flat=True))
+        return next((bit for bit in range(MAX_AMENITIES) if bit not in used), None)
+
+    @staticmethod
+    def _full_message():
+        return (
+            f'At most {MAX_AMENITIES} amenities are supported; the bits of '
+            f'deleted ones are reusable {settings.AMENITY_BIT_REUSE_DELAY} '
+            f'seconds after deletion.'
+        )
+
+    def clean(self):
+        super().clean()
+        if self.bit is None and self._free_bit() is None:
+            raise ValidationError(self._full_message())
+
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            self.bit = self._free_bit()
+            if self.bit is None:
+                raise ValueError(self._full_message())
+        super().save(*args, **kwargs)
+
+    @_property
+    def mask(self):
+        return 1 << self.bit
+
+
+class RetiredAmenityBit(models.Model):
+    """A Property.amenity_mask bit freed by deleting its amenity, and when."""
+    bit = models.PositiveSmallIntegerField(primary_key=True)
+    retired_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Bit {self.bit} retired at {self.retired_at}"
+
 
 class Property(models.Model):
     """Model representing a rental property listing."""
@@ -65,12 +139,26 @@ class Property(models.Model):
         default=RentalPurpose.ANY,
     )
     amenities = models.ManyToManyField(Amenity, blank=True, related_name='properties')
+    # Bitwise OR of the amenities' masks, kept in sync by properties.signals
+    amenity_mask = models.BigIntegerField(default=0, editable=False)
+    # Denormalised cover image for cards, maintained by refresh_primary_image()
+    primary_image = models.ForeignKey(
+        'PropertyImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+',
+    )
     latitude = models.DecimalField(
         max_digits=10, decimal_places=7, null=True, blank=True
     )
     longitude = models.DecimalField(
         max_digits=10, decimal_places=7, null=True, blank=True
     )
+    # Geohash of (latitude, longitude), kept in sync by save(); empty
+    # without a location. Map cells and tiles are prefixes of it.
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
     status = models.CharField(
         max_length=20,
         choices=Status.choices,
@@ -80,6 +168,12 @@ class Property(models.Model):
     contact_email = models.EmailField(blank=True)
     is_approved = models.BooleanField(default=True)
     views_count = models.PositiveIntegerField(default=0)
+    # Denormalised review stats, maintained by apply_review_change() from
+    # the Review signals (reviews.signals)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_avg = models.FloatField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -94,6 +188,42 @@ class Property(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['rental_purpose']),
             models.Index(fields=['latitude', 'longitude']),
+            # Prefix (LIKE 'abc%') lookups for map cells and tiles
+            models.Index(
+                fields=['geohash'],
+                name='property_geohash',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            # Keyset pagination indexes over publicly listed properties
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(status='available', is_approved=True),
+                name='listing_created_keyset',
+            ),
+            models.Index(
+                fields=['price', 'id'],
+                condition=models.Q(status='available', is_approved=True),
+                name='listing_price_keyset',
+            ),
+            models.Index(
+                fields=['rating_avg', 'rating_count', 'id'],
+                condition=models.Q(status='available', is_approved=True),
+                name='listing_rating_keyset',
+            ),
+            GinIndex(fields=['search_vector']),
+            # Trigram indexes on UPPER(col) so icontains lookups can use them
+            GinIndex(
+                OpClass(Upper('district'), name='gin_trgm_ops'),
+                name='property_district_trgm',
+            ),
+            GinIndex(
+                OpClass(Upper('municipality'), name='gin_trgm_ops'),
+                name='property_municipality_trgm',
+            ),
+            GinIndex(
+                OpClass(Upper('title'), name='gin_trgm_ops'),
+                name='property_title_trgm',
+            ),
         ]
 
     def __str__(self):
@@ -102,20 +232,67 @@ class Property(models.Model):
     def get_absolute_url(self):
         return reverse('properties:detail', kwargs={'pk': self.pk})
 
-    @_property
-    def primary_image(self):
-        """Return the first image or None."""
-        return self.images.first()
+    def save(self, *args, **kwargs):
+        self.geohash = encode_geohash(self.latitude, self.longitude) if self.has_location else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        super().save(*args, **kwargs)
+        if update_fields is None or set(update_fields) & set(SEARCH_FIELDS):
+            Property.objects.filter(pk=self.pk).update(
+                search_vector=property_search_vector()
+            )
+
+    def refresh_primary_image(self):
+        """
+        Re-point ``primary_image`` at the image cards should show: the one
+        flagged primary, else the oldest upload. Call after images change.
+        """
+        self.primary_image = self.images.order_by('-is_primary', 'uploaded_at', 'pk').first()
+        Property.objects.filter(pk=self.pk).update(primary_image=self.primary_image)
 
     @_property
     def average_rating(self):
-        """Return the average rating for this property."""
-        avg = self.reviews.aggregate(avg=Avg('rating'))['avg']
-        return round(avg, 1) if avg else 0
+        """Return the stored average rating for this property."""
+        return round(self.rating_avg, 1) if self.rating_count else 0
 
     @_property
     def review_count(self):
-        return self.reviews.count()
+        return self.rating_count
+
+    @classmethod
+    def apply_review_change(cls, pk, rating_delta, count_delta):
+        """
+        Adjust the stored rating stats of a property in a single UPDATE.
+
+        The new average is derived from the pre-update column values in the
+        same statement, so concurrent reviews cannot lose increments.
+        """
+        new_sum = F('rating_sum') + rating_delta
+        new_count = F('rating_count') + count_delta
+        return cls.objects.filter(pk=pk).update(
+            rating_sum=new_sum,
+            rating_count=new_count,
+            rating_avg=Case(
+                When(rating_count__gt=-count_delta,
+                     then=Cast(new_sum, FloatField()) / new_count),
+                default=0.0,
+                output_field=FloatField(),
+            ),
+        )
+
+    @classmethod
+    def sync_amenity_masks(cls, pks):
+        """Recompute amenity_mask for the given properties from their M2M rows."""
+        pks = list(pks)
+        masks = dict.fromkeys(pks, 0)
+        rows = cls.amenities.through.objects.filter(
+            property_id__in=pks
+        ).values_list('property_id', 'amenity__bit')
+        for pk, bit in rows:
+            masks[pk] |= 1 << bit
+        for pk, mask in masks.items():
+            cls.objects.filter(pk=pk).exclude(amenity_mask=mask).update(amenity_mask=mask)
 
     @_property
     def has_location(self):
@@ -138,6 +315,9 @@ class PropertyImage(models.Model):
     caption = models.CharField(max_length=200, blank=True)
     is_primary = models.BooleanField(default=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Resized copies built by properties.renditions, keyed by rendition name:
+    # {'card': {'width': 480, 'height': 320, 'jpeg': <path>, 'webp': <path>}, ...}
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ['-is_primary', 'uploaded_at']
@@ -145,6 +325,176 @@ class PropertyImage(models.Model):
     def __str__(self):
         return f"Image for {self.property.title}"
 
+    def rendition_url(self, name='card', fmt='jpeg'):
+        """URL of a rendition, falling back to the original upload."""
+        path = self.renditions.get(name, {}).get(fmt)
+        return self.image.storage.url(path) if path else self.image.url
+
+    def srcset(self, fmt='jpeg'):
+        """``srcset`` value listing every rendition in ``fmt``, smallest first."""
+        entries = sorted(
+            (rendition['width'], self.image.storage.url(rendition[fmt]))
+            for rendition in self.renditions.values()
+            if fmt in rendition
+        )
+        return ', '.join(f'{url} {width}w' for width, url in entries)
+
+
+class ImageUploadJob(models.Model):
+    """
+    An uploaded photo staged in storage, waiting for the media worker.
+
+    Requests only copy the raw upload to the ``staging`` storage; decoding,
+    validation, storage and renditions happen in ``manage.py
+    run_media_worker`` (see properties.uploads).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        DONE = 'done', 'Done'
+        FAILED = 'failed', 'Failed'
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='upload_jobs',
+    )
+    # Name of the raw upload in the ``staging`` storage
+    staged_name = models.CharField(max_length=100)
+    original_name = models.CharField(max_length=255)
+    caption = models.CharField(max_length=200, blank=True)
+    make_primary = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    error = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    image = models.ForeignKey(
+        PropertyImage,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.original_name} ({self.get_status_display()})"
+
+
+class PropertyView(models.Model):
+    """
+    A buffered detail-page view, folded into Property.views_count in bulk
+    by ``manage.py flush_property_views`` (see properties.viewcounts).
+
+    Appending a row never touches the property row itself, so concurrent
+    viewers of a popular listing do not queue on its row lock. The unique
+    constraint drops repeat views by one visitor within one window.
+    """
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    # Hashed visitor identity; NULL when de-duplication is disabled
+    visitor = models.CharField(max_length=40, null=True, blank=True)
+    # Number of the de-duplication window the view fell in
+    bucket = models.PositiveIntegerField()
+    viewed_on = models.DateField(default=timezone.localdate)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property', 'visitor', 'bucket'],
+                name='unique_property_view_per_window',
+            ),
+        ]
+
+    def __str__(self):
+        return f"View of property {self.property_id}"
+
+
+class PropertyDailyStats(models.Model):
+    """
+    Per-listing engagement for one day, for owner analytics.
+
+    ``views`` is added by flush_property_views as buffered views are
+    folded in; the other columns are recomputed for recent days by
+    ``manage.py rollup_engagement`` (see properties.rollups).
+    """
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='daily_stats',
+    )
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    favorites = models.PositiveIntegerField(default=0)
+    conversations = models.PositiveIntegerField(default=0)
+    requests = models.PositiveIntegerField(default=0)
+    approvals = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['property', 'date'],
+                name='unique_property_daily_stats',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stats for property {self.property_id} on {self.date}"
+
+
+class ListingChange(models.Model):
+    """
+    An entry in the listing change log behind delta sync (see
+    properties.sync): a listing was saved, deleted, or something shown on
+    its card (images, rating, amenities) changed.
+
+    Entries outlive their listing, so a deleted one leaves a tombstone;
+    ``kind`` records why a listing left the catalogue.
+    """
+
+    class Kind(models.TextChoices):
+        UPDATED = 'updated', 'Updated'
+        UNLISTED = 'unlisted', 'Unlisted (rented, pending or disapproved)'
+        DELETED = 'deleted', 'Deleted'
+
+    # Not a foreign key: the entry must survive the listing's deletion
+    property_id = models.BigIntegerField()
+    kind = models.CharField(max_length=10, choices=Kind.choices, default=Kind.UPDATED)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Property {self.property_id} {self.kind} at {self.changed_at}"
+
+
+class CacheGeneration(models.Model):
+    """
+    A cache generation counter (see properties.cache). Kept in the
+    database so every web worker and background process sees the same
+    value, and bumped with an atomic upsert.
+    """
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.PositiveBigIntegerField(default=1)
+    modified = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
 
 class PropertyRequest(models.Model):
     """Request for property visit, rental inquiry, or booking."""
@@ -0,0 +1,119 @@
+"""
+Minimal Mapbox Vector Tile (spec 2.1) encoder for point layers.
+
+Only what the map needs is implemented: point features with an optional
+ID and scalar properties. The protobuf wire format is written by hand so
+no protobuf runtime is required.
+"""
+import math
+import struct
+
+EXTENT = 4096
+
+# Protobuf wire types
+VARINT = 0
+FIXED64 = 1
+LENGTH_DELIMITED = 2
+
+# Geometry command for a single MoveTo
+MOVE_TO_ONE = (1 << 3) | 1
+POINT = 1
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    return _varint(field << 3 | wire_type)
+
+
+def _bytes(field, payload):
+    return _key(field, LENGTH_DELIMITED) + _varint(len(payload)) + payload
+
+
+def _uint(field, value):
+    return _key(field, VARINT) + _varint(value)
+
+
+def _packed(field, values):
+    return _bytes(field, b''.join(_varint(v) for v in values))
+
+
+def _value(value):
+    """Encode a Layer.Value message."""
+    if isinstance(value, bool):
+        return _uint(7, int(value))
+    if isinstance(value, int):
+        return _key(6, VARINT) + _varint(_zigzag(value) & 0xFFFFFFFFFFFFFFFF)
+    if isinstance(value, float):
+        return _key(3, FIXED64) + struct.pack('<d', value)
+    return _bytes(1, str(value).encode())
+
+
+def lnglat_to_tile(longitude, latitude, z, x, y, extent=EXTENT):
+    """Web Mercator position of a point in tile-local integer coordinates."""
+    scale = 2 ** z
+    latitude = max(min(latitude, 85.0511287798), -85.0511287798)
+    world_x = (longitude + 180) / 360 * scale
+    sin_lat = math.sin(math.radians(latitude))
+    world_y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return round((world_x - x) * extent), round((world_y - y) * extent)
+
+
+def tile_bounds(z, x, y):
+    """``(south, west, north, east)`` of a Web Mercator tile, in degrees."""
+    scale = 2 ** z
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / scale))))
+
+    return latitude(y + 1), x / scale * 360 - 180, latitude(y), (x + 1) / scale * 360 - 180
+
+
+def encode_layer(name, features, extent=EXTENT):
+    """
+    Encode one layer. ``features`` are ``(id, (tile_x, tile_y), properties)``
+    tuples; ``id`` may be None.
+    """
+    keys, values = {}, {}
+    body = [_uint(15, 2), _bytes(1, name.encode()), _uint(5, extent)]
+    for feature_id, (px, py), properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        feature = b''
+        if feature_id is not None:
+            feature += _uint(1, feature_id)
+        if tags:
+            feature += _packed(2, tags)
+        feature += _uint(3, POINT)
+        feature += _packed(4, [MOVE_TO_ONE, _zigzag(px), _zigzag(py)])
+        body.append(_bytes(2, feature))
+    body.extend(_bytes(3, key.encode()) for key in keys)
+    body.extend(_bytes(4, _value(value)) for _, value in values)
+    return b''.join(body)
+
+
+def encode_tile(layers, extent=EXTENT):
+    """Encode ``{layer_name: features}`` as a vector tile, skipping empty layers."""
+    return b''.join(
+        _bytes(3, encode_layer(name, features, extent))
+        for name, features in layers.items()
+        if features
+    )
@@ -0,0 +1,328 @@
+"""
+Nearest-listing search around a point.
+
+Listed properties with coordinates are held per process in a NearbyIndex:
+points on the unit sphere (ECEF coordinates with the Earth's radius taken
+as one), bucketed into a grid of CELL_DEGREES lat/lng cells and sorted by
+cell. A radius query reads the cell ranges overlapping the circle's
+bounding box with a binary search per grid row and ranks those points by
+exact great-circle distance, so it never touches the database.
+
+Saved and deleted properties are applied incrementally from the model
+signals in properties.signals; pending changes are merged into the sorted
+arrays once there are MERGE_AFTER of them. Every NEARBY_INDEX_MAX_AGE
+seconds the index is reloaded (from the listing snapshot when it is
+enabled and current) to pick up changes made by other processes.
+
+Without numpy, searches fall back to a bounding-box query in Postgres.
+"""
+import math
+import threading
+import time
+from dataclasses import replace
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .models import Property
+from .snapshot import listing_snapshot, snapshot_ids
+
+EARTH_RADIUS_KM = 6371.0088
+# Grid cells are about 2.2 km tall
+CELL_DEGREES = 0.02
+ROWS = round(180 / CELL_DEGREES)
+COLUMNS = round(360 / CELL_DEGREES)
+# Pending changes are merged into the sorted arrays past this many
+MERGE_AFTER = 256
+
+DEFAULT_RADIUS_KM = 2.0
+MAX_RADIUS_KM = 50.0
+DEFAULT_RESULTS = 20
+MAX_RESULTS = 100
+
+
+class InvalidLocation(Exception):
+    """Raised for a missing or out-of-range point, radius or result count."""
+
+
+def parse_nearby(params):
+    """
+    Read ``lat``, ``lng``, ``radius`` (km) and ``k`` from request params.
+    Returns ``(latitude, longitude, radius_km, k)``.
+    """
+    try:
+        latitude = float(params.get('lat', ''))
+        longitude = float(params.get('lng', ''))
+        radius = float(params.get('radius') or DEFAULT_RADIUS_KM)
+        k = int(params.get('k') or DEFAULT_RESULTS)
+    except ValueError:
+        raise InvalidLocation('lat and lng are required; radius and k must be numbers.')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise InvalidLocation('lat or lng is out of range.')
+    if not 0 < radius <= MAX_RADIUS_KM:
+        raise InvalidLocation(f'radius must be between 0 and {MAX_RADIUS_KM:g} km.')
+    if not 1 <= k <= MAX_RESULTS:
+        raise InvalidLocation(f'k must be between 1 and {MAX_RESULTS}.')
+    return latitude, longitude, radius, k
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points, in kilometres."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _longitude_reach(latitude, angle):
+    """
+    Largest longitude offset, in degrees, of a point within ``angle``
+    radians of a point at ``latitude``, or None if the circle spans every
+    longitude (it contains a pole).
+    """
+    ratio = math.sin(angle) / math.cos(math.radians(latitude)) if abs(latitude) < 90 else 2
+    if math.degrees(angle) + abs(latitude) >= 90 or ratio >= 1:
+        return None
+    return math.degrees(math.asin(ratio))
+
+
+def circle_bbox(latitude, longitude, radius_km):
+    """
+    ``(sw_lat, sw_lng, ne_lat, ne_lng)`` enclosing the circle, clipped to
+    the valid range. Circles crossing the antimeridian get every longitude.
+    """
+    angle = radius_km / EARTH_RADIUS_KM
+    reach = _longitude_reach(latitude, angle)
+    south = max(latitude - math.degrees(angle), -90.0)
+    north = min(latitude + math.degrees(angle), 90.0)
+    if reach is None or not -180 <= longitude - reach <= longitude + reach <= 180:
+        return south, -180.0, north, 180.0
+    return south, longitude - reach, north, longitude + reach
+
+
+def _unit_vectors(latitude, longitude):
+    lat, lng = np.radians(latitude), np.radians(longitude)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)))
+
+
+def _cell_keys(latitude, longitude):
+    rows = np.clip(((latitude + 90) // CELL_DEGREES).astype('i8'), 0, ROWS - 1)
+    cols = np.clip(((longitude + 180) // CELL_DEGREES).astype('i8'), 0, COLUMNS - 1)
+    return rows * COLUMNS + cols
+
+
+class NearbyIndex:
+    """Grid-bucketed unit vectors of located listings, sorted by cell."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = np.empty(0, dtype='i8')
+        self._ids = np.empty(0, dtype='i8')
+        self._points = np.empty((0, 3))
+        # pk -> (latitude, longitude), or None once it left the index
+        self._pending = {}
+        self.loaded_at = None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def load(self, ids, latitude, longitude):
+        """Replace the index contents with the given points."""
+        ids = np.asarray(ids, dtype='i8')
+        latitude = np.asarray(latitude, dtype='f8')
+        longitude = np.asarray(longitude, dtype='f8')
+        keys = _cell_keys(latitude, longitude)
+        order = np.argsort(keys, kind='stable')
+        points = _unit_vectors(latitude[order], longitude[order])
+        with self._lock:
+            self._keys, self._ids, self._points = keys[order], ids[order], points
+            self._pending = {}
+            self.loaded_at = time.monotonic()
+
+    def apply(self, changes):
+        """Apply ``{pk: (latitude, longitude) or None}``."""
+        with self._lock:
+            self._pending.update(changes)
+            if len(self._pending) >= MERGE_AFTER:
+                self._merge()
+
+    def _merge(self):
+        """Fold pending changes into the sorted arrays. Caller holds the lock."""
+        keep = ~np.isin(self._ids, np.fromiter(self._pending, dtype='i8'))
+        added = [(pk, point) for pk, point in self._pending.items() if point is not None]
+        ids = np.concatenate([self._ids[keep], np.array([pk for pk, _ in added], dtype='i8')])
+        latitude = np.array([point[0] for _, point in added], dtype='f8')
+        longitude = np.array([point[1] for _, point in added], dtype='f8')
+        keys = np.concatenate([self._keys[keep], _cell_keys(latitude, longitude)])
+        points = np.concatenate([self._points[keep], _unit_vectors(latitude, longitude)])
+        order = np.argsort(keys, kind='stable')
+        self._keys, self._ids, self._points = keys[order], ids[order], points[order]
+        self._pending = {}
+
+    def _cell_ranges(self, latitude, longitude, angle):
+        """``(low, high)`` cell key ranges covering the circle's bounding box."""
+        south = max(latitude - math.degrees(angle), -90.0)
+        north = min(latitude + math.degrees(angle), 90.0)
+        first_row = min(int((south + 90) // CELL_DEGREES), ROWS - 1)
+        last_row = min(int((north + 90) // CELL_DEGREES), ROWS - 1)
+        reach = _longitude_reach(latitude, angle)
+        if reach is None:
+            return [(first_row * COLUMNS, last_row * COLUMNS + COLUMNS - 1)]
+
+        west = int((longitude - reach + 180) // CELL_DEGREES)
+        east = int((longitude + reach + 180) // CELL_DEGREES)
+        if east - west + 1 >= COLUMNS:
+            return [(first_row * COLUMNS, last_row * COLUMNS + COLUMNS - 1)]
+        if west < 0:
+            spans = [(west + COLUMNS, COLUMNS - 1), (0, east)]
+        elif east >= COLUMNS:
+            spans = [(west, COLUMNS - 1), (0, east - COLUMNS)]
+        else:
+            spans = [(west, east)]
+        return [
+            (row * COLUMNS + low, row * COLUMNS + high)
+            for row in range(first_row, last_row + 1)
+            for low, high in spans
+        ]
+
+    def query(self, latitude, longitude, radius_km, k=None):
+        """
+        ``[(pk, distance_km), ...]`` of the indexed listings within
+        ``radius_km`` of the point, nearest first (ties by ID); at most
+        ``k`` when given.
+        """
+        with self._lock:
+            keys, ids, points = self._keys, self._ids, self._points
+            pending = dict(self._pending)
+
+        angle = min(radius_km / EARTH_RADIUS_KM, math.pi)
+        ranges = np.array(self._cell_ranges(latitude, longitude, angle), dtype='i8')
+        starts = np.searchsorted(keys, ranges[:, 0], side='left')
+        stops = np.searchsorted(keys, ranges[:, 1], side='right')
+        rows = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+        candidate_ids, candidates = ids[rows], points[rows]
+
+        if pending:
+            fresh = ~np.isin(candidate_ids, np.fromiter(pending, dtype='i8'))
+            added = [(pk, point) for pk, point in pending.items() if point is not None]
+            candidate_ids = np.concatenate([
+                candidate_ids[fresh], np.array([pk for pk, _ in added], dtype='i8'),
+            ])
+            candidates = np.concatenate([candidates[fresh], _unit_vectors(
+                np.array([point[0] for _, point in added], dtype='f8'),
+                np.array([point[1] for _, point in added], dtype='f8'),
+            )])
+
+        # Squared chord length between unit vectors, 2 - 2cos(angle), is
+        # monotonic in the angle, so it serves for both filter and sort
+        center = _unit_vectors(np.array([latitude]), np.array([longitude]))[0]
+        chords = np.maximum(2 - 2 * (candidates @ center), 0)
+        limit = 2 - 2 * math.cos(angle)
+        inside = np.flatnonzero(chords <= limit + 1e-12)
+        chords, candidate_ids = chords[inside], candidate_ids[inside]
+
+        if k is not None and k < len(chords):
+            nearest = np.argpartition(chords, k - 1)[:k]
+            # Keep every point tied with the k-th, so ties break by ID
+            nearest = np.flatnonzero(chords <= chords[nearest].max())
+            chords, candidate_ids = chords[nearest], candidate_ids[nearest]
+        order = np.lexsort((candidate_ids, chords))[:k]
+        distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.sqrt(chords[order]) / 2, 1))
+        return list(zip(candidate_ids[order].tolist(), distances.tolist()))
+
+
+def _located():
+    return Property.objects.filter(
+        status=Property.Status.AVAILABLE,
+        is_approved=True,
+        latitude__isnull=False,
+        longitude__isnull=False,
+    )
+
+
+def _located_points():
+    """``(ids, latitudes, longitudes)`` of every located listing."""
+    snapshot = listing_snapshot()
+    loaded = None if snapshot is None else snapshot.load()
+    if loaded is not None:
+        data, _ = loaded
+        located = data['live'] & ~np.isnan(data['latitude']) & ~np.isnan(data['longitude'])
+        return data['id'][located], data['latitude'][located], data['longitude'][located]
+    rows = list(_located().values_list('pk', 'latitude', 'longitude').iterator(chunk_size=5000))
+    return (
+        [row[0] for row in rows],
+        [float(row[1]) for row in rows],
+        [float(row[2]) for row in rows],
+    )
+
+
+_index = None
+
+
+def nearby_index():
+    """The process-wide index, loaded or reloaded as needed; None without numpy."""
+    global _index
+    if np is None:
+        return None
+    if _index is None:
+        _index = NearbyIndex()
+    if _index.loaded_at is None or time.monotonic() - _index.loaded_at > settings.NEARBY_INDEX_MAX_AGE:
+        _index.load(*_located_points())
+    return _index
+
+
+def refresh_nearby(pks):
+    """Re-read the locations of ``pks`` into this process's index."""
+    if _index is None or _index.loaded_at is None:
+        # Nothing loaded yet; the first search loads current data
+        return
+    located = {
+        pk: (float(latitude), float(longitude))
+        for pk, latitude, longitude in _located().filter(pk__in=pks).values_list(
+            'pk', 'latitude', 'longitude',
+        )
+    }
+    _index.apply({pk: located.get(pk) for pk in pks})
+
+
+def nearest_listings_orm(spec, latitude, longitude, radius_km, k):
+    bbox = circle_bbox(latitude, longitude, radius_km)
+    rows = replace(spec, bbox=bbox, has_coords=True).to_queryset().order_by().values_list(
+        'pk', 'latitude', 'longitude',
+    )
+    hits = sorted(
+        (haversine_km(latitude, longitude, float(lat), float(lng)), pk)
+        for pk, lat, lng in rows
+    )
+    return [(pk, distance) for distance, pk in hits if distance <= radius_km][:k]
+
+
+def nearest_listings(spec, latitude, longitude, radius_km, k):
+    """
+    ``[(pk, distance_km), ...]`` of the ``k`` listings matching ``spec``
+    (its bbox and sort are ignored) nearest to the point within
+    ``radius_km``, nearest first.
+    """
+    index = nearby_index()
+    if index is None:
+        return nearest_listings_orm(spec, latitude, longitude, radius_km, k)
+
+    spec = replace(spec, bbox=None, has_coords=False, sort='')
+    if not spec.as_dict():
+        return index.query(latitude, longitude, radius_km, k)
+
+    # Filtered searches rank everything in range, then keep the matches
+    hits = index.query(latitude, longitude, radius_km)
+    if not hits:
+        return []
+    spec = replace(spec, bbox=circle_bbox(latitude, longitude, radius_km), has_coords=True)
+    matching = snapshot_ids(spec, ('id',))
+    if matching is None:
+        matching = spec.to_queryset().order_by().values_list('pk', flat=True)
+    matching = set(matching)
+    return [hit for hit in hits if hit[0] in matching][:k]
@@ -0,0 +1,159 @@
+"""
+Keyset (cursor) pagination for listing querysets.
+
+Instead of ``OFFSET n`` plus a ``COUNT(*)``, each page remembers the sort
+key of its last row and the next page asks for rows strictly after it, so
+page 500 costs the same index range scan as page 1. Cursors are signed so
+clients treat them as opaque tokens.
+"""
+import datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+CURSOR_SALT = 'properties.pagination.cursor'
+
+
+class InvalidCursor(Exception):
+    """Raised when a cursor is malformed, tampered with or stale."""
+
+
+def _split(order):
+    return (order[1:], True) if order.startswith('-') else (order, False)
+
+
+def _dump_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(model, name, raw):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        # Annotations such as search_rank are plain floats
+        return float(raw)
+    return field.to_python(raw)
+
+
+def encode_cursor(values, scope, reverse=False):
+    return signing.dumps(
+        {'v': [_dump_value(v) for v in values], 's': scope, 'r': reverse},
+        salt=CURSOR_SALT,
+        compress=True,
+    )
+
+
+def decode_cursor(token, scope):
+    """Return ``(raw_values, reverse)`` for ``token`` or raise InvalidCursor."""
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise InvalidCursor('Invalid cursor.')
+    if payload.get('s') != scope:
+        raise InvalidCursor('Cursor does not belong to this query.')
+    return payload['v'], bool(payload.get('r'))
+
+
+def _after(ordering, values, reverse):
+    """
+    Q for rows strictly after ``values`` in ``ordering``.
+
+    Expands the row comparison ``(a, b, id) > (x, y, z)`` into
+    ``a > x OR (a = x AND b > y) OR ...``, plus a redundant bound on the
+    leading column so the planner can turn it into an index range scan.
+    """
+    branches = []
+    equal = Q()
+    for (name, descending), value in zip(ordering, values):
+        lookup = 'lt' if descending != reverse else 'gt'
+        branches.append(equal & Q(**{f'{name}__{lookup}': value}))
+        equal &= Q(**{name: value})
+    name, descending = ordering[0]
+    bound = 'lte' if descending != reverse else 'gte'
+    return Q(**{f'{name}__{bound}': values[0]}) & reduce(or_, branches)
+
+
+class KeysetPage:
+    """A page of results plus cursors for its neighbours."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def keyset_paginate(queryset, cursor, page_size, scope=''):
+    """
+    Return a KeysetPage of ``queryset`` starting after ``cursor``.
+
+    The queryset must be ordered by a total order (ending in a unique
+    column such as ``id``). ``scope`` ties cursors to one query, e.g. a
+    SearchSpec cache key, so a cursor cannot be replayed against other
+    filters.
+    """
+    ordering = [_split(order) for order in queryset.query.order_by]
+    model = queryset.model
+    reverse = False
+    qs = queryset
+
+    if cursor:
+        raw_values, reverse = decode_cursor(cursor, scope)
+        if len(raw_values) != len(ordering):
+            raise InvalidCursor('Cursor does not match the ordering.')
+        try:
+            values = [
+                _load_value(model, name, raw)
+                for (name, _), raw in zip(ordering, raw_values)
+            ]
+        except (ValueError, TypeError, ValidationError) as exc:
+            raise InvalidCursor('Invalid cursor.') from exc
+        qs = qs.filter(_after(ordering, values, reverse))
+
+    if reverse:
+        qs = qs.reverse()
+
+    rows = list(qs[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    def cursor_for(obj, backwards):
+        values = [getattr(obj, name) for name, _ in ordering]
+        return encode_cursor(values, scope, reverse=backwards)
+
+    next_cursor = previous_cursor = None
+    if rows:
+        if has_more or reverse:
+            next_cursor = cursor_for(rows[-1], False)
+        if (has_more and reverse) or (cursor and not reverse):
+            previous_cursor = cursor_for(rows[0], True)
+    return KeysetPage(rows, next_cursor, previous_cursor)
@@ -0,0 +1,187 @@
+"""
+values()-based projections of listings for the high-volume read paths.
+
+The DRF serializers in api.serializers build a model instance (plus its
+owner and primary image) per listing and run a method per computed field,
+each resolving its own absolute URL. These projections produce the same
+dicts, field for field, from one narrow ``values_list()`` query (and one
+for amenities on the map) with choice labels and the absolute media URL
+prefix worked out once per call. The serializers are still used for the
+browsable API.
+"""
+from collections import defaultdict
+
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from .models import Property, PropertyImage
+
+PROPERTY_TYPE_LABELS = dict(Property.PropertyType.choices)
+RENTAL_PURPOSE_LABELS = dict(Property.RentalPurpose.choices)
+
+# Columns shared by both projections, in the order rows are unpacked
+_COLUMNS = (
+    'id', 'title', 'property_type', 'district', 'municipality', 'ward_number',
+    'address', 'price', 'num_rooms', 'rental_purpose', 'latitude', 'longitude',
+    'status', 'rating_avg', 'rating_count',
+    'primary_image__image', 'primary_image__renditions',
+    'owner__first_name', 'owner__last_name', 'owner__username',
+)
+
+
+class MediaUrls:
+    """
+    Absolute URLs of stored media for one request. With file system
+    storage the absolute prefix is built once and paths are appended to
+    it; other storages are asked per file.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        self.storage = PropertyImage._meta.get_field('image').storage
+        self.prefix = None
+        if isinstance(self.storage, FileSystemStorage):
+            base = self.storage.url('')
+            self.prefix = request.build_absolute_uri(base) if request else base
+
+    def __call__(self, path):
+        if self.prefix is not None:
+            return self.prefix + filepath_to_uri(path).lstrip('/')
+        url = self.storage.url(path)
+        return self.request.build_absolute_uri(url) if self.request else url
+
+    def rendition(self, image, renditions, name):
+        """URL of rendition ``name``, as PropertyImage.rendition_url gives it."""
+        path = (renditions or {}).get(name, {}).get('jpeg')
+        return self(path or image)
+
+    def renditions(self, renditions):
+        """As api.serializers.rendition_urls."""
+        return {
+            name: {
+                key: self(value) if key in ('jpeg', 'webp') else value
+                for key, value in rendition.items()
+            }
+            for name, rendition in (renditions or {}).items()
+        }
+
+
+def _decimal(value):
+    # Stored decimals already carry the field's scale, as DRF quantizes them
+    return None if value is None else f'{value:f}'
+
+
+def _datetime(value, tz):
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _owner_name(first_name, last_name, username):
+    return f'{first_name} {last_name}'.strip() or username
+
+
+def _rows(ids, extra, queryset):
+    """Rows of _COLUMNS plus ``extra`` for those of ``ids`` in ``queryset``, in order."""
+    queryset = Property.objects.all() if queryset is None else queryset
+    rows = queryset.order_by().filter(pk__in=ids).values_list(*_COLUMNS, *extra)
+    by_id = {row[0]: row for row in rows}
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+def listing_rows(ids, request=None, queryset=None):
+    """
+    PropertyListSerializer output for the listings ``ids``, in that
+    order; IDs missing from ``queryset`` (if given) are skipped.
+    """
+    urls = MediaUrls(request)
+    tz = timezone.get_current_timezone()
+    results = []
+    for (
+        pk, title, property_type, district, municipality, ward_number,
+        address, price, num_rooms, rental_purpose, latitude, longitude,
+        status, rating_avg, rating_count, image, renditions,
+        first_name, last_name, username, created_at,
+    ) in _rows(ids, ('created_at',), queryset):
+        has_image = image is not None
+        results.append({
+            'id': pk,
+            'title': title,
+            'property_type': property_type,
+            'property_type_display': PROPERTY_TYPE_LABELS.get(property_type, property_type),
+            'district': district,
+            'municipality': municipality,
+            'ward_number': ward_number,
+            'address': address,
+            'price': _decimal(price),
+            'num_rooms': num_rooms,
+            'rental_purpose': rental_purpose,
+            'latitude': _decimal(latitude),
+            'longitude': _decimal(longitude),
+            'status': status,
+            'average_rating': float(round(rating_avg, 1) if rating_count else 0),
+            'review_count': rating_count,
+            'primary_image': urls.rendition(image, renditions, 'card') if has_image else None,
+            'primary_image_renditions': urls.renditions(renditions) if has_image else {},
+            'owner_name': _owner_name(first_name, last_name, username),
+            'created_at': _datetime(created_at, tz),
+        })
+    return results
+
+
+def _amenities(ids):
+    """``{property_id: [amenity dicts]}``, each list ordered by name."""
+    amenities = defaultdict(list)
+    rows = Property.amenities.through.objects.filter(property_id__in=ids).order_by(
+        'amenity__name',
+    ).values_list('property_id', 'amenity_id', 'amenity__name', 'amenity__icon')
+    for property_id, pk, name, icon in rows:
+        amenities[property_id].append({'id': pk, 'name': name, 'icon': icon})
+    return amenities
+
+
+def map_rows(ids, request=None, queryset=None):
+    """As listing_rows, with MapPropertySerializer output."""
+    urls = MediaUrls(request)
+    amenities = _amenities(ids)
+    results = []
+    for (
+        pk, title, property_type, district, municipality, ward_number,
+        address, price, num_rooms, rental_purpose, latitude, longitude,
+        status, rating_avg, rating_count, image, renditions,
+        first_name, last_name, username, contact_phone, contact_email, description,
+    ) in _rows(ids, ('contact_phone', 'contact_email', 'description'), queryset):
+        if len(description) > 150:
+            short_description = description[:150] + '...'
+        else:
+            short_description = description
+        has_image = image is not None
+        results.append({
+            'id': pk,
+            'title': title,
+            'property_type': property_type,
+            'property_type_display': PROPERTY_TYPE_LABELS.get(property_type, property_type),
+            'district': district,
+            'municipality': municipality,
+            'ward_number': ward_number,
+            'address': address,
+            'price': _decimal(price),
+            'latitude': _decimal(latitude),
+            'longitude': _decimal(longitude),
+            'num_rooms': num_rooms,
+            'average_rating': float(round(rating_avg, 1) if rating_count else 0),
+            'review_count': rating_count,
+            'primary_image': urls.rendition(image, renditions, 'map') if has_image else None,
+            'primary_image_renditions': urls.renditions(renditions) if has_image else {},
+            'rental_purpose': rental_purpose,
+            'rental_purpose_display': RENTAL_PURPOSE_LABELS.get(rental_purpose, rental_purpose),
+            'owner_name': _owner_name(first_name, last_name, username),
+            'amenities': amenities.get(pk, []),
+            'short_description': short_description,
+            'url': f'/properties/{pk}/',
+            'status': status,
+            'contact_phone': contact_phone,
+            'contact_email': contact_email,
+            'description': description,
+        })
+    return results
@@ -0,0 +1,88 @@
+"""
+Resized WebP and JPEG renditions of uploaded property photos.
+
+Owners upload straight from their phones, so originals are often several
+megabytes. Each PropertyImage gets a fixed set of renditions, one per
+place an image is shown, each in both formats. EXIF orientation is
+applied to the pixels, and the metadata (GPS included) is dropped.
+Paths and pixel sizes are recorded in ``PropertyImage.renditions``.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# Rendition name -> bounding box; images are scaled down to fit, never up
+RENDITIONS = (
+    ('map', (320, 240)),
+    ('card', (480, 360)),
+    ('detail', (1280, 960)),
+    ('full', (2048, 2048)),
+)
+
+# Format key -> (file extension, Pillow format, save options)
+FORMATS = (
+    ('webp', 'webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+def _flatten(image):
+    """Convert to RGB, compositing any transparency onto white."""
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _rendition_path(source_name, rendition, extension):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'renditions', f'{stem}_{rendition}.{extension}')
+
+
+def delete_renditions(image):
+    """Remove the rendition files of ``image`` from storage."""
+    storage = image.image.storage
+    for rendition in image.renditions.values():
+        for fmt, *_ in FORMATS:
+            if rendition.get(fmt):
+                storage.delete(rendition[fmt])
+
+
+def build_renditions(image):
+    """
+    Render every rendition of ``image`` to storage and return the mapping
+    to store in ``PropertyImage.renditions``. Existing rendition files are
+    replaced.
+    """
+    storage = image.image.storage
+    with image.image.open('rb') as handle:
+        with Image.open(handle) as original:
+            icc_profile = original.info.get('icc_profile')
+            source = _flatten(ImageOps.exif_transpose(original))
+
+    delete_renditions(image)
+    renditions = {}
+    for name, box in RENDITIONS:
+        resized = source.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+        entry = {'width': resized.width, 'height': resized.height}
+        for fmt, extension, pil_format, options in FORMATS:
+            buffer = BytesIO()
+            # No exif= argument, so no metadata is carried over
+            resized.save(buffer, pil_format, icc_profile=icc_profile, **options)
+            path = _rendition_path(image.image.name, name, extension)
+            entry[fmt] = storage.save(path, ContentFile(buffer.getvalue()))
+        renditions[name] = entry
+    return renditions
+
+
+def generate_renditions(image):
+    """Build and record renditions for ``image`` without re-saving the model."""
+    image.renditions = build_renditions(image)
+    type(image).objects.filter(pk=image.pk).update(renditions=image.renditions)
+    return image.renditions
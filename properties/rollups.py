@@ -0,0 +1,89 @@
+"""
+Daily per-listing engagement rollups for owner analytics.
+
+``rollup_engagement`` recounts favorites, conversations, requests and
+approvals per listing and local day straight from their source tables
+and upserts them into PropertyDailyStats, so re-running it over the same
+days is harmless and picks up late deletions. Views are not recounted
+here: their buffer rows are gone once flushed, and flush_view_counts
+adds them to the same rows as it folds them in. The clock process
+(``manage.py run_clock``) re-runs it over the last two days every fifteen
+minutes.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from favorites.models import Favorite
+from messaging.models import Conversation
+
+from .models import PropertyDailyStats, PropertyRequest
+
+EVENT_FIELDS = ['favorites', 'conversations', 'requests', 'approvals']
+
+
+def _daily_counts(queryset, timestamp):
+    """Yield (property_id, date, count) for ``queryset`` grouped by local day."""
+    return (
+        queryset.annotate(day=TruncDate(timestamp))
+        .order_by()
+        .values('property_id', 'day')
+        .annotate(count=Count('id'))
+        .values_list('property_id', 'day', 'count')
+    )
+
+
+def rollup_engagement(since, until=None):
+    """
+    Recompute the event columns of PropertyDailyStats for the local days
+    ``since`` to ``until`` (inclusive, default today). Returns the number
+    of rows written.
+    """
+    until = until or timezone.localdate()
+    sources = {
+        'favorites': (Favorite.objects.all(), 'created_at'),
+        'conversations': (Conversation.objects.all(), 'created_at'),
+        'requests': (PropertyRequest.objects.all(), 'created_at'),
+        'approvals': (
+            PropertyRequest.objects.filter(status=PropertyRequest.RequestStatus.APPROVED),
+            'responded_at',
+        ),
+    }
+    # Compare raw timestamps: __date casts every row to a local date first
+    start = timezone.make_aware(datetime.combine(since, time.min))
+    end = timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min))
+    rows = defaultdict(dict)
+    for field, (queryset, timestamp) in sources.items():
+        queryset = queryset.filter(**{
+            f'{timestamp}__gte': start,
+            f'{timestamp}__lt': end,
+        })
+        for property_id, day, count in _daily_counts(queryset, timestamp):
+            rows[property_id, day][field] = count
+
+    with transaction.atomic():
+        # Days whose events have all been deleted since the last run
+        PropertyDailyStats.objects.filter(date__gte=since, date__lte=until).update(
+            **{field: 0 for field in EVENT_FIELDS}
+        )
+        PropertyDailyStats.objects.bulk_create(
+            [
+                PropertyDailyStats(property_id=property_id, date=day, **counts)
+                for (property_id, day), counts in rows.items()
+            ],
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['property', 'date'],
+            update_fields=EVENT_FIELDS,
+        )
+    return len(rows)
+
+
+def rollup_recent(days):
+    """Roll up the last ``days`` local days, today included."""
+    today = timezone.localdate()
+    return rollup_engagement(today - timedelta(days=max(days, 1) - 1), today)
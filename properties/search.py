@@ -0,0 +1,365 @@
+import hashlib
+import json
+from dataclasses import dataclass, fields
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+from typing import Optional, Tuple
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import CharField, F, FloatField, Max, Value
+from django.db.models.functions import Cast
+
+from .cache import amenity_bits
+from .models import SEARCH_CONFIG, Property
+
+# Suggestion types in display order, mapped to the field they complete
+SUGGESTION_FIELDS = (
+    ('district', 'district'),
+    ('municipality', 'municipality'),
+    ('property', 'title'),
+)
+
+
+def keyword_search(queryset, keyword):
+    """
+    Filter a Property queryset by keyword using the stored search vector.
+
+    Each word is matched independently (OR) so natural phrases like
+    "flat near Baneshwor" still match, and listings that hit more words,
+    or hit them in the title, rank higher. The queryset is ordered by
+    ``search_rank``; callers may re-order it for an explicit sort.
+    """
+    terms = keyword.split()
+    if not terms:
+        return queryset
+
+    query = reduce(or_, (SearchQuery(term, config=SEARCH_CONFIG) for term in terms))
+    # ts_rank returns a float4; widen it so the value survives a round trip
+    # through a pagination cursor unchanged
+    return queryset.filter(search_vector=query).annotate(
+        search_rank=Cast(SearchRank(F('search_vector'), query), FloatField())
+    ).order_by('-search_rank', '-created_at')
+
+
+def autocomplete_suggestions(q, per_type=5):
+    """
+    Autocomplete suggestions for districts, municipalities and titles.
+
+    The three lookups are combined with UNION ALL so they cost a single
+    round trip; each ``icontains`` is served by the trigram index on the
+    upper-cased column and ranked by trigram similarity to ``q``.
+    """
+    base = Property.objects.filter(
+        status=Property.Status.AVAILABLE,
+        is_approved=True,
+    ).order_by()
+
+    parts = []
+    for kind, field in SUGGESTION_FIELDS:
+        parts.append(
+            base.filter(**{f'{field}__icontains': q})
+            .exclude(**{field: ''})
+            .values(value=F(field))
+            .annotate(
+                kind=Value(kind, output_field=CharField()),
+                score=Max(TrigramSimilarity(field, q)),
+            )
+            .order_by('-score', 'value')[:per_type]
+        )
+
+    rows = parts[0].union(*parts[1:], all=True)
+    order = {kind: i for i, (kind, _) in enumerate(SUGGESTION_FIELDS)}
+    rows = sorted(rows, key=lambda r: (order[r['kind']], -r['score']))
+    return [{'type': r['kind'], 'value': r['value']} for r in rows]
+
+
+# Canonical sort names and the orderings they compile to
+SORT_ORDERINGS = {
+    'newest': ('-created_at',),
+    'oldest': ('created_at',),
+    'price_asc': ('price',),
+    'price_desc': ('-price',),
+    'rating': ('-rating_avg', '-rating_count'),
+    'rating_asc': ('rating_avg',),
+    'popular': ('-rating_avg', '-views_count', '-created_at'),
+}
+
+# Legacy sort values still sent by older clients
+SORT_ALIASES = {
+    '-created_at': 'newest',
+    'created_at': 'oldest',
+    'price': 'price_asc',
+    '-price': 'price_desc',
+    '-average_rating': 'rating',
+    'average_rating': 'rating_asc',
+}
+
+
+def _text(value):
+    if value is None:
+        return ''
+    return ' '.join(str(value).split())
+
+
+def _decimal(value):
+    try:
+        number = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return number if number.is_finite() and number >= 0 else None
+
+
+def _int(value):
+    try:
+        number = int(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+    return number if number >= 0 else None
+
+
+def _float(value):
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+@dataclass(frozen=True)
+class SearchSpec:
+    """
+    A parsed, validated and normalised listing search.
+
+    Every listing query path builds one of these (from request params or a
+    chatbot filter dict) and compiles it with ``to_queryset()``, so
+    filtering, ordering and caching behave the same everywhere. Invalid
+    values are dropped rather than raised, matching how the search form
+    has always treated bad input.
+    """
+
+    keyword: str = ''
+    property_type: str = ''
+    district: str = ''
+    municipality: str = ''
+    ward_number: str = ''
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+    num_rooms: Optional[int] = None
+    rental_purpose: str = ''
+    amenities: Tuple[str, ...] = ()
+    min_rating: Optional[float] = None
+    # (sw_lat, sw_lng, ne_lat, ne_lng)
+    bbox: Optional[Tuple[float, float, float, float]] = None
+    has_coords: bool = False
+    sort: str = ''
+
+    @classmethod
+    def from_params(cls, params, **defaults):
+        """
+        Build a spec from a QueryDict (``request.GET``/``query_params``).
+
+        ``defaults`` supplies raw values for parameters the client omitted,
+        e.g. ``has_coords='true'`` for the map endpoint.
+        """
+        def get(name):
+            value = params.get(name)
+            return defaults.get(name) if value in (None, '') else value
+
+        bbox = None
+        corners = [_float(get(name)) for name in ('sw_lat', 'sw_lng', 'ne_lat', 'ne_lng')]
+        if None not in corners:
+            bbox = tuple(corners)
+
+        amenities = params.getlist('amenities') if hasattr(params, 'getlist') else []
+        return cls.from_filters({
+            'keyword': get('keyword'),
+            'property_type': get('property_type'),
+            'district': get('district'),
+            'municipality': get('municipality'),
+            'ward_number': get('ward_number'),
+            'min_price': get('min_price'),
+            'max_price': get('max_price'),
+            'num_rooms': get('num_rooms'),
+            'rental_purpose': get('rental_purpose'),
+            'amenities': amenities or defaults.get('amenities'),
+            'min_rating': get('min_rating'),
+            'bbox': bbox,
+            'has_coords': get('has_coords') == 'true',
+            'sort': get('sort'),
+        })
+
+    @classmethod
+    def from_filters(cls, filters):
+        """Build a spec from a plain dict, e.g. chatbot-extracted filters."""
+        filters = filters or {}
+
+        property_type = _text(filters.get('property_type')).lower()
+        if property_type not in Property.PropertyType.values:
+            property_type = ''
+        rental_purpose = _text(filters.get('rental_purpose')).lower()
+        if rental_purpose not in Property.RentalPurpose.values:
+            rental_purpose = ''
+
+        sort = _text(filters.get('sort'))
+        sort = SORT_ALIASES.get(sort, sort)
+        if sort not in SORT_ORDERINGS:
+            sort = ''
+
+        amenities = filters.get('amenities') or ()
+        if isinstance(amenities, str):
+            amenities = [amenities]
+        amenities = tuple(sorted({_text(a).lower() for a in amenities} - {''}))
+
+        min_rating = filters.get('min_rating')
+        min_rating = _float(min_rating) if min_rating not in (None, '') else None
+
+        bbox = filters.get('bbox')
+        if bbox is not None:
+            corners = [_float(c) for c in bbox]
+            if len(corners) == 4 and None not in corners:
+                sw_lat, sw_lng, ne_lat, ne_lng = corners
+                valid = -90 <= sw_lat <= ne_lat <= 90 and -180 <= sw_lng <= ne_lng <= 180
+                bbox = tuple(corners) if valid else None
+            else:
+                bbox = None
+
+        def optional(parse, name):
+            value = filters.get(name)
+            return parse(value) if value not in (None, '') else None
+
+        return cls(
+            keyword=_text(filters.get('keyword')).lower(),
+            property_type=property_type,
+            district=_text(filters.get('district')).lower(),
+            municipality=_text(filters.get('municipality')).lower(),
+            ward_number=_text(filters.get('ward_number')),
+            min_price=optional(_decimal, 'min_price'),
+            max_price=optional(_decimal, 'max_price'),
+            num_rooms=optional(_int, 'num_rooms'),
+            rental_purpose=rental_purpose,
+            amenities=amenities,
+            min_rating=min_rating,
+            bbox=bbox,
+            has_coords=bool(filters.get('has_coords')),
+            sort=sort,
+        )
+
+    def as_dict(self):
+        """Non-default fields only, with JSON-safe values."""
+        data = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value == field.default:
+                continue
+            if isinstance(value, Decimal):
+                value = format(value.normalize(), 'f')
+            elif isinstance(value, tuple):
+                value = list(value)
+            data[field.name] = value
+        return data
+
+    @property
+    def cache_key(self):
+        """Stable hash of the normalised spec, identical for equivalent queries."""
+        canonical = json.dumps(self.as_dict(), sort_keys=True, separators=(',', ':'))
+        return hashlib.sha1(canonical.encode()).hexdigest()
+
+    def filter_queryset(self, qs):
+        """Apply this spec's filters (but not its ordering) to ``qs``."""
+        if self.keyword:
+            qs = keyword_search(qs, self.keyword)
+        if self.property_type:
+            qs = qs.filter(property_type=self.property_type)
+        if self.district:
+            qs = qs.filter(district__icontains=self.district)
+        if self.municipality:
+            qs = qs.filter(municipality__icontains=self.municipality)
+        if self.ward_number:
+            qs = qs.filter(ward_number=self.ward_number)
+        if self.min_price is not None:
+            qs = qs.filter(price__gte=self.min_price)
+        if self.max_price is not None:
+            qs = qs.filter(price__lte=self.max_price)
+        if self.num_rooms:
+            qs = qs.filter(num_rooms__gte=self.num_rooms)
+        if self.rental_purpose:
+            qs = qs.filter(rental_purpose=self.rental_purpose)
+        if self.min_rating is not None:
+            qs = qs.filter(rating_avg__gte=self.min_rating)
+        if self.amenities:
+            qs = self._filter_amenities(qs)
+        if self.bbox:
+            sw_lat, sw_lng, ne_lat, ne_lng = self.bbox
+            qs = qs.filter(
+                latitude__gte=sw_lat, latitude__lte=ne_lat,
+                longitude__gte=sw_lng, longitude__lte=ne_lng,
+            )
+        if self.has_coords:
+            qs = qs.filter(latitude__isnull=False, longitude__isnull=False)
+        return qs
+
+    def amenity_masks(self):
+        """
+        Resolve the amenity filter to ``(required, any_masks)`` over
+        Property.amenity_mask, or None if some name matches no amenity.
+
+        Each requested name matches any amenity containing it, as the old
+        ``amenities__name__icontains`` filter did. Names that resolve to a
+        single amenity are folded into ``required`` (every bit must be set);
+        ambiguous names each add a mask of which at least one bit must be.
+        """
+        bits = amenity_bits()
+        required = 0
+        any_masks = []
+        for term in self.amenities:
+            matched = [bit for name, bit in bits.items() if term in name]
+            if not matched:
+                return None
+            if len(matched) == 1:
+                required |= 1 << matched[0]
+            else:
+                any_masks.append(sum(1 << bit for bit in matched))
+        return required, any_masks
+
+    def _filter_amenities(self, qs):
+        """Match amenities against Property.amenity_mask instead of joining."""
+        masks = self.amenity_masks()
+        if masks is None:
+            return qs.none()
+        required, any_masks = masks
+        for i, any_mask in enumerate(any_masks):
+            alias = f'amenity_any_{i}'
+            qs = qs.alias(**{alias: F('amenity_mask').bitand(any_mask)}).exclude(**{alias: 0})
+        if required:
+            qs = qs.alias(
+                amenity_match=F('amenity_mask').bitand(required)
+            ).filter(amenity_match=required)
+        return qs
+
+    def ordering(self, default_sort='newest'):
+        ordering = SORT_ORDERINGS[self.sort or default_sort]
+        if self.keyword and not self.sort:
+            ordering = ('-search_rank',) + ordering
+        # A unique tie-breaker in the same direction makes the order total,
+        # which keyset pagination relies on
+        descending = ordering[-1].startswith('-')
+        return ordering + ('-id' if descending else 'id',)
+
+    def to_queryset(self, related=(), prefetch=(), default_sort='newest'):
+        """
+        Compile to a single queryset over publicly listed properties.
+
+        Only the relations named in ``related`` (select_related) and
+        ``prefetch`` (prefetch_related) are loaded, so callers pay only
+        for what they render.
+        """
+        qs = Property.objects.filter(
+            status=Property.Status.AVAILABLE,
+            is_approved=True,
+        )
+        if related:
+            qs = qs.select_related(*related)
+        if prefetch:
+            qs = qs.prefetch_related(*prefetch)
+        qs = self.filter_queryset(qs)
+        return qs.order_by(*self.ordering(default_sort))
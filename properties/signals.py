@@ -0,0 +1,157 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.core.signals import request_finished, request_started
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import (
+    begin_request_memo,
+    bump_amenity_generation,
+    bump_detail_generation,
+    bump_listing_generation,
+    end_request_memo,
+)
+from .models import (
+    Amenity,
+    ImageUploadJob,
+    ListingChange,
+    Property,
+    PropertyImage,
+    RetiredAmenityBit,
+)
+from .nearby import refresh_nearby
+from .renditions import delete_renditions
+from .sync import record_listing_changes
+from .uploads import remove_staged_file
+
+
+request_started.connect(begin_request_memo, dispatch_uid='properties.generation_memo')
+request_finished.connect(end_request_memo, dispatch_uid='properties.generation_memo')
+
+
+def schedule_generation_bump(bump, *args):
+    """
+    Run ``bump`` once the transaction commits: bumped any earlier, a
+    concurrent request could cache rows from before the commit under the
+    new generation.
+    """
+    transaction.on_commit(partial(bump, *args))
+
+
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def invalidate_amenity_lookup(sender, **kwargs):
+    # The amenity generation also keys the cached name-to-bit map
+    schedule_generation_bump(bump_amenity_generation)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def refresh_property_location(sender, instance, **kwargs):
+    transaction.on_commit(partial(refresh_nearby, [instance.pk]))
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+@receiver(post_save, sender='reviews.Review')
+@receiver(post_delete, sender='reviews.Review')
+def invalidate_listing_caches(sender, **kwargs):
+    # Connected after the spatial index refresh, so its on_commit callback
+    # runs first: no request may see the new generation while this
+    # process's index still holds the old rows
+    schedule_generation_bump(bump_listing_generation)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender='reviews.Review')
+@receiver(post_delete, sender='reviews.Review')
+def invalidate_property_detail(sender, instance, **kwargs):
+    schedule_generation_bump(bump_detail_generation, instance.property_id)
+
+
+@receiver(post_save, sender=Property)
+def log_property_change(sender, instance, **kwargs):
+    # Covers approval toggles too: adminpanel saves the whole row
+    listed = instance.status == Property.Status.AVAILABLE and instance.is_approved
+    record_listing_changes(
+        [instance.pk],
+        ListingChange.Kind.UPDATED if listed else ListingChange.Kind.UNLISTED,
+    )
+
+
+@receiver(post_delete, sender=Property)
+def log_property_deletion(sender, instance, **kwargs):
+    record_listing_changes([instance.pk], ListingChange.Kind.DELETED)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender='reviews.Review')
+@receiver(post_delete, sender='reviews.Review')
+def log_card_change(sender, instance, **kwargs):
+    # Cards show the primary image and the rating summary
+    record_listing_changes([instance.property_id])
+
+
+@receiver(post_save, sender=Amenity)
+@receiver(pre_delete, sender=Amenity)
+def log_amenity_holders_change(sender, instance, **kwargs):
+    record_listing_changes(
+        Property.objects.filter(amenities=instance).values_list('pk', flat=True)
+    )
+
+
+@receiver(post_delete, sender=PropertyImage)
+def remove_image_renditions(sender, instance, **kwargs):
+    delete_renditions(instance)
+
+
+@receiver(post_delete, sender=ImageUploadJob)
+def remove_job_staged_file(sender, instance, **kwargs):
+    # Jobs of deleted listings go with them; so must their staged files
+    if instance.status in (ImageUploadJob.Status.PENDING, ImageUploadJob.Status.PROCESSING):
+        remove_staged_file(instance)
+
+
+@receiver(pre_delete, sender=Amenity)
+def clear_deleted_amenity_bit(sender, instance, **kwargs):
+    # The cascade on the through table does not send m2m_changed
+    Property.objects.filter(amenities=instance).update(
+        amenity_mask=F('amenity_mask').bitand(~instance.mask)
+    )
+    if instance.bit is not None:
+        RetiredAmenityBit.objects.update_or_create(
+            bit=instance.bit, defaults={'retired_at': timezone.now()},
+        )
+
+
+@receiver(m2m_changed, sender=Property.amenities.through)
+def sync_amenity_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # pk_set is not provided for clear; remember who is affected
+        instance._cleared_property_pks = list(
+            instance.properties.values_list('pk', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        pks = [instance.pk]
+    elif action == 'post_clear':
+        pks = instance.__dict__.pop('_cleared_property_pks', [])
+    else:
+        pks = list(pk_set)
+    Property.sync_amenity_masks(pks)
+    record_listing_changes(pks)
+    schedule_generation_bump(bump_listing_generation)
+    for pk in pks:
+        schedule_generation_bump(bump_detail_generation, pk)
@@ -0,0 +1,352 @@
+"""
+Columnar in-memory snapshot of publicly listed properties.
+
+Structured filtering (type, price, rooms, purpose, district, bounding box,
+amenities) over the whole catalogue is answered from a NumPy structured
+array instead of Postgres. The array lives in a ``.npy`` file under
+``LISTING_SNAPSHOT_DIR`` that every worker memory-maps, so the page cache
+holds a single copy shared by all of them.
+
+The clock process (``manage.py run_clock``) keeps it current: every few
+seconds it re-reads the listings named in the listing change log since
+its last pass (see properties.sync) and, if any of them changed, writes
+a new file and swings ``current.json`` to it, so readers never see a
+half-written file. It builds the snapshot from scratch when there is
+none; so does ``manage.py build_listing_snapshot``. Requests never write
+it.
+
+``current.json`` records the listing generation (see properties.cache)
+the snapshot was read at. The generation is shared by every host while
+the snapshot is per host, so a snapshot behind it, missing, or not kept
+current on this host is not used. Neither are searches it cannot answer
+(keyword, municipality, ward or an ordering over a column it does not
+hold): those return None so callers fall back to the ORM.
+"""
+import datetime
+import fcntl
+import json
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .cache import listing_generation
+from .models import ListingChange, Property
+from .sync import settled_position
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+SNAPSHOT_FIELDS = [
+    ('id', 'i8'),
+    ('live', '?'),
+    ('price', 'f8'),
+    ('num_rooms', 'i4'),
+    ('property_type', 'i1'),
+    ('rental_purpose', 'i1'),
+    ('district', 'i4'),
+    ('latitude', 'f8'),
+    ('longitude', 'f8'),
+    ('created_at', 'i8'),
+    ('rating_avg', 'f8'),
+    ('rating_count', 'i4'),
+    ('amenity_mask', 'i8'),
+]
+SOURCE_FIELDS = [name for name, _ in SNAPSHOT_FIELDS if name != 'live']
+
+# Columns a snapshot ordering may use
+SORT_COLUMNS = frozenset({'id', 'price', 'created_at', 'rating_avg', 'rating_count'})
+
+TYPE_CODES = {value: code for code, value in enumerate(Property.PropertyType.values)}
+PURPOSE_CODES = {value: code for code, value in enumerate(Property.RentalPurpose.values)}
+
+
+def _listed():
+    return Property.objects.filter(
+        status=Property.Status.AVAILABLE,
+        is_approved=True,
+    )
+
+
+def _micros(value):
+    return (value - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def _nan(value):
+    return float('nan') if value is None else float(value)
+
+
+def _log_horizon():
+    """Seconds after which entries a refresh still needs may have been pruned."""
+    return settings.LISTING_CHANGE_RETENTION_DAYS * 24 * 60 * 60 - settings.LISTING_SYNC_SETTLE_SECONDS
+
+
+class ListingSnapshot:
+    """A memory-mapped listing snapshot stored in ``directory``."""
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.pointer_path = os.path.join(self.directory, 'current.json')
+        self._stamp = None
+        self._file = None
+        self._data = None
+        self._districts = []
+        self._generation = None
+
+    @contextmanager
+    def _lock(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, 'lock'), 'w') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _read_pointer(self):
+        try:
+            with open(self.pointer_path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return None
+
+    def _record(self, row, district_codes):
+        values = dict(zip(SOURCE_FIELDS, row))
+        return (
+            values['id'],
+            True,
+            float(values['price']),
+            values['num_rooms'],
+            TYPE_CODES.get(values['property_type'], -1),
+            PURPOSE_CODES.get(values['rental_purpose'], -1),
+            district_codes.setdefault(values['district'], len(district_codes)),
+            _nan(values['latitude']),
+            _nan(values['longitude']),
+            _micros(values['created_at']),
+            values['rating_avg'],
+            values['rating_count'],
+            values['amenity_mask'],
+        )
+
+    def _write(self, data, districts, generation, position):
+        """
+        Write ``data`` to a new file, or keep the current one when it is
+        None, and point ``current.json`` at it. Caller holds the lock.
+        """
+        pointer = self._read_pointer() or {}
+        version = pointer.get('version', 0)
+        filename = pointer.get('file')
+        if data is not None:
+            version += 1
+            filename = f'listings-{version}.npy'
+            path = os.path.join(self.directory, filename)
+            with open(path + '.tmp', 'wb') as handle:
+                np.save(handle, data)
+            os.replace(path + '.tmp', path)
+
+        tmp_pointer = self.pointer_path + '.tmp'
+        with open(tmp_pointer, 'w') as handle:
+            json.dump({
+                'version': version,
+                'file': filename,
+                'districts': districts,
+                'generation': generation,
+                'position': position,
+                'refreshed_at': time.time(),
+            }, handle)
+        os.replace(tmp_pointer, self.pointer_path)
+
+        # Workers still mapping the old file keep it alive until they remap
+        if pointer.get('file') and pointer['file'] != filename:
+            try:
+                os.remove(os.path.join(self.directory, pointer['file']))
+            except OSError:
+                pass
+
+    def rebuild(self, queryset=None):
+        """Rebuild the snapshot from ``queryset`` (default: every listed property)."""
+        with self._lock():
+            return self._rebuild(_listed() if queryset is None else queryset)
+
+    def _rebuild(self, queryset):
+        # Read before the rows: the snapshot must not claim a generation
+        # or log position newer than the rows it holds
+        generation = listing_generation()
+        position = settled_position()
+        district_codes = {}
+        records = [
+            self._record(row, district_codes)
+            for row in queryset.order_by('pk').values_list(*SOURCE_FIELDS).iterator(chunk_size=5000)
+        ]
+        data = np.array(records, dtype=SNAPSHOT_FIELDS)
+        self._write(data, list(district_codes), generation, position)
+        return len(data)
+
+    def refresh(self):
+        """
+        Re-read the listings logged as changed since the last refresh,
+        or rebuild when there is no snapshot or the log may have been
+        pruned past it. Returns the number of listings written.
+        """
+        with self._lock():
+            pointer = self._read_pointer()
+            if pointer is None or time.time() - pointer.get('refreshed_at', 0) > _log_horizon():
+                return self._rebuild(_listed())
+
+            generation = listing_generation()
+            # Entries after the settled position are read again next time,
+            # in case one that commits late slots in before them
+            position = settled_position()
+            pks = sorted(set(ListingChange.objects.filter(
+                id__gt=pointer['position'],
+            ).values_list('property_id', flat=True)))
+
+            data = np.load(os.path.join(self.directory, pointer['file']), mmap_mode='r')
+            districts = pointer['districts']
+            district_codes = {name: code for code, name in enumerate(districts)}
+            rows = {row[0]: row for row in _listed().filter(pk__in=pks).values_list(*SOURCE_FIELDS)}
+            positions = np.searchsorted(data['id'], pks)
+            updated, removed, appended = {}, [], []
+            for pk, pos in zip(pks, positions):
+                exists = pos < len(data) and data['id'][pos] == pk
+                if pk not in rows:
+                    if exists and data['live'][pos]:
+                        removed.append(pos)
+                    continue
+                record = self._record(rows[pk], district_codes)
+                if not exists:
+                    appended.append(record)
+                elif data[pos].tobytes() != np.array(record, dtype=SNAPSHOT_FIELDS).tobytes():
+                    updated[pos] = record
+
+            written = len(updated) + len(removed) + len(appended)
+            if written:
+                # Copy on write: mapped readers keep the old file intact
+                data = np.array(data)
+                for pos, record in updated.items():
+                    data[pos] = record
+                data['live'][removed] = False
+                if appended:
+                    data = np.concatenate([data, np.array(appended, dtype=SNAPSHOT_FIELDS)])
+                    data = data[np.argsort(data['id'], kind='stable')]
+                self._write(data, list(district_codes), generation, position)
+            elif (generation, position) != (pointer['generation'], pointer['position']):
+                self._write(None, districts, generation, position)
+            return written
+
+    def load(self):
+        """
+        Return ``(data, districts)``, remapping if the snapshot was
+        swapped, or None when there is no snapshot or it is behind the
+        listing generation.
+        """
+        try:
+            stat = os.stat(self.pointer_path)
+        except FileNotFoundError:
+            return None
+        stamp = (stat.st_ino, stat.st_mtime_ns)
+        if stamp != self._stamp:
+            pointer = self._read_pointer()
+            if pointer is None:
+                return None
+            if pointer['file'] != self._file:
+                try:
+                    self._data = np.load(os.path.join(self.directory, pointer['file']), mmap_mode='r')
+                except FileNotFoundError:
+                    # Swapped again since the pointer was read
+                    return None
+                self._file = pointer['file']
+            self._districts = pointer['districts']
+            self._generation = pointer.get('generation', -1)
+            self._stamp = stamp
+        if self._generation < listing_generation():
+            return None
+        return self._data, self._districts
+
+    @staticmethod
+    def supports(spec, ordering):
+        if spec.keyword or spec.municipality or spec.ward_number:
+            return False
+        return all(order.lstrip('-') in SORT_COLUMNS for order in ordering)
+
+    def ids(self, spec, ordering):
+        """
+        Ordered IDs of the listings matching ``spec`` in ``ordering``, or
+        None if the snapshot cannot answer this search.
+        """
+        if not self.supports(spec, ordering):
+            return None
+        loaded = self.load()
+        if loaded is None:
+            return None
+        data, districts = loaded
+        match = data['live'].copy()
+
+        if spec.property_type:
+            match &= data['property_type'] == TYPE_CODES[spec.property_type]
+        if spec.rental_purpose:
+            match &= data['rental_purpose'] == PURPOSE_CODES[spec.rental_purpose]
+        if spec.district:
+            codes = [code for code, name in enumerate(districts) if spec.district in name.lower()]
+            match &= np.isin(data['district'], codes)
+        if spec.min_price is not None:
+            match &= data['price'] >= float(spec.min_price)
+        if spec.max_price is not None:
+            match &= data['price'] <= float(spec.max_price)
+        if spec.num_rooms:
+            match &= data['num_rooms'] >= spec.num_rooms
+        if spec.min_rating is not None:
+            match &= data['rating_avg'] >= spec.min_rating
+        if spec.amenities:
+            masks = spec.amenity_masks()
+            if masks is None:
+                return []
+            required, any_masks = masks
+            amenity_mask = data['amenity_mask']
+            if required:
+                match &= (amenity_mask & required) == required
+            for any_mask in any_masks:
+                match &= (amenity_mask & any_mask) != 0
+        if spec.bbox:
+            sw_lat, sw_lng, ne_lat, ne_lng = spec.bbox
+            latitude, longitude = data['latitude'], data['longitude']
+            match &= (latitude >= sw_lat) & (latitude <= ne_lat)
+            match &= (longitude >= sw_lng) & (longitude <= ne_lng)
+        if spec.has_coords:
+            match &= ~np.isnan(data['latitude']) & ~np.isnan(data['longitude'])
+
+        rows = np.flatnonzero(match)
+        # np.lexsort sorts by its last key first
+        keys = []
+        for order in reversed(ordering):
+            column = data[order.lstrip('-')][rows]
+            keys.append(-column if order.startswith('-') else column)
+        return data['id'][rows[np.lexsort(keys)]].tolist()
+
+
+_snapshot = None
+
+
+def listing_snapshot():
+    """The process-wide snapshot, or None when it is disabled."""
+    global _snapshot
+    if np is None or not settings.LISTING_SNAPSHOT_ENABLED:
+        return None
+    if _snapshot is None:
+        _snapshot = ListingSnapshot(settings.LISTING_SNAPSHOT_DIR)
+    return _snapshot
+
+
+def snapshot_ids(spec, ordering):
+    snapshot = listing_snapshot()
+    return None if snapshot is None else snapshot.ids(spec, ordering)
+
+
+def refresh_snapshot():
+    snapshot = listing_snapshot()
+    return 0 if snapshot is None else snapshot.refresh()
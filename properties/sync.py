@@ -0,0 +1,128 @@
+"""
+Delta sync for clients keeping a local replica of listing results.
+
+Every change to what a listing card shows appends a ListingChange (from
+the model signals in properties.signals), so the log's auto-incrementing
+ID orders changes. A sync token names a position in the log; a sync
+returns the listings changed after it that still match the search, and
+tombstones (bare IDs) for the others: deleted, rented, disapproved or
+edited out of the filters.
+
+Log IDs are allocated when a change is written but become visible when
+its transaction commits, which may be out of order. Tokens therefore only
+move past entries older than LISTING_SYNC_SETTLE_SECONDS; newer ones are
+sent again on the next sync, which is harmless as applying a change twice
+changes nothing. Entries are pruned after LISTING_CHANGE_RETENTION_DAYS
+(hourly by the clock, ``manage.py run_clock``, or by hand with ``manage.py
+prune_listing_changes``); tokens that old are refused so
+clients reload in full.
+
+Tokens are signed so clients treat them as opaque.
+"""
+import datetime
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+from .models import ListingChange
+
+SYNC_SALT = 'properties.sync.token'
+
+
+class InvalidSyncToken(Exception):
+    """Raised when a sync token is malformed or tampered with."""
+
+
+def record_listing_changes(pks, kind=ListingChange.Kind.UPDATED):
+    """Log a change of ``kind`` to each listing in ``pks``."""
+    ListingChange.objects.bulk_create(
+        [ListingChange(property_id=pk, kind=kind) for pk in pks],
+        batch_size=1000,
+    )
+
+
+def settled_position():
+    """Last log ID whose entry is old enough that no earlier one can still appear."""
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.LISTING_SYNC_SETTLE_SECONDS)
+    position = ListingChange.objects.filter(changed_at__lte=cutoff).order_by('-id').values_list(
+        'id', flat=True,
+    ).first()
+    return position or 0
+
+
+def _encode(position):
+    return signing.dumps({'p': position, 't': int(time.time())}, salt=SYNC_SALT)
+
+
+def sync_token():
+    """
+    A token for a response built from the current data. Take it before
+    querying, so changes made meanwhile are included in the next sync.
+    """
+    return _encode(settled_position())
+
+
+def _decode(token):
+    """Return ``(position, issued_at)`` for ``token`` or raise InvalidSyncToken."""
+    try:
+        payload = signing.loads(token, salt=SYNC_SALT)
+        return int(payload['p']), int(payload['t'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidSyncToken('Invalid sync token.')
+
+
+def listing_changes(spec, token):
+    """
+    Changes to the listings matching ``spec`` since ``token``, or None if
+    the token is older than the log retains.
+
+    Returns ``{'ids', 'removed', 'has_more', 'sync_token'}``: the changed
+    listings that match, the changed listings that no longer do, whether
+    more changes remain (sync again with the new token right away), and
+    the token for the next sync. At most LISTING_SYNC_MAX_CHANGES log
+    entries are read per call.
+    """
+    position, issued_at = _decode(token)
+    horizon = (
+        settings.LISTING_CHANGE_RETENTION_DAYS * 24 * 60 * 60
+        - settings.LISTING_SYNC_SETTLE_SECONDS
+    )
+    if time.time() - issued_at > horizon:
+        return None
+
+    settled = settled_position()
+    limit = settings.LISTING_SYNC_MAX_CHANGES
+    entries = list(
+        ListingChange.objects.filter(id__gt=position).order_by('id').values_list(
+            'id', 'property_id',
+        )[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    pks = list(dict.fromkeys(pk for _, pk in entries))
+    matching = set(
+        spec.to_queryset().order_by().filter(pk__in=pks).values_list('pk', flat=True)
+    ) if pks else set()
+
+    if has_more:
+        # Stop at the settled position unless that would not move at all
+        last = entries[-1][0]
+        position = min(last, settled) if settled > position else last
+    else:
+        position = max(position, settled)
+    return {
+        'ids': [pk for pk in pks if pk in matching],
+        'removed': [pk for pk in pks if pk not in matching],
+        'has_more': has_more,
+        'sync_token': _encode(position),
+    }
+
+
+def prune_listing_changes():
+    """Delete log entries older than LISTING_CHANGE_RETENTION_DAYS."""
+    cutoff = timezone.now() - datetime.timedelta(days=settings.LISTING_CHANGE_RETENTION_DAYS)
+    deleted, _ = ListingChange.objects.filter(changed_at__lt=cutoff).delete()
+    return deleted
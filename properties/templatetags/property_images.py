@@ -0,0 +1,27 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+
+@register.simple_tag
+def picture(image, rendition='card', sizes='100vw', **attrs):
+    """
+    Render a PropertyImage as a <picture> with WebP and JPEG srcsets.
+
+    ``rendition`` picks the fallback ``src``; ``sizes`` tells the browser
+    how wide the image is displayed so it can choose from the srcset.
+    Other keyword arguments become attributes of the <img>. Images whose
+    renditions have not been built yet render the original upload.
+    """
+    img_attrs = format_html_join(' ', '{}="{}"', attrs.items())
+    if not image.renditions:
+        return format_html('<img src="{}" {}>', image.image.url, img_attrs)
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {}>'
+        '</picture>',
+        image.srcset('webp'), sizes,
+        image.rendition_url(rendition), image.srcset('jpeg'), sizes, img_attrs,
+    )
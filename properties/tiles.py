@@ -0,0 +1,124 @@
+"""
+Vector tiles of listing markers and clusters for the map.
+
+A z/x/y Web Mercator tile holds the clusters and lone markers that
+properties.clusters computes for the tile's bounds at zoom ``z``, encoded
+as two point layers (``clusters`` and ``listings``). Encoded tiles are
+written under MAP_TILE_DIR in a directory per catalogue version and
+filter set, so every request for an unchanged tile is a file read, and
+a new version simply starts a fresh directory; stale ones are pruned.
+"""
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import replace
+
+from django.conf import settings
+
+from . import mvt
+from .cache import listing_state
+from .clusters import MAX_ZOOM, map_clusters
+
+# Layers and the type of each feature property, as TileJSON lists them
+LAYERS = {
+    'clusters': {
+        'count': 'Number', 'min_price': 'Number',
+        'median_price': 'Number', 'property_type': 'String',
+    },
+    'listings': {'price': 'Number', 'property_type': 'String'},
+}
+# Version directories unused for this long are removed
+STALE_AFTER = 24 * 60 * 60
+
+
+class InvalidTile(Exception):
+    """Raised for tile coordinates outside the tile pyramid."""
+
+
+def tile_version():
+    """
+    Catalogue version the tile cache is keyed on. It comes from the
+    shared listing generation, which is bumped only after a write has
+    committed (and the snapshot is not used until it has caught up), so
+    every process agrees on it and no tile built under it predates the
+    data it names.
+    """
+    generation, modified = listing_state()
+    return f'{generation}-{int(modified.timestamp() * 1000)}'
+
+
+def _number(value):
+    return int(value) if float(value).is_integer() else float(value)
+
+
+def build_tile(spec, z, x, y):
+    """Encode the clusters and markers of ``spec`` inside tile z/x/y."""
+    south, west, north, east = mvt.tile_bounds(z, x, y)
+    data = map_clusters(spec, z, (south, west, north, east))
+
+    def inside(item):
+        return south <= item['latitude'] < north and west <= item['longitude'] < east
+
+    def point(item):
+        return mvt.lnglat_to_tile(item['longitude'], item['latitude'], z, x, y)
+
+    layers = {
+        # A cluster cell may straddle tiles; it belongs to the tile
+        # holding its centroid
+        'clusters': [
+            (None, point(cluster), {
+                'count': cluster['count'],
+                'min_price': _number(cluster['min_price']),
+                'median_price': _number(cluster['median_price']),
+                'property_type': cluster['property_type'],
+            })
+            for cluster in data['clusters'] if inside(cluster)
+        ],
+        'listings': [
+            (marker['id'], point(marker), {
+                'price': _number(marker['price']),
+                'property_type': marker['property_type'],
+            })
+            for marker in data['markers'] if inside(marker)
+        ],
+    }
+    return mvt.encode_tile(layers)
+
+
+def _prune(root, keep):
+    cutoff = time.time() - STALE_AFTER
+    for entry in os.scandir(root):
+        if entry.name != keep and entry.is_dir() and entry.stat().st_mtime < cutoff:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def listing_tile(spec, z, x, y):
+    """
+    Return ``(version, tile bytes)`` for tile z/x/y of the listings
+    matching ``spec``, from the disk cache when present.
+    """
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise InvalidTile(f'No tile {z}/{x}/{y}.')
+    spec = replace(spec, bbox=None, sort='')
+    version = tile_version()
+    root = settings.MAP_TILE_DIR
+    directory = os.path.join(root, version, spec.cache_key, str(z), str(x))
+    path = os.path.join(directory, f'{y}.mvt')
+    try:
+        with open(path, 'rb') as handle:
+            return version, handle.read()
+    except FileNotFoundError:
+        pass
+
+    tile = build_tile(spec, z, x, y)
+    if not os.path.isdir(os.path.join(root, version)):
+        os.makedirs(root, exist_ok=True)
+        _prune(root, version)
+    os.makedirs(directory, exist_ok=True)
+    # Write then rename, so concurrent readers never see a partial tile
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as handle:
+        handle.write(tile)
+    os.replace(temp_path, path)
+    return version, tile
@@ -0,0 +1,159 @@
+"""
+Staged image uploads and the job queue drained by the media worker.
+
+A request only streams each upload into the ``staging`` storage and records
+an ImageUploadJob, so no image is decoded on a web worker. Web and worker
+may run on different hosts as long as that storage, like the default one
+the worker stores images in, is shared (see STORAGES in settings). ``manage.py
+run_media_worker`` claims jobs with ``SELECT ... FOR UPDATE SKIP LOCKED``
+(several workers can run side by side), validates the file as ImageField
+would, stores it as a PropertyImage and re-points the listing's primary
+image.
+
+Between jobs the worker also renders images that lack renditions, however
+they were created (worker, admin inline, shell), so no request pays for
+the encodes; ``manage.py build_image_renditions`` does the same in bulk.
+"""
+import os
+import uuid
+from datetime import timedelta
+from functools import partial
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import storages
+from django.core.validators import validate_image_file_extension
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from .cache import bump_detail_generation, bump_listing_generation
+from .models import ImageUploadJob, Property, PropertyImage
+from .renditions import generate_renditions
+from .sync import record_listing_changes
+
+
+def _staging():
+    return storages['staging']
+
+
+def stage_upload(property_obj, upload, caption='', make_primary=False):
+    """Copy ``upload`` to the staging storage and queue it for the worker."""
+    extension = os.path.splitext(upload.name)[1].lower()[:10]
+    staged_name = _staging().save(f'{uuid.uuid4().hex}{extension}', upload)
+    return ImageUploadJob.objects.create(
+        property=property_obj,
+        staged_name=staged_name,
+        original_name=os.path.basename(upload.name)[:255],
+        caption=caption,
+        make_primary=make_primary,
+    )
+
+
+def remove_staged_file(job):
+    _staging().delete(job.staged_name)
+
+
+def requeue_stale_jobs(older_than):
+    """Return jobs left 'processing' by a crashed worker to the queue."""
+    return ImageUploadJob.objects.filter(
+        status=ImageUploadJob.Status.PROCESSING,
+        updated_at__lt=timezone.now() - timedelta(seconds=older_than),
+    ).update(status=ImageUploadJob.Status.PENDING)
+
+
+def claim_job():
+    """Mark the oldest pending job as processing and return it, or None."""
+    with transaction.atomic():
+        job = ImageUploadJob.objects.select_for_update(skip_locked=True).filter(
+            status=ImageUploadJob.Status.PENDING,
+        ).order_by('created_at').first()
+        if job is not None:
+            job.status = ImageUploadJob.Status.PROCESSING
+            job.attempts += 1
+            job.save(update_fields=['status', 'attempts', 'updated_at'])
+    return job
+
+
+def _validate(job):
+    """Raise ValidationError unless the staged file is an image ImageField would accept."""
+    with _staging().open(job.staged_name, 'rb') as handle:
+        try:
+            validate_image_file_extension(File(handle, name=job.original_name))
+        except ValidationError:
+            # The stock message lists every extension Pillow knows
+            raise ValidationError('Unsupported image file type.')
+        try:
+            with Image.open(handle) as image:
+                image.verify()
+        except Exception:
+            # Pillow raises a variety of exceptions for corrupt files
+            raise ValidationError('Upload a valid image.')
+
+
+def process_job(job):
+    """Turn a claimed job into a PropertyImage, recording the outcome on the job."""
+    try:
+        _validate(job)
+    except (ValidationError, FileNotFoundError) as exc:
+        message = exc.messages[0] if isinstance(exc, ValidationError) else 'Staged file is missing.'
+        job.status = ImageUploadJob.Status.FAILED
+        job.error = message[:255]
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        remove_staged_file(job)
+        return job
+
+    with transaction.atomic():
+        try:
+            property_obj = Property.objects.select_for_update().get(pk=job.property_id)
+        except Property.DoesNotExist:
+            # The listing (and with it this job's row) is gone
+            job.error = 'Listing was deleted.'
+            remove_staged_file(job)
+            return job
+        image = PropertyImage(
+            property=property_obj,
+            caption=job.caption,
+            is_primary=job.make_primary and not property_obj.images.filter(is_primary=True).exists(),
+        )
+        with _staging().open(job.staged_name, 'rb') as handle:
+            image.image.save(job.original_name, File(handle), save=False)
+        image.save()
+        property_obj.refresh_primary_image()
+        job.image = image
+        job.status = ImageUploadJob.Status.DONE
+        job.error = ''
+        job.save(update_fields=['image', 'status', 'error', 'updated_at'])
+    remove_staged_file(job)
+    return job
+
+
+def renditions_ready(property_ids):
+    """Invalidate what shows the images of ``property_ids`` once they have renditions."""
+    # Listing cards and map markers point at the new renditions
+    for property_id in property_ids:
+        bump_detail_generation(property_id)
+    bump_listing_generation()
+    record_listing_changes(property_ids)
+
+
+def render_next_image(skip=()):
+    """
+    Render the oldest image lacking renditions, apart from the IDs in
+    ``skip`` (earlier failures). Returns ``(image, error)``, or None when
+    there is nothing to render. The image row stays locked while it is
+    rendered, so workers running side by side never render it twice.
+    """
+    with transaction.atomic():
+        image = PropertyImage.objects.select_for_update(skip_locked=True).filter(
+            renditions={},
+        ).exclude(pk__in=skip).order_by('pk').first()
+        if image is None:
+            return None
+        try:
+            generate_renditions(image)
+        except Exception as exc:
+            # Unreadable or hostile file: pages fall back to the original
+            return image, str(exc) or exc.__class__.__name__
+        transaction.on_commit(partial(renditions_ready, [image.property_id]))
+    return image, None
@@ -0,0 +1,96 @@
+"""
+Buffered detail-page view counting.
+
+Each view appends a PropertyView row instead of updating the property
+row, and the clock (``manage.py run_clock``) periodically folds the
+buffer into Property.views_count with one statement. Rows of the current
+de-duplication window stay buffered until the window closes, so a repeat
+view cannot slip in after its first view was flushed. Readers that need
+near real-time numbers add ``pending_view_counts()`` to the stored
+counts. Flushed views are also added to the per-day PropertyDailyStats
+rows used by owner analytics.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+
+from .models import Property, PropertyDailyStats, PropertyView
+
+
+def _current_bucket():
+    length = settings.PROPERTY_VIEW_DEDUP_WINDOW
+    return int(time.time()) // length if length else 0
+
+
+def _visitor(request):
+    if request.user.is_authenticated:
+        identity = f'user:{request.user.pk}'
+    elif request.session.session_key:
+        identity = f'session:{request.session.session_key}'
+    else:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        identity = f"ip:{forwarded.split(',')[0].strip() or request.META.get('REMOTE_ADDR', '')}"
+    # Only a hash is kept, never the raw address or session key
+    return hashlib.sha1(identity.encode()).hexdigest()
+
+
+def record_view(request, property_id):
+    """Buffer one view of ``property_id``, ignoring repeats within the window."""
+    dedup = bool(settings.PROPERTY_VIEW_DEDUP_WINDOW)
+    PropertyView.objects.bulk_create(
+        [PropertyView(
+            property_id=property_id,
+            visitor=_visitor(request) if dedup else None,
+            bucket=_current_bucket(),
+        )],
+        ignore_conflicts=True,
+    )
+
+
+def pending_view_counts(property_ids):
+    """Buffered, not yet flushed views per property ID."""
+    return dict(
+        PropertyView.objects.filter(property_id__in=property_ids)
+        .values('property_id')
+        .annotate(count=Count('id'))
+        .values_list('property_id', 'count')
+    )
+
+
+def flush_view_counts():
+    """
+    Add buffered views from closed windows to Property.views_count and to
+    the day's PropertyDailyStats row, and delete them, atomically in one
+    statement. Returns the number of views flushed.
+    """
+    quote = connection.ops.quote_name
+    view_table = quote(PropertyView._meta.db_table)
+    property_table = quote(Property._meta.db_table)
+    stats_table = quote(PropertyDailyStats._meta.db_table)
+    sql = f"""
+        WITH flushed AS (
+            DELETE FROM {view_table}
+            WHERE visitor IS NULL OR bucket < %s
+            RETURNING property_id, viewed_on
+        ), counts AS (
+            SELECT property_id, COUNT(*) AS views FROM flushed GROUP BY property_id
+        ), daily AS (
+            INSERT INTO {stats_table}
+                (property_id, date, views, favorites, conversations, requests, approvals)
+            SELECT property_id, viewed_on, COUNT(*), 0, 0, 0, 0
+            FROM flushed GROUP BY property_id, viewed_on
+            ON CONFLICT (property_id, date)
+            DO UPDATE SET views = {stats_table}.views + EXCLUDED.views
+        ), updated AS (
+            UPDATE {property_table} SET views_count = views_count + counts.views
+            FROM counts WHERE {property_table}.id = counts.property_id
+            RETURNING counts.views
+        )
+        SELECT COALESCE(SUM(views), 0) FROM updated
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_current_bucket()])
+        return cursor.fetchone()[0]
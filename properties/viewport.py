@@ -0,0 +1,144 @@
+"""
+Tile-snapped viewport queries for the map.
+
+A bounding box is widened to the geohash cells (tiles) covering it, at a
+precision chosen from the box's size alone, so every pan at the same
+zoom lands on the same tile grid. Each tile's result (its listing count
+and its first IDs in the search order) is cached per catalogue
+generation and filter set and answered from the geohash index, and a
+viewport is the ordered merge of its tiles, cut back to the exact box.
+Panning only computes the tiles that newly came into view.
+
+Tiles wholly inside the box count in full. An edge tile holding no more
+listings than it caches is counted and cut from its cached entries; one
+holding more may have further listings inside the box past its cached
+ones, so the count, and the markers if the cut runs short before them,
+are then read from Postgres for the exact box.
+"""
+import heapq
+from dataclasses import replace
+from datetime import datetime
+from itertools import islice, takewhile
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import geohash
+from .cache import listing_generation
+
+# A viewport spans at most this many tiles along each axis
+TILES_PER_AXIS = 4
+WORLD = (-90.0, -180.0, 90.0, 180.0)
+
+
+def tile_precision(bbox):
+    """Finest precision at which ``bbox`` spans at most TILES_PER_AXIS cells per axis."""
+    sw_lat, sw_lng, ne_lat, ne_lng = bbox
+    precision = geohash.MAX_PRECISION
+    while precision > 0:
+        height, width = geohash.cell_size(precision)
+        if (height * (TILES_PER_AXIS - 1) >= ne_lat - sw_lat
+                and width * (TILES_PER_AXIS - 1) >= ne_lng - sw_lng):
+            break
+        precision -= 1
+    return precision
+
+
+def snap_bbox(bbox):
+    """The tiles covering ``bbox`` and the box they span together."""
+    tiles = geohash.cover(bbox, tile_precision(bbox))
+    if tiles == ['']:
+        return tiles, WORLD
+    corners = [geohash.bounds(tile) for tile in tiles]
+    snapped = (
+        min(c[0] for c in corners), min(c[1] for c in corners),
+        max(c[2] for c in corners), max(c[3] for c in corners),
+    )
+    return tiles, snapped
+
+
+def _sort_key(ordering, row):
+    """Ascending-comparable key for a row of the ordering's values."""
+    key = []
+    for field, value in zip(ordering, row):
+        if isinstance(value, datetime):
+            value = value.timestamp()
+        key.append(-value if field.startswith('-') else value)
+    return tuple(key)
+
+
+def _tile_entries(spec, tile, ordering, size):
+    """
+    ``(count, [(sort_key, id, latitude, longitude), ...])`` for the first
+    ``size`` listings in ``tile``.
+    """
+    queryset = spec.to_queryset().filter(geohash__startswith=tile)
+    names = [field.lstrip('-') for field in ordering]
+    entries = [
+        (_sort_key(ordering, row[:-3]), row[-3], float(row[-2]), float(row[-1]))
+        for row in queryset.values_list(*names, 'id', 'latitude', 'longitude')[:size]
+    ]
+    count = len(entries) if len(entries) < size else queryset.count()
+    return count, entries
+
+
+def _contains(bbox, lat, lng):
+    sw_lat, sw_lng, ne_lat, ne_lng = bbox
+    return sw_lat <= lat <= ne_lat and sw_lng <= lng <= ne_lng
+
+
+def _covers(bbox, box):
+    return _contains(bbox, box[0], box[1]) and _contains(bbox, box[2], box[3])
+
+
+def viewport_ids(spec, limit):
+    """
+    Return ``(ids, count, snapped_bbox)`` for the listings matching
+    ``spec`` inside its bbox: the first ``limit`` IDs in the search order
+    and how many there are in total, plus the box the tiles span.
+    """
+    exact = spec
+    bbox = spec.bbox
+    tiles, snapped = snap_bbox(bbox)
+    spec = replace(spec, bbox=None, has_coords=True)
+    ordering = spec.ordering()
+    # Every tile keeps as many IDs as the largest page, so any page of
+    # the merged result can be served from the cached tiles
+    size = settings.MAP_VIEWPORT_MAX_RESULTS
+    prefix = f'listings:viewport-tile:{listing_generation()}:{spec.cache_key}'
+    keys = {f'{prefix}:{tile}': tile for tile in tiles}
+    cached = cache.get_many(keys)
+    missing = {
+        key: _tile_entries(spec, tile, ordering, size)
+        for key, tile in keys.items()
+        if key not in cached
+    }
+    if missing:
+        cache.set_many(missing, settings.LISTING_RESULT_CACHE_TTL)
+    cached.update(missing)
+
+    results = [cached[key] for key in keys]
+    count = 0
+    # The merge is only complete up to the last cached entry of each
+    # truncated edge tile
+    bound = None
+    for tile, (tile_count, entries) in zip(tiles, results):
+        if _covers(bbox, geohash.bounds(tile) if tile else WORLD):
+            count += tile_count
+        elif tile_count == len(entries):
+            count += sum(1 for entry in entries if _contains(bbox, *entry[2:]))
+        else:
+            last = entries[-1][:2]
+            bound = last if bound is None else min(bound, last)
+
+    merged = heapq.merge(*(entries for tile_count, entries in results))
+    if bound is not None:
+        merged = takewhile(lambda entry: entry[:2] <= bound, merged)
+    inside = (entry[1] for entry in merged if _contains(bbox, *entry[2:]))
+    ids = list(islice(inside, limit))
+    if bound is not None:
+        queryset = exact.to_queryset()
+        count = queryset.count()
+        if len(ids) < min(limit, count):
+            ids = list(queryset.values_list('pk', flat=True)[:limit])
+    return ids, count, snapped
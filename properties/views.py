@@ -1,14 +1,22 @@
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.conf import settings
-from django.db.models import Q, Avg, F
+from django.db.models import Exists, OuterRef, Q
 from django.core.paginator import Paginator
+from django.http import Http404
 from django.utils import timezone
-from .models import Property, PropertyImage, PropertyRequest
+from .models import ImageUploadJob, Property, PropertyImage, PropertyRequest
 from .forms import PropertyForm, PropertyImageForm, PropertySearchForm, PropertyRequestForm
+from .cache import cached_listing_results, detail_cache_version
+from .pagination import InvalidCursor, keyset_paginate
+from .search import SearchSpec
+from .uploads import stage_upload
+from .viewcounts import pending_view_counts, record_view
 from users.decorators import owner_required
-from reviews.forms import ReviewForm
+from reviews.models import Review
 from favorites.models import Favorite
 from notifications.models import Notification
 
@@ -16,96 +24,76 @@ from notifications.models import Notification
 def property_list(request):
     """Public property listing with search and filters."""
     form = PropertySearchForm(request.GET)
-    properties = Property.objects.filter(
-        status=Property.Status.AVAILABLE,
-        is_approved=True,
-    ).select_related('owner').prefetch_related('images', 'reviews')
-
-    if form.is_valid():
-        keyword = form.cleaned_data.get('keyword')
-        property_type = form.cleaned_data.get('property_type')
-        district = form.cleaned_data.get('district')
-        municipality = form.cleaned_data.get('municipality')
-        ward_number = form.cleaned_data.get('ward_number')
-        min_price = form.cleaned_data.get('min_price')
-        max_price = form.cleaned_data.get('max_price')
-        num_rooms = form.cleaned_data.get('num_rooms')
-        rental_purpose = form.cleaned_data.get('rental_purpose')
-        sort = form.cleaned_data.get('sort')
-
-        if keyword:
-            properties = properties.filter(
-                Q(title__icontains=keyword) | Q(description__icontains=keyword)
+    spec = SearchSpec.from_params(request.GET)
+    properties = spec.to_queryset(related=('owner', 'primary_image'))
+
+    if request.GET.get('pagination') == 'cursor':
+        # Keyset mode: constant cost per page, no total count
+        try:
+            page_obj = keyset_paginate(
+                properties, request.GET.get('cursor'), 12, scope=spec.cache_key,
             )
-        if property_type:
-            properties = properties.filter(property_type=property_type)
-        if district:
-            properties = properties.filter(district__icontains=district)
-        if municipality:
-            properties = properties.filter(municipality__icontains=municipality)
-        if ward_number:
-            properties = properties.filter(ward_number=ward_number)
-        if min_price:
-            properties = properties.filter(price__gte=min_price)
-        if max_price:
-            properties = properties.filter(price__lte=max_price)
-        if num_rooms:
-            properties = properties.filter(num_rooms__gte=num_rooms)
-        if rental_purpose:
-            properties = properties.filter(rental_purpose=rental_purpose)
-
-        if sort == 'price_asc':
-            properties = properties.order_by('price')
-        elif sort == 'price_desc':
-            properties = properties.order_by('-price')
-        else:
-            properties = properties.order_by('-created_at')
-
-    paginator = Paginator(properties, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        total_count, count_is_approximate = None, False
+    else:
+        results = cached_listing_results(spec, properties)
+        paginator = Paginator(results, 12)
+        page_number = request.GET.get('page')
+        page_obj = paginator.get_page(page_number)
+        total_count = results.count
+        count_is_approximate = results.count_is_approximate
 
     context = {
         'properties': page_obj,
         'form': form,
-        'total_count': paginator.count,
+        'total_count': total_count,
+        'count_is_approximate': count_is_approximate,
+        'cursor_mode': total_count is None,
     }
     return render(request, 'properties/list.html', context)
 
 
 def property_detail(request, pk):
-    """Display detailed property information."""
-    property_obj = get_object_or_404(
-        Property.objects.select_related('owner').prefetch_related(
-            'images', 'amenities', 'reviews__reviewer'
-        ),
-        pk=pk,
-    )
-
-    # Increment view count
-    Property.objects.filter(pk=pk).update(views_count=F('views_count') + 1)
-
-    is_favorited = False
+    """
+    Display detailed property information.
+
+    The shared parts of the page are cached template fragments keyed on
+    the listing's version (see properties.cache), and the owner card also
+    on the owner's ``updated_at``, so a hit costs the property row, the
+    latest reviews and cache reads. The per-user bits, favorite and review
+    state, are annotated onto that same row.
+    """
+    queryset = Property.objects.select_related('owner')
     if request.user.is_authenticated:
-        is_favorited = Favorite.objects.filter(
-            user=request.user, property=property_obj
-        ).exists()
+        queryset = queryset.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=request.user, property=OuterRef('pk'),
+            )),
+            has_reviewed=Exists(Review.objects.filter(
+                reviewer=request.user, property=OuterRef('pk'),
+            )),
+        )
+    property_obj = get_object_or_404(queryset, pk=pk)
 
-    review_form = ReviewForm()
-    request_form = PropertyRequestForm()
+    # Buffer the view; flush_property_views folds it into views_count
+    record_view(request, pk)
+    property_obj.views_count += pending_view_counts([pk]).get(pk, 0)
 
     # Google Maps API key for directions
     google_maps_key = getattr(settings, 'GOOGLE_MAPS_API_KEY', '')
 
-    from datetime import date
     context = {
         'property': property_obj,
-        'is_favorited': is_favorited,
-        'review_form': review_form,
-        'request_form': request_form,
+        'is_favorited': getattr(property_obj, 'is_favorited', False),
+        'has_reviewed': getattr(property_obj, 'has_reviewed', False),
+        # Not cached: each shows its reviewer's current name and picture
+        # and a relative date
         'reviews': property_obj.reviews.select_related('reviewer')[:10],
+        'detail_cache_version': detail_cache_version(property_obj),
+        'detail_cache_ttl': settings.PROPERTY_DETAIL_CACHE_TTL,
         'google_maps_key': google_maps_key,
-        'today_date': date.today().isoformat(),
+        'today_date': timezone.localdate().isoformat(),
     }
     return render(request, 'properties/detail.html', context)
 
@@ -157,7 +145,7 @@ def property_compare(request):
         pk__in=property_ids,
         status=Property.Status.AVAILABLE,
         is_approved=True
-    ).select_related('owner').prefetch_related('images', 'amenities', 'reviews')
+    ).select_related('owner', 'primary_image').prefetch_related('amenities')
     
     # Get all unique amenities across selected properties
     all_amenities = set()
@@ -259,22 +247,23 @@ def property_create(request):
             property_obj.save()
             form.save_m2m()  # Save amenities M2M
 
-            # Handle multiple images
+            # Images are staged for the media worker, not processed here
             images = request.FILES.getlist('images')
             for i, img in enumerate(images):
-                PropertyImage.objects.create(
-                    property=property_obj, image=img, is_primary=(i == 0)
-                )
+                stage_upload(property_obj, img, make_primary=(i == 0))
 
             # Handle single image from image_form
             if image_form.is_valid() and image_form.cleaned_data.get('image'):
-                img_obj = image_form.save(commit=False)
-                img_obj.property = property_obj
-                if not images:
-                    img_obj.is_primary = True
-                img_obj.save()
+                stage_upload(
+                    property_obj,
+                    image_form.cleaned_data['image'],
+                    caption=image_form.cleaned_data['caption'],
+                    make_primary=not images,
+                )
 
             messages.success(request, 'Property listing created successfully.')
+            if request.FILES:
+                messages.info(request, 'Your photos are being processed and will appear shortly.')
             return redirect('properties:detail', pk=property_obj.pk)
     else:
         form = PropertyForm()
@@ -297,19 +286,29 @@ def property_edit(request, pk):
         if form.is_valid():
             form.save()
 
-            # Handle new images
+            # New images are staged for the media worker, not processed here
             images = request.FILES.getlist('images')
             for img in images:
-                PropertyImage.objects.create(property=property_obj, image=img)
+                stage_upload(property_obj, img)
 
             messages.success(request, 'Property listing updated successfully.')
+            if images:
+                messages.info(request, 'Your photos are being processed; their status is shown on this page.')
+                return redirect('properties:edit', pk=property_obj.pk)
             return redirect('properties:detail', pk=property_obj.pk)
     else:
         form = PropertyForm(instance=property_obj)
 
+    # Uploads still in flight, plus recent failures so the owner can retry
+    upload_jobs = property_obj.upload_jobs.filter(
+        Q(status__in=[ImageUploadJob.Status.PENDING, ImageUploadJob.Status.PROCESSING])
+        | Q(status=ImageUploadJob.Status.FAILED, updated_at__gte=timezone.now() - timedelta(days=1))
+    )
+
     return render(request, 'properties/edit.html', {
         'form': form,
         'property': property_obj,
+        'upload_jobs': upload_jobs,
     })
 
 
@@ -333,11 +332,14 @@ def property_delete(request, pk):
 @owner_required
 def property_image_delete(request, pk):
     """Delete a property image."""
-    image = get_object_or_404(PropertyImage, pk=pk, property__owner=request.user)
+    image = get_object_or_404(
+        PropertyImage.objects.select_related('property'), pk=pk, property__owner=request.user,
+    )
     property_pk = image.property.pk
 
     if request.method == 'POST':
         image.delete()
+        image.property.refresh_primary_image()
         messages.success(request, 'Image deleted successfully.')
 
     return redirect('properties:edit', pk=property_pk)
@@ -347,7 +349,7 @@ def property_image_delete(request, pk):
 @owner_required
 def my_properties(request):
     """List all properties owned by the current user."""
-    properties = Property.objects.filter(owner=request.user).prefetch_related('images')
+    properties = Property.objects.filter(owner=request.user).select_related('primary_image')
 
     paginator = Paginator(properties, 10)
     page_number = request.GET.get('page')
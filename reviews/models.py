@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -28,3 +28,9 @@ class Review(models.Model):
 
     def __str__(self):
         return f"Review by {self.reviewer.username} for {self.property.title} ({self.rating}/5)"
+
+    def save(self, *args, **kwargs):
+        # reviews.signals locks the stored row to diff the rating against,
+        # which needs a transaction even in autocommit mode
+        with transaction.atomic():
+            super().save(*args, **kwargs)
@@ -0,0 +1,61 @@
+"""
+Keep the denormalised rating stats on Property in step with its reviews.
+
+The stats are adjusted from the model signals rather than in the review
+views, so admin edits and deletes, queryset deletes and cascades from
+deleted users or properties are covered too. Each adjustment is a single
+UPDATE in the writer's transaction, so it commits or rolls back with the
+review. Edits and deletes diff against the stored row read under a row
+lock, so concurrent writes to one review apply their deltas one after
+the other instead of both from the same old rating. Bulk writes that send no signals (``QuerySet.update``,
+``bulk_create``) are repaired by ``manage.py sync_property_ratings``.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from properties.models import Property
+
+from .models import Review
+
+
+def _locked_rating(pk):
+    """``(property_id, rating)`` of the stored review ``pk``, locked, or None."""
+    return Review.objects.select_for_update().filter(pk=pk).values_list(
+        'property_id', 'rating',
+    ).first()
+
+
+@receiver(pre_save, sender=Review)
+def remember_stored_rating(sender, instance, **kwargs):
+    # Review.save runs in a transaction, so the lock holds until commit
+    instance._stored_rating = _locked_rating(instance.pk) if instance.pk else None
+
+
+@receiver(pre_delete, sender=Review)
+def remember_deleted_rating(sender, instance, **kwargs):
+    # Deletes run in the collector's transaction
+    instance._stored_rating = _locked_rating(instance.pk)
+
+
+@receiver(post_save, sender=Review)
+def apply_saved_review(sender, instance, created, **kwargs):
+    stored = instance.__dict__.pop('_stored_rating', None)
+    if created or stored is None:
+        Property.apply_review_change(instance.property_id, instance.rating, 1)
+        return
+    property_id, rating = stored
+    if property_id != instance.property_id:
+        Property.apply_review_change(property_id, -rating, -1)
+        Property.apply_review_change(instance.property_id, instance.rating, 1)
+    elif rating != instance.rating:
+        Property.apply_review_change(property_id, instance.rating - rating, 0)
+
+
+@receiver(post_delete, sender=Review)
+def apply_deleted_review(sender, instance, **kwargs):
+    stored = instance.__dict__.pop('_stored_rating', None)
+    if stored is None:
+        # Already deleted by a concurrent transaction, which adjusted the stats
+        return
+    property_id, rating = stored
+    Property.apply_review_change(property_id, -rating, -1)
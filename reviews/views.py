@@ -1,5 +1,6 @@
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect
 from django.views.decorators.http import require_POST
 
@@ -23,7 +24,9 @@ def add_review(request, property_id):
         review = form.save(commit=False)
         review.property = property
         review.reviewer = request.user
-        review.save()
+        # The rating stats are adjusted by reviews.signals in the same transaction
+        with transaction.atomic():
+            review.save()
 
         Notification.objects.create(
             user=property.owner,
@@ -44,7 +47,8 @@ def add_review(request, property_id):
 @require_POST
 def delete_review(request, pk):
     review = get_object_or_404(Review, pk=pk, reviewer=request.user)
-    property_pk = review.property.pk
-    review.delete()
+    property_pk = review.property_id
+    with transaction.atomic():
+        review.delete()
     messages.success(request, "Your review has been deleted.")
     return redirect('properties:detail', pk=property_pk)
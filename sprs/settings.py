@@ -1,4 +1,6 @@
+import importlib.util
 import os
+import tempfile
 from pathlib import Path
 from decouple import config, Csv
 from django.contrib.messages import constants as messages
@@ -28,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.humanize',
+    'django.contrib.postgres',
     # Third party
     'crispy_forms',
     'crispy_bootstrap5',
@@ -122,19 +125,35 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# Media files. The web and media worker processes (Procfile) read each
+# other's files: web stages raw uploads that the worker reads, the worker
+# stores images and renditions that web serves. The file system backend
+# therefore only works when both run on one host; anywhere else set
+# MEDIA_STORAGE_BACKEND to shared object storage (e.g.
+# 'storages.backends.s3.S3Storage', configured by its own AWS_* settings).
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+MEDIA_STORAGE_BACKEND = config(
+    'MEDIA_STORAGE_BACKEND', default='django.core.files.storage.FileSystemStorage',
+)
+# Location (directory, or key prefix in object storage) of raw uploads
+# waiting for the media worker; must not be served publicly
+MEDIA_STAGING_ROOT = config('MEDIA_STAGING_ROOT', default=str(BASE_DIR / 'media_staging'))
+
 STORAGES = {
     'staticfiles': {
         'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
     },
     'default': {
-        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'BACKEND': MEDIA_STORAGE_BACKEND,
+    },
+    'staging': {
+        'BACKEND': MEDIA_STORAGE_BACKEND,
+        'OPTIONS': {'location': MEDIA_STAGING_ROOT},
     },
 }
 
-# Media files
-MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
-
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -172,6 +191,12 @@ if not DEBUG:
 
 # Django REST Framework
 REST_FRAMEWORK = {
+    # orjson for JSON; MessagePack on request when msgpack is installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        *(['api.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 12,
     'DEFAULT_THROTTLE_CLASSES': [
@@ -186,14 +211,90 @@ REST_FRAMEWORK = {
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 GOOGLE_MAPS_API_KEY = config('GOOGLE_MAPS_API_KEY', default='')
 
-# Caching
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'sprs-cache',
-        'TIMEOUT': 300,
+# Caching. The cache must be shared by every web worker and background
+# process (Procfile), as they read each other's entries: Redis when
+# REDIS_URL is set, else a database table (``manage.py createcachetable``,
+# run on release). Cache generations live in the database regardless
+# (properties.cache).
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'TIMEOUT': 300,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'sprs_cache',
+            'TIMEOUT': 300,
+        }
+    }
+
+# Amenity name-to-bit map: cache lifetime (seconds), and how long a deleted
+# amenity's bit stays unassigned so no reader can still map it to the old
+# amenity (must comfortably exceed the cache lifetime)
+AMENITY_BITS_CACHE_TTL = 60
+AMENITY_BIT_REUSE_DELAY = 24 * 60 * 60
+
+# Listing result counts: cache lifetime (seconds) and the planner-estimate
+# size above which unfiltered searches report an approximate count
+LISTING_COUNT_CACHE_TTL = 60
+LISTING_COUNT_ESTIMATE_THRESHOLD = 5000
+
+# Hit/miss counting for the admin dashboard costs a cache write per
+# search, so it is only on with Redis, whose incr is atomic and cheap
+LISTING_RESULT_CACHE_STATS = config('LISTING_RESULT_CACHE_STATS', default=bool(REDIS_URL), cast=bool)
+
+# Listing result cache: lifetime (seconds) of a cached ordered ID list and
+# the most IDs kept per query
+LISTING_RESULT_CACHE_TTL = 300
+LISTING_RESULT_CACHE_MAX_IDS = 1000
+
+# Columnar listing snapshot (needs numpy): shared memory-mapped files live
+# in this directory, so every worker on the host must see the same path.
+# It is kept current by the clock (manage.py run_clock) running on the host
+LISTING_SNAPSHOT_ENABLED = config('LISTING_SNAPSHOT_ENABLED', default=True, cast=bool)
+LISTING_SNAPSHOT_DIR = config(
+    'LISTING_SNAPSHOT_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'sprs-listing-snapshot'),
+)
+
+# Nearby search: each process reloads its in-memory spatial index this
+# often (seconds) to pick up listings edited by other processes
+NEARBY_INDEX_MAX_AGE = 60
+
+# Delta sync (?since= on the list and map endpoints): how long changes are
+# kept, how many log entries one sync reads, and how old (seconds) an
+# entry must be before tokens move past it
+LISTING_CHANGE_RETENTION_DAYS = 30
+LISTING_SYNC_MAX_CHANGES = 500
+LISTING_SYNC_SETTLE_SECONDS = 10
+
+# Most markers one map_properties response may carry
+MAP_VIEWPORT_MAX_RESULTS = 500
+
+# Map clusters: cells with fewer listings than this are sent as
+# individual markers
+MAP_CLUSTER_MIN_SIZE = 5
+
+# Encoded vector tiles are cached on disk here, per catalogue version
+MAP_TILE_DIR = config(
+    'MAP_TILE_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'sprs-map-tiles'),
+)
+
+# Shared fragments of the property detail page are cached this long
+# (seconds); edits, reviews, image changes and owner profile edits
+# invalidate them sooner
+PROPERTY_DETAIL_CACHE_TTL = 600
+
+# Detail-page views: repeat views by one visitor within this many seconds
+# count once (0 disables de-duplication)
+PROPERTY_VIEW_DEDUP_WINDOW = 1800
 
 # Session settings
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
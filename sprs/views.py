@@ -1,5 +1,4 @@
 from django.shortcuts import render
-from django.db.models import Avg, Count
 from properties.models import Property
 from users.models import User
 
@@ -11,16 +10,15 @@ def home_view(request):
     featured_properties = Property.objects.filter(
         status=Property.Status.AVAILABLE,
         is_approved=True,
-    ).select_related('owner').prefetch_related('images', 'reviews').annotate(
-        avg_rating=Avg('reviews__rating'),
-        review_count_num=Count('reviews')
-    ).order_by('-avg_rating', '-views_count')[:6]
+    ).select_related('owner', 'primary_image').order_by(
+        '-rating_avg', '-views_count'
+    )[:6]
     
     # Recent properties
     recent_properties = Property.objects.filter(
         status=Property.Status.AVAILABLE,
         is_approved=True,
-    ).select_related('owner').prefetch_related('images', 'reviews').order_by('-created_at')[:6]
+    ).select_related('owner', 'primary_image').order_by('-created_at')[:6]
     
     # Get user's favorite property IDs for the favorite button state
     user_favorites = []
@@ -53,7 +51,7 @@ def home_view_legacy(request):
     recent_properties = Property.objects.filter(
         status=Property.Status.AVAILABLE,
         is_approved=True,
-    ).select_related('owner').prefetch_related('images')[:6]
+    ).select_related('owner', 'primary_image')[:6]
 
     context = {
         'recent_properties': recent_properties,
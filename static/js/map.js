@@ -7,9 +7,15 @@
     'use strict';
 
     var map;
-    var markers = [];
+    var markersById = {};
     var markerCluster;
     var allProperties = [];
+    // Delta sync: token from the last response and the filters it was for
+    var syncToken = null;
+    var activeQuery = '';
+
+    // Check for changed listings this often (ms) while the page is visible
+    var SYNC_INTERVAL = 60000;
 
     // DOM elements
     var mapContainer = document.getElementById('mapContainer');
@@ -67,8 +73,10 @@
         });
         map.addLayer(markerCluster);
 
-        // Load properties
+        // Load properties, then keep them current
         loadProperties();
+        setInterval(syncProperties, SYNC_INTERVAL);
+        document.addEventListener('visibilitychange', syncProperties);
     }
 
     // Load properties from API
@@ -82,8 +90,10 @@
             });
         }
 
-        if (params.toString()) {
-            url += '?' + params.toString();
+        activeQuery = params.toString();
+        syncToken = null;
+        if (activeQuery) {
+            url += '?' + activeQuery;
         }
 
         resultCount.textContent = 'Loading properties...';
@@ -91,11 +101,11 @@
         fetch(url)
             .then(function(r) { return r.json(); })
             .then(function(data) {
-                var properties = Array.isArray(data) ? data : (data.results || []);
-                allProperties = properties;
-                clearMarkers();
-                addMarkers(properties);
-                updatePropertyList(properties);
+                var properties = Array.isArray(data) ? data : (data.properties || data.results || []);
+                syncToken = data.sync_token || null;
+                replaceMarkers(properties);
+                updatePropertyList(allProperties);
+                fitMarkers();
             })
             .catch(function(err) {
                 console.error('Failed to load properties:', err);
@@ -103,52 +113,132 @@
             });
     }
 
-    // Add markers to map
-    function addMarkers(properties) {
-        var bounds = [];
+    // Fetch only what changed since the last load or sync
+    function syncProperties() {
+        if (!syncToken || document.hidden) return;
 
-        properties.forEach(function(prop) {
-            if (!prop.latitude || !prop.longitude) return;
-
-            var lat = parseFloat(prop.latitude);
-            var lng = parseFloat(prop.longitude);
-            if (isNaN(lat) || isNaN(lng)) return;
-
-            var marker = L.marker([lat, lng], { icon: propertyIcon });
-            marker.propertyData = prop;
-
-            // Popup with basic info
-            marker.bindPopup(
-                '<div class="map-popup">' +
-                '<strong>' + escapeHtml(prop.title) + '</strong><br>' +
-                '<span class="text-muted small"><i class="bi bi-geo-alt"></i> ' + escapeHtml(prop.district) + '</span><br>' +
-                '<span style="color:#DC143C;font-weight:700;">Rs. ' + Number(prop.price).toLocaleString() + '/mo</span>' +
-                '</div>',
-                { maxWidth: 250 }
-            );
-
-            marker.on('click', function() {
-                showInfoPanel(prop);
-                highlightPropertyInList(prop.id);
+        var query = activeQuery;
+        var params = new URLSearchParams(query);
+        params.set('since', syncToken);
+
+        fetch(API_URL + '?' + params.toString())
+            .then(function(r) { return r.json(); })
+            .then(function(data) {
+                // Filters changed while the request was in flight
+                if (query !== activeQuery) return;
+                syncToken = data.sync_token || null;
+                if (data.reset) {
+                    replaceMarkers(data.properties || []);
+                    updatePropertyList(allProperties);
+                    return;
+                }
+                applyChanges(data.properties || [], data.removed || []);
+                if (data.has_more) syncProperties();
+            })
+            .catch(function(err) {
+                console.error('Failed to sync properties:', err);
             });
+    }
 
-            markers.push(marker);
+    // Make the markers match `properties`, keeping the unchanged ones
+    function replaceMarkers(properties) {
+        var wanted = {};
+        properties.forEach(function(prop) { wanted[prop.id] = true; });
+        Object.keys(markersById).forEach(function(id) {
+            if (!wanted[id]) removeMarker(id);
+        });
+        properties.forEach(upsertMarker);
+        allProperties = properties;
+    }
+
+    // Apply a delta: changed listings are replaced or added, removed ones dropped
+    function applyChanges(properties, removedIds) {
+        var removed = {};
+        removedIds.forEach(function(id) {
+            removed[id] = true;
+            removeMarker(id);
+        });
+        var changed = {};
+        properties.forEach(function(prop) {
+            changed[prop.id] = prop;
+            upsertMarker(prop);
+        });
+
+        var seen = {};
+        allProperties = allProperties.filter(function(p) {
+            return !removed[p.id];
+        }).map(function(p) {
+            seen[p.id] = true;
+            return changed[p.id] || p;
+        });
+        properties.forEach(function(prop) {
+            if (!seen[prop.id]) allProperties.push(prop);
+        });
+        if (removedIds.length || properties.length) {
+            updatePropertyList(allProperties);
+        }
+    }
+
+    function upsertMarker(prop) {
+        var existing = markersById[prop.id];
+        if (existing) {
+            if (JSON.stringify(existing.propertyData) === JSON.stringify(prop)) return;
+            removeMarker(prop.id);
+        }
+        var marker = createMarker(prop);
+        if (marker) {
+            markersById[prop.id] = marker;
             markerCluster.addLayer(marker);
-            bounds.push([lat, lng]);
+        }
+    }
+
+    function removeMarker(id) {
+        var marker = markersById[id];
+        if (marker) {
+            markerCluster.removeLayer(marker);
+            delete markersById[id];
+        }
+    }
+
+    // Build the marker for a property, or null if it has no position
+    function createMarker(prop) {
+        if (!prop.latitude || !prop.longitude) return null;
+
+        var lat = parseFloat(prop.latitude);
+        var lng = parseFloat(prop.longitude);
+        if (isNaN(lat) || isNaN(lng)) return null;
+
+        var marker = L.marker([lat, lng], { icon: propertyIcon });
+        marker.propertyData = prop;
+
+        // Popup with basic info
+        marker.bindPopup(
+            '<div class="map-popup">' +
+            '<strong>' + escapeHtml(prop.title) + '</strong><br>' +
+            '<span class="text-muted small"><i class="bi bi-geo-alt"></i> ' + escapeHtml(prop.district) + '</span><br>' +
+            '<span style="color:#DC143C;font-weight:700;">Rs. ' + Number(prop.price).toLocaleString() + '/mo</span>' +
+            '</div>',
+            { maxWidth: 250 }
+        );
+
+        marker.on('click', function() {
+            showInfoPanel(prop);
+            highlightPropertyInList(prop.id);
         });
 
-        // Fit map to show all markers
+        return marker;
+    }
+
+    // Fit map to show all markers
+    function fitMarkers() {
+        var bounds = Object.keys(markersById).map(function(id) {
+            return markersById[id].getLatLng();
+        });
         if (bounds.length > 0) {
             map.fitBounds(bounds, { padding: [50, 50], maxZoom: 14 });
         }
     }
 
-    // Clear markers
-    function clearMarkers() {
-        markerCluster.clearLayers();
-        markers = [];
-    }
-
     // Show info panel for a property
     function showInfoPanel(prop) {
         var imgHtml = prop.primary_image
@@ -184,7 +274,8 @@
         infoPanel.classList.add('open');
 
         // Highlight the marker
-        markers.forEach(function(m) {
+        Object.keys(markersById).forEach(function(id) {
+            var m = markersById[id];
             if (m.propertyData && m.propertyData.id === prop.id) {
                 m.setIcon(activeIcon);
             } else {
@@ -287,7 +378,9 @@
         closePanelBtn.addEventListener('click', function() {
             infoPanel.classList.remove('open');
             // Reset marker icons
-            markers.forEach(function(m) { m.setIcon(propertyIcon); });
+            Object.keys(markersById).forEach(function(id) {
+                markersById[id].setIcon(propertyIcon);
+            });
         });
     }
 